@@ -7,6 +7,15 @@ load_dotenv()
 class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./ai_assistant.db")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")  # vacío = DATABASE_URL con aiosqlite/asyncpg
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "production")  # production (WAL, pragmas, un escritor), default
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE_MB: int = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    SQLITE_READER_POOL_SIZE: int = int(os.getenv("SQLITE_READER_POOL_SIZE", "8"))
+    SQLITE_WRITE_TIMEOUT_SECONDS: float = float(os.getenv("SQLITE_WRITE_TIMEOUT_SECONDS", "10"))
+    SQLITE_WRITE_QUEUE_SIZE: int = int(os.getenv("SQLITE_WRITE_QUEUE_SIZE", "64"))
+    USER_STATS_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("USER_STATS_RECONCILE_INTERVAL_SECONDS", "3600"))  # 0 = desactivado
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -31,6 +40,41 @@ class Settings:
     # ML
     ML_MODELS_PATH: str = os.getenv("ML_MODELS_PATH", "ml_models/")
     ENABLE_ML_FEATURES: bool = os.getenv("ENABLE_ML_FEATURES", "True").lower() == "true"
+    AI_WARMUP_MODE: str = os.getenv("AI_WARMUP_MODE", "startup")  # startup, background, lazy (sin calentamiento)
+    AI_MODEL_CACHE_DIR: str = os.getenv("AI_MODEL_CACHE_DIR", "ai_model_cache/")
+    AI_INFERENCE_BACKEND: str = os.getenv("AI_INFERENCE_BACKEND", "auto")  # auto, numpy, keras
+    AI_INFERENCE_PRECISION: str = os.getenv("AI_INFERENCE_PRECISION", "float32")  # float32, int8 (solo motor NumPy)
+    AI_INT8_MAX_ACCURACY_DROP: float = float(os.getenv("AI_INT8_MAX_ACCURACY_DROP", "0.01"))
+    AI_MMAP_MODEL_ARTIFACTS: bool = os.getenv("AI_MMAP_MODEL_ARTIFACTS", "True").lower() == "true"
+    AI_BATCHING_ENABLED: bool = os.getenv("AI_BATCHING_ENABLED", "True").lower() == "true"
+    AI_BATCH_WINDOW_MS: float = float(os.getenv("AI_BATCH_WINDOW_MS", "5"))
+    AI_BATCH_MAX_SIZE: int = int(os.getenv("AI_BATCH_MAX_SIZE", "32"))
+    AI_TIERED_CLASSIFIER_ENABLED: bool = os.getenv("AI_TIERED_CLASSIFIER_ENABLED", "True").lower() == "true"
+    AI_RULE_MIN_CONFIDENCE: float = float(os.getenv("AI_RULE_MIN_CONFIDENCE", "0.8"))
+    AI_RULE_MAX_WORDS: int = int(os.getenv("AI_RULE_MAX_WORDS", "6"))
+    AI_PREDICTION_CACHE_SIZE: int = int(os.getenv("AI_PREDICTION_CACHE_SIZE", "2048"))  # 0 desactiva el caché
+    AI_PREDICTION_CACHE_TTL_SECONDS: float = float(os.getenv("AI_PREDICTION_CACHE_TTL_SECONDS", "3600"))
+    AI_EXECUTOR_MODE: str = os.getenv("AI_EXECUTOR_MODE", "thread")  # thread, process
+    AI_EXECUTOR_WORKERS: int = int(os.getenv("AI_EXECUTOR_WORKERS", "4"))
+    AI_EXECUTOR_MAX_PENDING: int = int(os.getenv("AI_EXECUTOR_MAX_PENDING", "64"))
+    AI_INFERENCE_TIMEOUT_SECONDS: float = float(os.getenv("AI_INFERENCE_TIMEOUT_SECONDS", "10"))
+    AI_STREAM_CHUNK_CHARS: int = int(os.getenv("AI_STREAM_CHUNK_CHARS", "80"))
+    AI_CHAT_BATCH_MAX_MESSAGES: int = int(os.getenv("AI_CHAT_BATCH_MAX_MESSAGES", "100"))
+    AI_EXTRA_TRAINING_DATA_PATH: str = os.getenv("AI_EXTRA_TRAINING_DATA_PATH", "")
+    AI_MIN_HOLDOUT_ACCURACY: float = float(os.getenv("AI_MIN_HOLDOUT_ACCURACY", "0.6"))
+    
+    # Admin API (vacío = deshabilitada)
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+    
+    # Conversation history
+    CONVERSATION_STORE_BACKEND: str = os.getenv("CONVERSATION_STORE_BACKEND", "memory")  # memory, sqlite
+    CONVERSATION_STORE_PATH: str = os.getenv("CONVERSATION_STORE_PATH", "conversations.db")
+    CONVERSATION_MAX_MESSAGES: int = int(os.getenv("CONVERSATION_MAX_MESSAGES", "20"))
+    CONVERSATION_IDLE_TTL_SECONDS: float = float(os.getenv("CONVERSATION_IDLE_TTL_SECONDS", "3600"))
+    CONVERSATION_MAX_SESSIONS: int = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+    
+    # Fechas del chat: zona horaria si el cliente no envía la suya (nombre IANA)
+    DEFAULT_TIMEZONE: str = os.getenv("DEFAULT_TIMEZONE", "UTC")
     
     # Email (optional)
     SMTP_HOST: str = os.getenv("SMTP_HOST", "")
@@ -1,20 +1,204 @@
-from sqlalchemy import create_engine
+import threading
+from collections import deque
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 from app.config import settings
 
+def is_sqlite_file(url: str) -> bool:
+    """SQLite sobre un fichero (las bases en memoria no admiten WAL ni varias conexiones)"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+def use_sqlite_profile(url: str) -> bool:
+    """Perfil de producción de SQLite: WAL, pragmas ajustados y un único escritor"""
+    return settings.SQLITE_PROFILE == "production" and is_sqlite_file(url)
+
+def sqlite_pragmas() -> list:
+    """Pragmas que se aplican a cada conexión nueva del perfil de producción"""
+    return [
+        # busy_timeout primero: cambiar a WAL necesita un bloqueo momentáneo
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def apply_sqlite_pragmas(engine):
+    """Ejecutar los pragmas del perfil en cada conexión que abra el motor (síncrono o asíncrono)"""
+    pragmas = sqlite_pragmas()
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+class WriterQueuePool(QueuePool):
+    """Pool de la única conexión de escritura: los escritores esperan turno en una cola FIFO acotada
+
+    QueuePool no respeta el orden de llegada: con muchos hilos, uno recién llegado puede
+    quedarse la conexión antes que los que ya esperaban, que acumulan segundos de espera.
+    Aquí la conexión pasa de un escritor al siguiente por turno; si ya hay
+    SQLITE_WRITE_QUEUE_SIZE esperando, el nuevo falla enseguida en lugar de alargar la cola.
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._turn_lock = threading.Lock()
+        self._waiting = deque()
+        self._busy = False
+
+    def _do_get(self):
+        self._wait_turn()
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._next_turn()
+            raise
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._next_turn()
+
+    def _wait_turn(self):
+        with self._turn_lock:
+            if not self._busy:
+                self._busy = True
+                return
+            if len(self._waiting) >= settings.SQLITE_WRITE_QUEUE_SIZE:
+                raise exc.TimeoutError(f"Cola de escritura llena ({len(self._waiting)} escritores en espera)")
+            turn = threading.Event()
+            self._waiting.append(turn)
+
+        if turn.wait(self._timeout):
+            return
+        with self._turn_lock:
+            if turn in self._waiting:
+                self._waiting.remove(turn)
+                raise exc.TimeoutError(f"Sin turno de escritura tras {self._timeout} s")
+        # El turno llegó justo al vencer el plazo
+
+    def _next_turn(self):
+        with self._turn_lock:
+            if self._waiting:
+                # El turno pasa directamente al siguiente: la conexión sigue ocupada
+                self._waiting.popleft().set()
+            else:
+                self._busy = False
+
+def create_engines(url: str, asynchronous: bool = False):
+    """Motor de lectura y motor de escritura para una URL
+
+    Con el perfil de producción de SQLite las lecturas usan un pool de conexiones (en WAL
+    los lectores no bloquean al escritor ni entre sí) y las escrituras una única conexión,
+    con los escritores en cola hasta SQLITE_WRITE_TIMEOUT_SECONDS en lugar de chocar con
+    "database is locked" (WriterQueuePool en el motor síncrono; en el asíncrono, la espera
+    del pool no bloquea el bucle de eventos). busy_timeout cubre lo que queda: el otro
+    motor y otros procesos. Fuera del perfil, el mismo motor sirve para leer y escribir.
+    """
+    factory = create_async_engine if asynchronous else create_engine
+    if not use_sqlite_profile(url):
+        options = {}
+        if not asynchronous and "sqlite" in url:
+            options["connect_args"] = {"check_same_thread": False}
+        engine = factory(url, **options)
+        return engine, engine
+
+    # aiosqlite usa NullPool por defecto (una conexión y un hilo nuevos por sesión)
+    connect_args = {} if asynchronous else {"check_same_thread": False}
+    reader = apply_sqlite_pragmas(factory(
+        url,
+        connect_args=connect_args,
+        poolclass=AsyncAdaptedQueuePool if asynchronous else QueuePool,
+        pool_size=settings.SQLITE_READER_POOL_SIZE,
+        # Ráfagas de lecturas: hasta el doble de conexiones (en WAL no se bloquean entre sí)
+        max_overflow=settings.SQLITE_READER_POOL_SIZE
+    ))
+    writer = apply_sqlite_pragmas(factory(
+        url,
+        connect_args=connect_args,
+        poolclass=AsyncAdaptedQueuePool if asynchronous else WriterQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS
+    ))
+    return reader, writer
+
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine, writer_engine = create_engines(settings.DATABASE_URL)
+
+# Controladores asíncronos equivalentes a los síncronos de DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def get_async_database_url() -> str:
+    """URL del motor asíncrono: ASYNC_DATABASE_URL, o DATABASE_URL con aiosqlite/asyncpg"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver).render_as_string(hide_password=False) if driver else settings.DATABASE_URL
+
+# Motor asíncrono: las consultas de las rutas no bloquean el bucle de eventos
+async_engine, async_writer_engine = create_engines(get_async_database_url(), asynchronous=True)
+
+# Motor de escritura de cada motor de lectura (el mismo si no hay escritor único)
+WRITER_BINDS = {
+    engine: writer_engine,
+    async_engine.sync_engine: async_writer_engine.sync_engine
+}
+
+class SingleWriterSession(Session):
+    """Sesión que lee en el pool de lectura y escribe (flush, INSERT/UPDATE/DELETE) en el escritor
+
+    Las escrituras se hacen visibles a las lecturas de la sesión al hacer commit, que es
+    como las usan las rutas (add/commit/refresh).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or isinstance(clause, UpdateBase):
+            return WRITER_BINDS.get(bind, bind)
+        return bind
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=SingleWriterSession)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=SingleWriterSession,
+    autoflush=False,
+    # Los objetos se siguen leyendo después del commit (sin recargas implícitas, que no
+    # están permitidas fuera de un await)
+    expire_on_commit=False
+)
 
 # Create Base class
 Base = declarative_base()
 
+def ensure_indexes(bind=None):
+    """Crear los índices declarados en los modelos que falten
+
+    `create_all` no toca las tablas que ya existen, así que los índices añadidos a un
+    modelo después de crear su tabla se crean aquí (comprobando antes si existen).
+    """
+    bind = bind if bind is not None else writer_engine
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -22,3 +206,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    """Cerrar las conexiones de los motores asíncronos (al apagar el servidor)"""
+    await async_engine.dispose()
+    if async_writer_engine is not async_engine:
+        await async_writer_engine.dispose()
@@ -1,6 +1,7 @@
 from .user import User
 from .task import Task
 from .habit import Habit, HabitLog
+from .user_stats import UserStats
 from app.database import Base
 
-__all__ = ["User", "Base", "Task", "Habit", "HabitLog"]
+__all__ = ["User", "Base", "Task", "Habit", "HabitLog", "UserStats"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -18,6 +18,11 @@ class Habit(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Habit lists (newest first) and the user side of the habit_logs joins
+    __table_args__ = (
+        Index("ix_habits_user_created_at", "user_id", "created_at"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="habits")
     habit_logs = relationship("HabitLog", back_populates="habit")
@@ -30,5 +35,10 @@ class HabitLog(Base):
     completed_at = Column(DateTime, default=datetime.utcnow)
     notes = Column(Text, nullable=True)
     
+    # Logs of a habit by date (history, "completed today", streaks)
+    __table_args__ = (
+        Index("ix_habit_logs_habit_completed_at", "habit_id", "completed_at"),
+    )
+    
     # Relationships
     habit = relationship("Habit", back_populates="habit_logs")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -19,5 +19,12 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Every endpoint filters by user_id first, then by status, due date or creation date
+    __table_args__ = (
+        Index("ix_tasks_user_status_completed_at", "user_id", "status", "completed_at"),
+        Index("ix_tasks_user_due_date", "user_id", "due_date"),
+        Index("ix_tasks_user_created_at", "user_id", "created_at"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="tasks")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    # One row per user, kept up to date by the task and habit writes (see user_stats_service)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_tasks = Column(Integer, nullable=False, default=0)
+    completed_tasks = Column(Integer, nullable=False, default=0)
+    pending_tasks = Column(Integer, nullable=False, default=0)
+    in_progress_tasks = Column(Integer, nullable=False, default=0)
+    total_habits = Column(Integer, nullable=False, default=0)
+    active_habits = Column(Integer, nullable=False, default=0)
+
+    # Completions of stats_date; a row whose stats_date is not today has no completions today
+    stats_date = Column(Date, nullable=True)
+    tasks_completed_today = Column(Integer, nullable=False, default=0)
+    habit_completions_today = Column(Integer, nullable=False, default=0)
+
+    # Bumped on every write so the reconciler never overwrites a concurrent update
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
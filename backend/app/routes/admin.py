@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Rutas de administración del motor de IA
+"""
+
+import hmac
+import logging
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.config import settings
+from app.services.ai_service import AIService, get_ai_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["admin"])
+
+def verify_admin_token(x_admin_token: str = Header(None)):
+    """Validar la cabecera X-Admin-Token contra ADMIN_API_TOKEN"""
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="La API de administración está deshabilitada (ADMIN_API_TOKEN vacío)"
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_API_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de administración inválido"
+        )
+
+@router.post("/model/reload", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(verify_admin_token)])
+async def reload_model(force: bool = False, ai_service: AIService = Depends(get_ai_service)):
+    """Reentrenar el modelo en segundo plano y activarlo si supera la validación"""
+    logger.info(f"🔁 Recarga del modelo solicitada (force={force})")
+    return {
+        "success": True,
+        "message": "Recarga del modelo en curso",
+        "data": ai_service.model_manager.request_reload(force=force)
+    }
+
+@router.get("/model", dependencies=[Depends(verify_admin_token)])
+async def get_model_status(ai_service: AIService = Depends(get_ai_service)):
+    """Versión activa del modelo y estado de la última recarga"""
+    return {
+        "success": True,
+        "message": "Estado del modelo obtenido",
+        "data": ai_service.model_manager.get_status()
+    }
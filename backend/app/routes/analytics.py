@@ -1,84 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
-from typing import List, Dict, Any
-from datetime import datetime, date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, extract, select
+from datetime import date, timedelta
 import logging
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
 from app.services.auth_service import get_current_user
+from app.services import stats_service, user_stats_service
 from app.models.task import Task
 from app.models.habit import Habit, HabitLog
-from app.services.ai_service import AIService
+from app.services.ai_service import AIService, get_ai_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-ai_service = AIService()
 
 @router.get("/productivity")
 async def get_productivity_analytics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener analytics de productividad con datos reales"""
     try:
-        # Obtener estadísticas de tareas
-        total_tasks = db.query(Task).filter(Task.user_id == current_user.id).count()
-        completed_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.status == "completed"
-        ).count()
-        
-        # Calcular tasa de completación
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Tareas por prioridad
-        priority_stats = db.query(
-            Task.priority,
-            func.count(Task.id).label('count')
-        ).filter(Task.user_id == current_user.id).group_by(Task.priority).all()
-        
-        # Tareas por categoría
-        category_stats = db.query(
-            Task.category,
-            func.count(Task.id).label('count')
-        ).filter(
-            Task.user_id == current_user.id,
-            Task.category.isnot(None)
-        ).group_by(Task.category).all()
-        
-        # Tareas completadas en los últimos 7 días
-        week_ago = date.today() - timedelta(days=7)
-        recent_completions = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.status == "completed",
-            Task.completed_at >= week_ago
-        ).count()
-        
-        # Tareas vencidas
-        overdue_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.due_date < date.today(),
-            Task.status.in_(["pending", "in_progress"])
-        ).count()
+        # Estadísticas de tareas: recuentos y distribuciones en una sola consulta
+        stats = await stats_service.get_task_stats(db, current_user.id)
         
         return {
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "completion_rate": round(completion_rate, 2),
-            "recent_completions": recent_completions,
-            "overdue_tasks": overdue_tasks,
+            "total_tasks": stats["total"],
+            "completed_tasks": stats["completed"],
+            "completion_rate": round(stats["completion_rate"], 2),
+            "recent_completions": stats["completed_week"],
+            "overdue_tasks": stats["overdue"],
             "priority_distribution": [
-                {"priority": stat.priority, "count": stat.count}
-                for stat in priority_stats
+                {"priority": priority, "count": count}
+                for priority, count in stats["by_priority"].items()
             ],
             "category_distribution": [
-                {"category": stat.category, "count": stat.count}
-                for stat in category_stats
+                {"category": category, "count": count}
+                for category, count in stats["by_category"].items()
             ]
         }
         
@@ -92,43 +54,17 @@ async def get_productivity_analytics(
 @router.get("/habits")
 async def get_habits_analytics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener analytics de hábitos con datos reales"""
     try:
-        # Estadísticas generales de hábitos
-        total_habits = db.query(Habit).filter(Habit.user_id == current_user.id).count()
-        active_habits = db.query(Habit).filter(
-            Habit.user_id == current_user.id,
-            Habit.is_active == True
-        ).count()
-        
-        # Hábitos completados hoy
-        today = date.today()
-        today_completions = db.query(HabitLog).join(Habit).filter(
-            Habit.user_id == current_user.id,
-            HabitLog.completed_at >= today
-        ).count()
-        
-        # Hábitos por categoría
-        category_stats = db.query(
-            Habit.category,
-            func.count(Habit.id).label('count')
-        ).filter(
-            Habit.user_id == current_user.id,
-            Habit.category.isnot(None)
-        ).group_by(Habit.category).all()
-        
-        # Hábitos por frecuencia
-        frequency_stats = db.query(
-            Habit.frequency,
-            func.count(Habit.id).label('count')
-        ).filter(Habit.user_id == current_user.id).group_by(Habit.frequency).all()
+        # Estadísticas generales, completaciones de hoy y de la semana y distribuciones
+        stats = await stats_service.get_habit_stats(db, current_user.id)
         
         # Racha más larga
-        all_logs = db.query(HabitLog).join(Habit).filter(
+        all_logs = (await db.scalars(select(HabitLog).join(Habit).where(
             Habit.user_id == current_user.id
-        ).order_by(HabitLog.completed_at).all()
+        ).order_by(HabitLog.completed_at))).all()
         
         max_streak = 0
         current_streak = 0
@@ -144,27 +80,20 @@ async def get_habits_analytics(
             max_streak = max(max_streak, current_streak)
             last_date = log_date
         
-        # Completaciones de la semana
-        week_ago = date.today() - timedelta(days=7)
-        week_completions = db.query(HabitLog).join(Habit).filter(
-            Habit.user_id == current_user.id,
-            HabitLog.completed_at >= week_ago
-        ).count()
-        
         return {
-            "total_habits": total_habits,
-            "active_habits": active_habits,
-            "today_completions": today_completions,
-            "week_completions": week_completions,
+            "total_habits": stats["total"],
+            "active_habits": stats["active"],
+            "today_completions": stats["completed_today"],
+            "week_completions": stats["completed_week"],
             "max_streak": max_streak,
             "current_streak": current_streak,
             "category_distribution": [
-                {"category": stat.category, "count": stat.count}
-                for stat in category_stats
+                {"category": category, "count": count}
+                for category, count in stats["by_category"].items()
             ],
             "frequency_distribution": [
-                {"frequency": stat.frequency, "count": stat.count}
-                for stat in frequency_stats
+                {"frequency": frequency, "count": count}
+                for frequency, count in stats["by_frequency"].items()
             ]
         }
         
@@ -178,23 +107,20 @@ async def get_habits_analytics(
 @router.get("/tasks")
 async def get_tasks_analytics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener analytics detallados de tareas"""
     try:
         # Tareas por estado
-        status_stats = db.query(
-            Task.status,
-            func.count(Task.id).label('count')
-        ).filter(Task.user_id == current_user.id).group_by(Task.status).all()
+        stats = await stats_service.get_task_stats(db, current_user.id)
         
         # Tareas por mes (últimos 6 meses)
         six_months_ago = date.today() - timedelta(days=180)
-        monthly_stats = db.query(
+        monthly_stats = (await db.execute(select(
             extract('month', Task.created_at).label('month'),
             extract('year', Task.created_at).label('year'),
             func.count(Task.id).label('count')
-        ).filter(
+        ).where(
             Task.user_id == current_user.id,
             Task.created_at >= six_months_ago
         ).group_by(
@@ -203,15 +129,15 @@ async def get_tasks_analytics(
         ).order_by(
             extract('year', Task.created_at),
             extract('month', Task.created_at)
-        ).all()
+        ))).all()
         
         # Tiempo promedio de completación
-        completed_tasks_with_time = db.query(Task).filter(
+        completed_tasks_with_time = (await db.scalars(select(Task).where(
             Task.user_id == current_user.id,
             Task.status == "completed",
             Task.completed_at.isnot(None),
             Task.created_at.isnot(None)
-        ).all()
+        ))).all()
         
         avg_completion_time = 0
         if completed_tasks_with_time:
@@ -222,16 +148,16 @@ async def get_tasks_analytics(
             avg_completion_time = total_hours / len(completed_tasks_with_time)
         
         # Tareas más urgentes (vencidas)
-        urgent_tasks = db.query(Task).filter(
+        urgent_tasks = (await db.scalars(select(Task).where(
             Task.user_id == current_user.id,
             Task.due_date < date.today(),
             Task.status.in_(["pending", "in_progress"])
-        ).order_by(Task.due_date).limit(5).all()
+        ).order_by(Task.due_date).limit(5))).all()
         
         return {
             "status_distribution": [
-                {"status": stat.status, "count": stat.count}
-                for stat in status_stats
+                {"status": task_status, "count": count}
+                for task_status, count in stats["by_status"].items()
             ],
             "monthly_trend": [
                 {
@@ -262,7 +188,7 @@ async def get_tasks_analytics(
 @router.get("/chat")
 async def get_chat_analytics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener analytics del chat"""
     try:
@@ -292,20 +218,16 @@ async def get_chat_analytics(
 @router.get("/insights")
 async def get_productivity_insights(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Obtener insights de productividad usando IA"""
     try:
         # Recopilar datos del usuario para análisis
+        stats = await user_stats_service.get_user_stats(db, current_user.id)
         user_data = {
-            "tasks_completed": db.query(Task).filter(
-                Task.user_id == current_user.id,
-                Task.status == "completed"
-            ).count(),
-            "habits_active": db.query(Habit).filter(
-                Habit.user_id == current_user.id,
-                Habit.is_active == True
-            ).count(),
+            "tasks_completed": stats["completed_tasks"],
+            "habits_active": stats["active_habits"],
             "hours_focused": 0,  # Esto se calcularía con datos de sesiones de trabajo
             "activity_pattern": "regular"
         }
@@ -328,58 +250,31 @@ async def get_productivity_insights(
 @router.get("/summary")
 async def get_analytics_summary(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener resumen general de analytics"""
     try:
-        # Estadísticas generales
-        total_tasks = db.query(Task).filter(Task.user_id == current_user.id).count()
-        completed_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.status == "completed"
-        ).count()
-        
-        total_habits = db.query(Habit).filter(Habit.user_id == current_user.id).count()
-        active_habits = db.query(Habit).filter(
-            Habit.user_id == current_user.id,
-            Habit.is_active == True
-        ).count()
+        # Estadísticas generales y completaciones de hoy (contadores de user_stats)
+        stats = await user_stats_service.get_user_stats(db, current_user.id)
         
-        # Completaciones de hoy
-        today = date.today()
-        today_task_completions = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.status == "completed",
-            Task.completed_at >= today
-        ).count()
-        
-        today_habit_completions = db.query(HabitLog).join(Habit).filter(
-            Habit.user_id == current_user.id,
-            HabitLog.completed_at >= today
-        ).count()
-        
-        # Tareas vencidas
-        overdue_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.due_date < date.today(),
-            Task.status.in_(["pending", "in_progress"])
-        ).count()
+        # Tareas vencidas: dependen del reloj, se cuentan con el índice
+        overdue_tasks = await stats_service.get_overdue_count(db, current_user.id)
         
         return {
             "overview": {
-                "total_tasks": total_tasks,
-                "completed_tasks": completed_tasks,
-                "total_habits": total_habits,
-                "active_habits": active_habits
+                "total_tasks": stats["total_tasks"],
+                "completed_tasks": stats["completed_tasks"],
+                "total_habits": stats["total_habits"],
+                "active_habits": stats["active_habits"]
             },
             "today": {
-                "task_completions": today_task_completions,
-                "habit_completions": today_habit_completions
+                "task_completions": stats["tasks_completed_today"],
+                "habit_completions": stats["habit_completions_today"]
             },
             "alerts": {
                 "overdue_tasks": overdue_tasks
             },
-            "completion_rate": round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2)
+            "completion_rate": round(stats["completion_rate"], 2)
         }
         
     except Exception as e:
@@ -4,15 +4,22 @@ Rutas para el asistente de IA con TensorFlow
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Iterator, List
+from datetime import datetime
+import json
 import logging
+import re
 
-from app.database import get_db
-from app.services.ai_service import AIService
-from app.schemas.assistant import ChatRequest, ChatResponse
+from app.database import get_async_db
+from app.services.ai_service import AIService, get_ai_service
+from app.services.inference_executor import InferenceQueueFullError
+from app.config import settings
+from app.schemas.assistant import ChatRequest, ChatBatchRequest, ChatResponse
 from app.models.user import User
 from app.services.auth_service import get_current_user
+from app.services import user_stats_service
 from app.models.task import Task
 from app.models.habit import Habit
 from app.schemas.task import TaskCreate
@@ -24,66 +31,93 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["assistant"])
 
-# Inicializar servicio de IA
-ai_service = AIService()
+async def _persist_created_items(response: Dict[str, Any], current_user: User, db: AsyncSession):
+    """Si la IA indica que se creó una tarea o un hábito, crearlo realmente en la base de datos"""
+    if response.get('task_created'):
+        logger.info(f"📝 Creando tarea en base de datos: {response['task_created']['title']}")
+        
+        task_data = response['task_created']
+        task_create = TaskCreate(
+            title=task_data['title'],
+            description=task_data['description'],
+            priority=task_data['priority'],
+            status=task_data['status'],
+            due_date=task_data.get('due_date')
+        )
+        
+        db_task = Task(**task_create.dict(), user_id=current_user.id)
+        db.add(db_task)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.task_counters(db_task))
+        await db.commit()
+        await db.refresh(db_task)
+        
+        logger.info(f"✅ Tarea creada exitosamente: {db_task.title} (ID: {db_task.id})")
+    
+    if response.get('habit_created'):
+        logger.info(f"🔄 Creando hábito en base de datos: {response['habit_created']['name']}")
+        
+        habit_data = response['habit_created']
+        habit_create = HabitCreate(
+            name=habit_data['name'],
+            description=habit_data['description'],
+            frequency=habit_data['frequency'],
+            time_of_day=habit_data.get('time_of_day', 'flexible')
+        )
+        
+        db_habit = Habit(**habit_create.dict(), user_id=current_user.id)
+        db.add(db_habit)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.habit_counters(db_habit))
+        await db.commit()
+        await db.refresh(db_habit)
+        
+        logger.info(f"✅ Hábito creado exitosamente: {db_habit.name} (ID: {db_habit.id})")
+
+def _assistant_busy_error(e: InferenceQueueFullError) -> HTTPException:
+    logger.warning(f"🚦 Asistente saturado, rechazando mensaje: {e}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="El asistente está atendiendo muchas peticiones. Inténtalo de nuevo en unos segundos.",
+        headers={"Retry-After": "1"}
+    )
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Formatear un evento de Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _chunk_text(text: str, size: int) -> Iterator[str]:
+    """Trocear el texto en fragmentos de unos `size` caracteres sin cortar palabras"""
+    chunk = ""
+    for piece in re.findall(r"\S+\s*|\s+", text):
+        chunk += piece
+        if len(chunk) >= size:
+            yield chunk
+            chunk = ""
+    if chunk:
+        yield chunk
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_assistant(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Chat con el asistente de IA usando TensorFlow"""
     try:
         logger.info(f"🧠 Procesando mensaje de usuario {current_user.id}: {request.message[:50]}...")
         
-        # Procesar mensaje con TensorFlow
-        response = ai_service.process_message(
-            message=request.message,
-            user_id=str(current_user.id),
-            user_context={"user_id": current_user.id, "email": current_user.email}
-        )
-        
-        # Si la IA indica que se creó una tarea, crearla realmente en la base de datos
-        if response.get('task_created'):
-            logger.info(f"📝 Creando tarea en base de datos: {response['task_created']['title']}")
-            
-            task_data = response['task_created']
-            task_create = TaskCreate(
-                title=task_data['title'],
-                description=task_data['description'],
-                priority=task_data['priority'],
-                status=task_data['status'],
-                due_date=task_data.get('due_date'),
-                user_id=current_user.id
+        # Procesar mensaje con TensorFlow fuera del event loop (la inferencia se agrupa por lotes)
+        try:
+            response = await ai_service.aprocess_message(
+                message=request.message,
+                user_id=str(current_user.id),
+                user_context={"user_id": current_user.id, "email": current_user.email, "timezone": request.timezone}
             )
-            
-            db_task = Task(**task_create.dict())
-            db.add(db_task)
-            db.commit()
-            db.refresh(db_task)
-            
-            logger.info(f"✅ Tarea creada exitosamente: {db_task.title} (ID: {db_task.id})")
+        except InferenceQueueFullError as e:
+            raise _assistant_busy_error(e)
         
-        # Si la IA indica que se creó un hábito, crearlo realmente en la base de datos
-        if response.get('habit_created'):
-            logger.info(f"🔄 Creando hábito en base de datos: {response['habit_created']['name']}")
-            
-            habit_data = response['habit_created']
-            habit_create = HabitCreate(
-                name=habit_data['name'],
-                description=habit_data['description'],
-                frequency=habit_data['frequency'],
-                time_of_day=habit_data.get('time_of_day', 'flexible'),
-                user_id=current_user.id
-            )
-            
-            db_habit = Habit(**habit_create.dict())
-            db.add(db_habit)
-            db.commit()
-            db.refresh(db_habit)
-            
-            logger.info(f"✅ Hábito creado exitosamente: {db_habit.name} (ID: {db_habit.id})")
+        # Crear en la base de datos la tarea o el hábito que haya creado la IA
+        await _persist_created_items(response, current_user, db)
         
         logger.info(f"✅ Respuesta generada - Intención: {response.get('intent')}")
         
@@ -110,8 +144,135 @@ async def chat_with_assistant(
             detail=f"Error procesando mensaje: {str(e)}"
         )
 
+@router.post("/chat/stream")
+async def chat_stream_with_assistant(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """Chat con la respuesta en streaming (Server-Sent Events)
+    
+    Eventos: `classification` (intención y sugerencias, en cuanto termina la clasificación),
+    `meta` (sentimiento, sugerencias finales y tareas o hábitos creados), `chunk`
+    (fragmentos del texto) y `done`. Si algo falla con el stream ya abierto se envía `error`.
+    """
+    if ai_service.executor.is_saturated:
+        raise _assistant_busy_error(InferenceQueueFullError(f"{ai_service.executor.pending} peticiones pendientes"))
+    
+    logger.info(f"🧠 Procesando mensaje (stream) de usuario {current_user.id}: {request.message[:50]}...")
+    user_id = str(current_user.id)
+    user_context = {"user_id": current_user.id, "email": current_user.email, "timezone": request.timezone}
+    
+    async def event_stream():
+        try:
+            # Rasgos del mensaje una sola vez para la clasificación y la respuesta
+            features = await ai_service.abuild_features(request.message)
+            prediction = await ai_service.aclassify(request.message, features)
+            if prediction is not None:
+                yield _sse_event("classification", {
+                    "intent": prediction.get("intent"),
+                    "confidence": prediction.get("confidence"),
+                    "intent_tier": prediction.get("tier"),
+                    "model_version": prediction.get("model_version"),
+                    "suggestions": ai_service.get_suggestions(prediction.get("intent"))
+                })
+            
+            # Ya clasificado: aunque la predicción sea None, no se vuelve a pasar por el batcher
+            response = await ai_service.aprocess_message(
+                message=request.message,
+                user_id=user_id,
+                user_context=user_context,
+                prediction=prediction,
+                classify=False,
+                features=features
+            )
+            await _persist_created_items(response, current_user, db)
+            
+            text = response.get("response") or ""
+            yield _sse_event("meta", {key: value for key, value in response.items() if key != "response"})
+            for chunk in _chunk_text(text, settings.AI_STREAM_CHUNK_CHARS):
+                yield _sse_event("chunk", {"text": chunk})
+            yield _sse_event("done", {"length": len(text)})
+            
+            logger.info(f"✅ Respuesta enviada en streaming - Intención: {response.get('intent')}")
+            
+        except InferenceQueueFullError as e:
+            logger.warning(f"🚦 Asistente saturado, cortando el stream: {e}")
+            yield _sse_event("error", {
+                "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                "detail": "El asistente está atendiendo muchas peticiones. Inténtalo de nuevo en unos segundos."
+            })
+        except Exception as e:
+            logger.error(f"❌ Error en chat con asistente (stream): {e}")
+            yield _sse_event("error", {
+                "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "detail": f"Error procesando mensaje: {str(e)}"
+            })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chat/batch", response_model=ChatResponse)
+async def chat_batch_with_assistant(
+    request: ChatBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """Procesar varios mensajes del usuario en una sola petición (repeticiones, clasificación nocturna)
+    
+    Los mensajes se clasifican juntos y se responden en orden, con el mismo historial
+    de conversación que si se hubieran enviado uno a uno a /chat.
+    """
+    if not request.messages:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La lista de mensajes está vacía")
+    if len(request.messages) > settings.AI_CHAT_BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se permiten como máximo {settings.AI_CHAT_BATCH_MAX_MESSAGES} mensajes por petición"
+        )
+    
+    try:
+        logger.info(f"🧠 Procesando lote de {len(request.messages)} mensajes de usuario {current_user.id}")
+        
+        try:
+            responses = await ai_service.aprocess_messages(
+                messages=request.messages,
+                user_id=str(current_user.id),
+                user_context={"user_id": current_user.id, "email": current_user.email, "timezone": request.timezone}
+            )
+        except InferenceQueueFullError as e:
+            raise _assistant_busy_error(e)
+        
+        for response in responses:
+            await _persist_created_items(response, current_user, db)
+        
+        results: List[Dict[str, Any]] = [
+            {"message": message, **response} for message, response in zip(request.messages, responses)
+        ]
+        logger.info(f"✅ Lote procesado - {len(results)} respuestas")
+        
+        return ChatResponse(
+            success=True,
+            message="Mensajes procesados exitosamente",
+            data={"count": len(results), "results": results}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error en el lote de mensajes: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error procesando mensajes: {str(e)}"
+        )
+
 @router.get("/model-info")
-async def get_model_info():
+async def get_model_info(ai_service: AIService = Depends(get_ai_service)):
     """Obtener información del modelo de TensorFlow"""
     try:
         model_info = ai_service.get_model_info()
@@ -127,8 +288,17 @@ async def get_model_info():
             detail=f"Error obteniendo información del modelo: {str(e)}"
         )
 
+@router.get("/metrics")
+async def get_assistant_metrics(ai_service: AIService = Depends(get_ai_service)):
+    """Obtener métricas de rendimiento de la inferencia"""
+    return {
+        "success": True,
+        "message": "Métricas del asistente obtenidas",
+        "data": ai_service.get_stats()
+    }
+
 @router.get("/health")
-async def assistant_health():
+async def assistant_health(ai_service: AIService = Depends(get_ai_service)):
     """Verificar estado del asistente de IA"""
     try:
         model_info = ai_service.get_model_info()
@@ -139,8 +309,9 @@ async def assistant_health():
             "message": "Estado del asistente verificado",
             "data": {
                 "status": "healthy" if is_healthy else "unhealthy",
+                "ready": ai_service.is_ready,
                 "model_info": model_info,
-                "timestamp": "2025-01-15T00:00:00Z"
+                "timestamp": datetime.utcnow().isoformat()
             }
         }
     except Exception as e:
@@ -151,6 +322,6 @@ async def assistant_health():
             "data": {
                 "status": "unhealthy",
                 "error": str(e),
-                "timestamp": "2025-01-15T00:00:00Z"
+                "timestamp": datetime.utcnow().isoformat()
             }
         }
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import Optional
 import re
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
 from app.services.auth_service import (
     authenticate_user, 
@@ -29,7 +29,7 @@ router = APIRouter()
 security = HTTPBearer()
 
 @router.post("/register", response_model=TokenResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Registra un nuevo usuario"""
     try:
         # Validar email
@@ -40,7 +40,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
             )
         
         # Verificar si el usuario ya existe
-        existing_user = get_user_by_email(db, user_data.email)
+        existing_user = await get_user_by_email(db, user_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,7 +55,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
             )
         
         # Crear usuario
-        user = create_user(
+        user = await create_user(
             db=db,
             email=user_data.email,
             password=user_data.password,
@@ -89,11 +89,11 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=TokenResponse)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Autentica un usuario y retorna un token"""
     try:
         # Autenticar usuario
-        user = authenticate_user(db, user_data.email, user_data.password)
+        user = await authenticate_user(db, user_data.email, user_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -134,11 +134,11 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         )
 
 @router.post("/forgot-password")
-async def forgot_password(email: str, db: Session = Depends(get_db)):
+async def forgot_password(email: str, db: AsyncSession = Depends(get_async_db)):
     """Envía un email para restablecer la contraseña"""
     try:
         # Verificar si el usuario existe
-        user = get_user_by_email(db, email)
+        user = await get_user_by_email(db, email)
         if not user:
             # Por seguridad, no revelar si el email existe o no
             return {"message": "Si el email existe, se enviará un enlace de restablecimiento"}
@@ -159,12 +159,12 @@ async def forgot_password(email: str, db: Session = Depends(get_db)):
 @router.post("/reset-password")
 async def reset_password(
     reset_data: PasswordReset,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Restablece la contraseña del usuario"""
     try:
         # Verificar si el usuario existe
-        user = get_user_by_email(db, reset_data.email)
+        user = await get_user_by_email(db, reset_data.email)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -179,7 +179,7 @@ async def reset_password(
             )
         
         # Actualizar contraseña
-        success = update_user_password(db, user.id, reset_data.new_password)
+        success = await update_user_password(db, user.id, reset_data.new_password)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -223,14 +223,14 @@ async def logout(current_user: User = Depends(get_current_user)):
 async def update_user_info(
     user_data: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualiza la información del usuario actual"""
     try:
         # Validar email si se proporciona
         if user_data.email and user_data.email != current_user.email:
             # Verificar si el email ya está en uso
-            existing_user = get_user_by_email(db, user_data.email)
+            existing_user = await get_user_by_email(db, user_data.email)
             if existing_user and existing_user.id != current_user.id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -250,8 +250,8 @@ async def update_user_info(
         if user_data.email is not None:
             current_user.email = user_data.email
         
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(current_user)
         
         return UserResponse(
             id=current_user.id,
@@ -263,7 +263,7 @@ async def update_user_info(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor"
@@ -273,12 +273,12 @@ async def update_user_info(
 async def change_password(
     password_data: PasswordUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cambia la contraseña del usuario actual"""
     try:
         # Verificar contraseña actual
-        if not authenticate_user(db, current_user.email, password_data.current_password):
+        if not await authenticate_user(db, current_user.email, password_data.current_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Contraseña actual incorrecta"
@@ -292,7 +292,7 @@ async def change_password(
             )
         
         # Actualizar contraseña
-        success = update_user_password(db, current_user.id, password_data.new_password)
+        success = await update_user_password(db, current_user.id, password_data.new_password)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -312,13 +312,13 @@ async def change_password(
 @router.delete("/me")
 async def delete_account(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Elimina la cuenta del usuario actual"""
     try:
         # Desactivar usuario en lugar de eliminarlo
         current_user.is_active = False
-        db.commit()
+        await db.commit()
         
         return {"message": "Cuenta eliminada exitosamente"}
         
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date
 import logging
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
 from app.services.auth_service import get_current_user
+from app.services import user_stats_service
 from app.models.habit import Habit, HabitLog
 from app.schemas.habit import HabitCreate, HabitUpdate, HabitResponse, HabitLogCreate
 
@@ -20,7 +22,7 @@ router = APIRouter()
 async def create_habit(
     habit_data: HabitCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear un nuevo hábito"""
     try:
@@ -35,8 +37,9 @@ async def create_habit(
         )
         
         db.add(db_habit)
-        db.commit()
-        db.refresh(db_habit)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.habit_counters(db_habit))
+        await db.commit()
+        await db.refresh(db_habit)
         
         return HabitResponse.model_validate(db_habit)
         
@@ -52,18 +55,18 @@ async def get_habits(
     category: Optional[str] = None,
     frequency: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener hábitos del usuario"""
     try:
-        query = db.query(Habit).filter(Habit.user_id == current_user.id)
+        query = select(Habit).where(Habit.user_id == current_user.id)
         
         if category:
-            query = query.filter(Habit.category == category)
+            query = query.where(Habit.category == category)
         if frequency:
-            query = query.filter(Habit.frequency == frequency)
+            query = query.where(Habit.frequency == frequency)
         
-        habits = query.order_by(Habit.created_at.desc()).all()
+        habits = (await db.scalars(query.order_by(Habit.created_at.desc()))).all()
         return [HabitResponse.model_validate(habit) for habit in habits]
         
     except Exception as e:
@@ -77,14 +80,14 @@ async def get_habits(
 async def get_habit(
     habit_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener un hábito específico"""
     try:
-        habit = db.query(Habit).filter(
+        habit = await db.scalar(select(Habit).where(
             Habit.id == habit_id,
             Habit.user_id == current_user.id
-        ).first()
+        ))
         
         if not habit:
             raise HTTPException(
@@ -108,14 +111,14 @@ async def update_habit(
     habit_id: int,
     habit_data: HabitUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar un hábito"""
     try:
-        habit = db.query(Habit).filter(
+        habit = await db.scalar(select(Habit).where(
             Habit.id == habit_id,
             Habit.user_id == current_user.id
-        ).first()
+        ))
         
         if not habit:
             raise HTTPException(
@@ -124,12 +127,16 @@ async def update_habit(
             )
         
         # Actualizar campos
+        counters_before = user_stats_service.habit_counters(habit)
         for field, value in habit_data.dict(exclude_unset=True).items():
             setattr(habit, field, value)
         
         habit.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(habit)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.counter_deltas(
+            counters_before, user_stats_service.habit_counters(habit)
+        ))
+        await db.commit()
+        await db.refresh(habit)
         
         return HabitResponse.model_validate(habit)
         
@@ -146,14 +153,14 @@ async def update_habit(
 async def delete_habit(
     habit_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar un hábito"""
     try:
-        habit = db.query(Habit).filter(
+        habit = await db.scalar(select(Habit).where(
             Habit.id == habit_id,
             Habit.user_id == current_user.id
-        ).first()
+        ))
         
         if not habit:
             raise HTTPException(
@@ -161,8 +168,18 @@ async def delete_habit(
                 detail="Hábito no encontrado"
             )
         
-        db.delete(habit)
-        db.commit()
+        # El hábito deja de contar, y con él sus registros de hoy
+        counters_before = user_stats_service.habit_counters(habit)
+        counters_before["habit_completions_today"] = await db.scalar(select(func.count(HabitLog.id)).where(
+            HabitLog.habit_id == habit.id,
+            HabitLog.completed_at >= date.today()
+        ))
+        
+        await db.delete(habit)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.counter_deltas(
+            counters_before, {}
+        ))
+        await db.commit()
         
         return {"message": "Hábito eliminado exitosamente"}
         
@@ -180,14 +197,14 @@ async def log_habit_completion(
     habit_id: int,
     log_data: HabitLogCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Registrar la completación de un hábito"""
     try:
-        habit = db.query(Habit).filter(
+        habit = await db.scalar(select(Habit).where(
             Habit.id == habit_id,
             Habit.user_id == current_user.id
-        ).first()
+        ))
         
         if not habit:
             raise HTTPException(
@@ -202,7 +219,8 @@ async def log_habit_completion(
         )
         
         db.add(habit_log)
-        db.commit()
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.habit_log_counters(habit_log))
+        await db.commit()
         
         return {"message": "Hábito registrado como completado"}
         
@@ -219,14 +237,14 @@ async def log_habit_completion(
 async def get_habit_logs(
     habit_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener logs de un hábito específico"""
     try:
-        habit = db.query(Habit).filter(
+        habit = await db.scalar(select(Habit).where(
             Habit.id == habit_id,
             Habit.user_id == current_user.id
-        ).first()
+        ))
         
         if not habit:
             raise HTTPException(
@@ -234,9 +252,9 @@ async def get_habit_logs(
                 detail="Hábito no encontrado"
             )
         
-        logs = db.query(HabitLog).filter(
+        logs = (await db.scalars(select(HabitLog).where(
             HabitLog.habit_id == habit_id
-        ).order_by(HabitLog.completed_at.desc()).all()
+        ).order_by(HabitLog.completed_at.desc()))).all()
         
         return [
             {
@@ -259,27 +277,17 @@ async def get_habit_logs(
 @router.get("/stats/summary")
 async def get_habit_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener estadísticas de hábitos"""
     try:
-        total_habits = db.query(Habit).filter(Habit.user_id == current_user.id).count()
-        active_habits = db.query(Habit).filter(
-            Habit.user_id == current_user.id,
-            Habit.is_active == True
-        ).count()
-        
-        # Calcular hábitos completados hoy
-        today = date.today()
-        today_logs = db.query(HabitLog).join(Habit).filter(
-            Habit.user_id == current_user.id,
-            HabitLog.completed_at >= today
-        ).count()
+        # Totales y hábitos completados hoy (contadores de user_stats)
+        stats = await user_stats_service.get_user_stats(db, current_user.id)
         
         # Calcular racha más larga
-        all_logs = db.query(HabitLog).join(Habit).filter(
+        all_logs = (await db.scalars(select(HabitLog).join(Habit).where(
             Habit.user_id == current_user.id
-        ).order_by(HabitLog.completed_at).all()
+        ).order_by(HabitLog.completed_at))).all()
         
         max_streak = 0
         current_streak = 0
@@ -296,9 +304,9 @@ async def get_habit_stats(
             last_date = log_date
         
         return {
-            "total_habits": total_habits,
-            "active_habits": active_habits,
-            "completed_today": today_logs,
+            "total_habits": stats["total_habits"],
+            "active_habits": stats["active_habits"],
+            "completed_today": stats["habit_completions_today"],
             "max_streak": max_streak,
             "current_streak": current_streak
         }
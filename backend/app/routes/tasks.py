@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime
 import logging
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
 from app.services.auth_service import get_current_user
+from app.services import stats_service, user_stats_service
 from app.models.task import Task
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
 
@@ -20,7 +22,7 @@ router = APIRouter()
 async def create_task(
     task_data: TaskCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crear una nueva tarea"""
     try:
@@ -36,8 +38,9 @@ async def create_task(
         )
         
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.task_counters(db_task))
+        await db.commit()
+        await db.refresh(db_task)
         
         return TaskResponse.model_validate(db_task)
         
@@ -54,20 +57,20 @@ async def get_tasks(
     priority: Optional[str] = None,
     category: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener tareas del usuario"""
     try:
-        query = db.query(Task).filter(Task.user_id == current_user.id)
+        query = select(Task).where(Task.user_id == current_user.id)
         
         if status:
-            query = query.filter(Task.status == status)
+            query = query.where(Task.status == status)
         if priority:
-            query = query.filter(Task.priority == priority)
+            query = query.where(Task.priority == priority)
         if category:
-            query = query.filter(Task.category == category)
+            query = query.where(Task.category == category)
         
-        tasks = query.order_by(Task.created_at.desc()).all()
+        tasks = (await db.scalars(query.order_by(Task.created_at.desc()))).all()
         return [TaskResponse.model_validate(task) for task in tasks]
         
     except Exception as e:
@@ -81,14 +84,14 @@ async def get_tasks(
 async def get_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener una tarea específica"""
     try:
-        task = db.query(Task).filter(
+        task = await db.scalar(select(Task).where(
             Task.id == task_id,
             Task.user_id == current_user.id
-        ).first()
+        ))
         
         if not task:
             raise HTTPException(
@@ -112,14 +115,14 @@ async def update_task(
     task_id: int,
     task_data: TaskUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar una tarea"""
     try:
-        task = db.query(Task).filter(
+        task = await db.scalar(select(Task).where(
             Task.id == task_id,
             Task.user_id == current_user.id
-        ).first()
+        ))
         
         if not task:
             raise HTTPException(
@@ -128,12 +131,16 @@ async def update_task(
             )
         
         # Actualizar campos
+        counters_before = user_stats_service.task_counters(task)
         for field, value in task_data.dict(exclude_unset=True).items():
             setattr(task, field, value)
         
         task.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(task)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.counter_deltas(
+            counters_before, user_stats_service.task_counters(task)
+        ))
+        await db.commit()
+        await db.refresh(task)
         
         return TaskResponse.model_validate(task)
         
@@ -150,14 +157,14 @@ async def update_task(
 async def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar una tarea"""
     try:
-        task = db.query(Task).filter(
+        task = await db.scalar(select(Task).where(
             Task.id == task_id,
             Task.user_id == current_user.id
-        ).first()
+        ))
         
         if not task:
             raise HTTPException(
@@ -165,8 +172,11 @@ async def delete_task(
                 detail="Tarea no encontrada"
             )
         
-        db.delete(task)
-        db.commit()
+        await db.delete(task)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.counter_deltas(
+            user_stats_service.task_counters(task), {}
+        ))
+        await db.commit()
         
         return {"message": "Tarea eliminada exitosamente"}
         
@@ -183,14 +193,14 @@ async def delete_task(
 async def complete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marcar una tarea como completada"""
     try:
-        task = db.query(Task).filter(
+        task = await db.scalar(select(Task).where(
             Task.id == task_id,
             Task.user_id == current_user.id
-        ).first()
+        ))
         
         if not task:
             raise HTTPException(
@@ -198,12 +208,16 @@ async def complete_task(
                 detail="Tarea no encontrada"
             )
         
+        counters_before = user_stats_service.task_counters(task)
         task.status = "completed"
         task.completed_at = datetime.utcnow()
         task.updated_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(task)
+        await user_stats_service.apply_deltas(db, current_user.id, user_stats_service.counter_deltas(
+            counters_before, user_stats_service.task_counters(task)
+        ))
+        await db.commit()
+        await db.refresh(task)
         
         return {"message": "Tarea marcada como completada"}
         
@@ -219,33 +233,20 @@ async def complete_task(
 @router.get("/stats/summary")
 async def get_task_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener estadísticas de tareas"""
     try:
-        total_tasks = db.query(Task).filter(Task.user_id == current_user.id).count()
-        completed_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.status == "completed"
-        ).count()
-        pending_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.status == "pending"
-        ).count()
-        overdue_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.due_date < date.today(),
-            Task.status.in_(["pending", "in_progress"])
-        ).count()
-        
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        # Contadores de user_stats; las vencidas dependen del reloj y se cuentan con el índice
+        stats = await user_stats_service.get_user_stats(db, current_user.id)
+        overdue_tasks = await stats_service.get_overdue_count(db, current_user.id)
         
         return {
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "pending_tasks": pending_tasks,
+            "total_tasks": stats["total_tasks"],
+            "completed_tasks": stats["completed_tasks"],
+            "pending_tasks": stats["pending_tasks"],
             "overdue_tasks": overdue_tasks,
-            "completion_rate": round(completion_rate, 2)
+            "completion_rate": round(stats["completion_rate"], 2)
         }
         
     except Exception as e:
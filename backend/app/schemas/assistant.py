@@ -1,8 +1,13 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class ChatRequest(BaseModel):
     message: str
+    timezone: Optional[str] = None  # zona IANA del dispositivo, p. ej. "Europe/Madrid"
+
+class ChatBatchRequest(BaseModel):
+    messages: List[str]
+    timezone: Optional[str] = None
 
 class CreateTaskRequest(BaseModel):
     description: str
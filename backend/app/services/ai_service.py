@@ -3,33 +3,275 @@
 Servicio principal de IA - Integración con TensorFlow ML
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime
-from .tensorflow_ai_service import TensorFlowAIService
+
+from app.config import settings
+from .inference_batcher import InferenceBatcher
+from .inference_executor import InferenceExecutor
+from .message_features import MessageFeatures
+from .model_manager import ModelManager
 
 logger = logging.getLogger(__name__)
 
+# Mensajes representativos para recorrer todas las ramas del pipeline antes de recibir tráfico
+WARMUP_MESSAGES = [
+    "hola",
+    "ver mis tareas",
+    "crear tarea",
+    "me siento mal y no puedo más con el trabajo",
+    "hoy conseguí terminar mi proyecto y estoy muy feliz",
+    "necesito consejos de productividad",
+    "gracias"
+]
+WARMUP_USER_ID = "__warmup__"
+
 class AIService:
     def __init__(self):
-        """Inicializar servicio de IA con TensorFlow"""
+        """Crear el motor de IA sin cargar el modelo todavía"""
+        self.tensorflow_ai = None
+        self.status = "not_loaded"  # not_loaded, loading, ready, failed
+        self.loaded_at = None
+        self.warmed_up = False
+        self.warmup_ms = None
+        self.warmup_error = None
+        self._init_lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        # Cada proceso hijo tiene su propio motor: el historial (y la pregunta pendiente de
+        # "crear tarea") solo sobrevive entre mensajes si está en un backend compartido
+        if settings.AI_EXECUTOR_MODE == "process" and settings.CONVERSATION_STORE_BACKEND != "sqlite":
+            raise ValueError("AI_EXECUTOR_MODE=process requiere CONVERSATION_STORE_BACKEND=sqlite")
+        self.batcher = InferenceBatcher(
+            self._predict_batch,
+            window_ms=settings.AI_BATCH_WINDOW_MS,
+            max_batch_size=settings.AI_BATCH_MAX_SIZE
+        )
+        self.executor = InferenceExecutor(
+            self.process_message,
+            mode=settings.AI_EXECUTOR_MODE,
+            max_workers=settings.AI_EXECUTOR_WORKERS,
+            max_pending=settings.AI_EXECUTOR_MAX_PENDING,
+            timeout_seconds=settings.AI_INFERENCE_TIMEOUT_SECONDS,
+            process_batch=self.process_messages
+        )
+        self.model_manager = ModelManager(self)
+    
+    @property
+    def is_loaded(self) -> bool:
+        """La carga terminó (con o sin TensorFlow): no hay que volver a intentarla"""
+        return self.status in ["ready", "failed"]
+    
+    @property
+    def is_ready(self) -> bool:
+        """El modelo de TensorFlow se cargó correctamente"""
+        return self.status == "ready"
+    
+    def initialize(self):
+        """Cargar el modelo de TensorFlow una sola vez por proceso"""
+        if self.is_loaded:
+            return
+        
+        with self._init_lock:
+            if self.is_loaded:
+                return
+            
+            self.status = "loading"
+            try:
+                logger.info("🧠 Inicializando servicio de IA con TensorFlow...")
+                # Import diferido: numpy/scipy/sklearn/TensorFlow solo se cargan en los workers que usan IA
+                from .tensorflow_ai_service import TensorFlowAIService
+                
+                self.tensorflow_ai = TensorFlowAIService()
+                self.status = "ready"
+                logger.info("✅ Servicio de IA con TensorFlow inicializado exitosamente")
+            except Exception as e:
+                logger.error(f"❌ Error inicializando servicio de IA: {e}")
+                self.tensorflow_ai = None
+                self.status = "failed"
+            self.loaded_at = datetime.utcnow()
+    
+    def warm_up(self, include_executor: bool = True):
+        """Cargar el modelo y pasar mensajes representativos por `process_message`
+
+        Con `include_executor` también arranca el pool del ejecutor (en modo proceso,
+        cada hijo carga y calienta su propio modelo).
+        """
+        if self.warmed_up:
+            return
+        
+        with self._warmup_lock:
+            if self.warmed_up:
+                return
+            
+            self.initialize()
+            started = time.perf_counter()
+            logger.info("🔥 Calentando el motor de IA...")
+            try:
+                if self.tensorflow_ai is not None:
+                    # Ruta por lotes (la que usa el batcher) y ruta de un solo mensaje
+                    self.tensorflow_ai._predict_intents(WARMUP_MESSAGES)
+                for message in WARMUP_MESSAGES:
+                    self.process_message(message, WARMUP_USER_ID)
+                if include_executor:
+                    self.executor.warm_up()
+            except Exception as e:
+                logger.error(f"❌ Error calentando el motor de IA: {e}")
+                self.warmup_error = str(e)
+            finally:
+                if self.tensorflow_ai is not None:
+                    self.tensorflow_ai.conversation_store.clear(WARMUP_USER_ID)
+            
+            self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.warmed_up = True
+            if self.is_ready and self.warmup_error is None:
+                logger.info(f"✅ Motor de IA listo para recibir tráfico (calentamiento: {self.warmup_ms} ms)")
+            else:
+                logger.error(f"❌ Motor de IA no disponible tras el calentamiento (modelo: {self.status})")
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Estado de preparación para el balanceador de carga
+
+        Listo solo si el modelo cargó y el calentamiento terminó sin errores: un worker
+        cuyo modelo falló sigue fuera del balanceador.
+        """
+        return {
+            "ready": self.is_ready and self.warmed_up and self.warmup_error is None,
+            "model_status": self.status,
+            "warmed_up": self.warmed_up,
+            "warmup_ms": self.warmup_ms,
+            "warmup_error": self.warmup_error
+        }
+    
+    def _predict_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predicción por lotes usada por el batcher (solo mensajes que necesitan el modelo)"""
+        return self.tensorflow_ai.intent_classifier.predict_with_model(texts)
+    
+    async def abuild_features(self, message: str) -> Optional[MessageFeatures]:
+        """Rasgos del mensaje para la clasificación y la respuesta (None si no hay modelo)"""
+        if not self.is_loaded:
+            await asyncio.to_thread(self.initialize)
+        
+        if self.tensorflow_ai is None:
+            return None
+        return self.tensorflow_ai.build_features(message)
+    
+    async def aclassify(self, message: str, features: Optional[MessageFeatures] = None) -> Optional[Dict[str, Any]]:
+        """Clasificar la intención sin bloquear el event loop
+        
+        Tabla exacta y reglas en el momento; el resto pasa por el batcher (o por un hilo
+        si está desactivado). Devuelve None si no hay modelo o la predicción falló: el
+        pipeline clasificará después.
+        """
+        if features is None:
+            features = await self.abuild_features(message)
+        if features is None:
+            return None
+        
+        # Tabla exacta y reglas: sin esperar la ventana del batcher
+        prediction = self.tensorflow_ai.intent_classifier.predict_fast(features)
+        
+        if prediction is None:
+            try:
+                if settings.AI_BATCHING_ENABLED:
+                    prediction = await self.batcher.predict(features.normalized)
+                else:
+                    predictions = await asyncio.to_thread(
+                        self.tensorflow_ai.intent_classifier.predict_with_model, [features.normalized]
+                    )
+                    prediction = predictions[0]
+            except Exception as e:
+                logger.error(f"❌ Error en el batcher de inferencia: {e}")
+        return prediction
+    
+    def get_suggestions(self, intent: str) -> List[str]:
+        """Sugerencias para una intención, disponibles antes de generar la respuesta"""
+        if self.tensorflow_ai is None:
+            return []
+        return self.tensorflow_ai._generate_smart_suggestions(intent, {})
+    
+    async def aprocess_message(self, message: str, user_id: str = None, user_context: Dict = None,
+                               prediction: Optional[Dict[str, Any]] = None,
+                               classify: bool = True,
+                               features: Optional[MessageFeatures] = None) -> Dict[str, Any]:
+        """Procesar mensaje sin bloquear el event loop
+
+        La inferencia se agrupa por lotes y el resto del pipeline corre en el ejecutor
+        dedicado, con los mismos rasgos del mensaje que la clasificación. Con
+        `classify=False` se usa `prediction` tal cual: el llamador ya clasificó el
+        mensaje con `aclassify`. Lanza `InferenceQueueFullError` si el ejecutor está saturado.
+        """
+        if features is None:
+            features = await self.abuild_features(message)
+        if prediction is None and classify:
+            prediction = await self.aclassify(message, features)
+        
         try:
-            logger.info("🧠 Inicializando servicio de IA con TensorFlow...")
-            self.tensorflow_ai = TensorFlowAIService()
-            logger.info("✅ Servicio de IA con TensorFlow inicializado exitosamente")
+            return await self.executor.run(message, user_id, user_context, prediction=prediction, features=features)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ El procesamiento superó {self.executor.timeout_seconds}s")
+            return self._generate_fallback_response(message)
+    
+    async def aprocess_messages(self, messages: List[str], user_id: str = None,
+                                user_context: Dict = None) -> List[Dict[str, Any]]:
+        """Procesar varios mensajes de un usuario en un solo trabajo del ejecutor
+        
+        Lanza `InferenceQueueFullError` si el ejecutor está saturado.
+        """
+        if not self.is_loaded:
+            await asyncio.to_thread(self.initialize)
+        
+        try:
+            return await self.executor.run_batch(messages, user_id, user_context)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ El lote de {len(messages)} mensajes superó el tiempo máximo")
+            return [self._generate_fallback_response(message) for message in messages]
+    
+    def process_messages(self, messages: List[str], user_id: str = None,
+                         user_context: Dict = None) -> List[Dict[str, Any]]:
+        """Procesar varios mensajes de un usuario con una sola clasificación por lotes
+        
+        Las intenciones se predicen juntas (una matriz dispersa y una llamada al modelo);
+        las respuestas se generan en orden, así que el historial de la conversación
+        evoluciona igual que si los mensajes llegaran uno a uno.
+        """
+        self.initialize()
+        
+        if self.tensorflow_ai is None:
+            logger.error("❌ Servicio de TensorFlow no disponible")
+            return [self._generate_fallback_response(message) for message in messages]
+        
+        # Rasgos de cada mensaje calculados una vez para la clasificación y la respuesta
+        features = [self.tensorflow_ai.build_features(message) for message in messages]
+        try:
+            predictions = self.tensorflow_ai.intent_classifier.predict(features)
         except Exception as e:
-            logger.error(f"❌ Error inicializando servicio de IA: {e}")
-            self.tensorflow_ai = None
+            logger.error(f"❌ Error clasificando el lote de mensajes: {e}")
+            predictions = [None] * len(messages)
+        
+        return [
+            self.process_message(message, user_id, user_context, prediction=prediction, features=message_features)
+            for message, prediction, message_features in zip(messages, predictions, features)
+        ]
     
-    def process_message(self, message: str, user_id: str = None, user_context: Dict = None) -> Dict[str, Any]:
+    def process_message(self, message: str, user_id: str = None, user_context: Dict = None,
+                        prediction: Optional[Dict[str, Any]] = None,
+                        features: Optional[MessageFeatures] = None) -> Dict[str, Any]:
         """Procesar mensaje usando TensorFlow ML"""
         try:
+            self.initialize()
+            
             if self.tensorflow_ai is None:
                 logger.error("❌ Servicio de TensorFlow no disponible")
                 return self._generate_fallback_response(message)
             
             # Procesar mensaje con TensorFlow
-            response = self.tensorflow_ai.process_message(message, user_id, user_context)
+            response = self.tensorflow_ai.process_message(
+                message, user_id, user_context, prediction=prediction, features=features
+            )
             
             logger.info(f"✅ Mensaje procesado con TensorFlow - Intención: {response.get('intent')}")
             return response
@@ -50,16 +292,48 @@ class AIService:
             "sentiment_confidence": 0.6,
             "suggestions": ["Me siento bien", "Me siento mal", "Necesito motivación"],
             "entities": {},
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow().isoformat(),
+            "model_version": None,
+            "intent_tier": None
         }
-    
+
+    def get_productivity_insights(self, user_data: Dict[str, Any]) -> List[str]:
+        """Generar insights de productividad a partir de los contadores del usuario"""
+        insights = []
+        tasks_completed = user_data.get("tasks_completed", 0)
+        habits_active = user_data.get("habits_active", 0)
+
+        if tasks_completed == 0:
+            insights.append("Empieza por una tarea pequeña: completarla hoy te dará impulso para las siguientes")
+        elif tasks_completed < 10:
+            insights.append("Vas por buen camino con tus tareas. Organizarlas por prioridad te ayudará a avanzar más rápido")
+        else:
+            insights.append(f"¡Ya has completado {tasks_completed} tareas! Mantén el ritmo dividiendo las tareas grandes en pasos pequeños")
+
+        if habits_active == 0:
+            insights.append("Establecer un hábito diario, aunque sea de 5 minutos, es la base del progreso a largo plazo")
+        elif habits_active > 5:
+            insights.append(f"Tienes {habits_active} hábitos activos. Centrarte en los más importantes hace más fácil mantenerlos")
+        else:
+            insights.append(f"Tienes {habits_active} hábitos activos. La constancia diaria es lo que los convierte en rutina")
+
+        return insights
+
     def get_model_info(self) -> Dict[str, Any]:
         """Obtener información del modelo de TensorFlow"""
         try:
-            if self.tensorflow_ai and self.tensorflow_ai.model:
+            if not self.is_loaded:
+                return {
+                    "model_type": "TensorFlow Neural Network",
+                    "status": self.status,
+                    "message": "TensorFlow model not loaded yet"
+                }
+            elif self.tensorflow_ai and self.tensorflow_ai.intent_engine:
                 return {
                     "model_type": "TensorFlow Neural Network",
                     "status": "active",
+                    "model_version": self.tensorflow_ai.model_version,
+                    "inference_backend": self.tensorflow_ai.inference_backend,
                     "features": [
                         "Intent Classification",
                         "Sentiment Analysis", 
@@ -70,14 +344,15 @@ class AIService:
                     ],
                     "training_data_size": len(self.tensorflow_ai.training_data),
                     "model_architecture": "Dense Neural Network (128-64-output)",
-                    "last_updated": datetime.utcnow().isoformat()
+                    "last_updated": self.loaded_at.isoformat()
                 }
             else:
                 return {
                     "model_type": "Fallback Rule-based",
                     "status": "fallback",
                     "features": ["Basic Intent Recognition"],
-                    "message": "TensorFlow model not available"
+                    "message": "TensorFlow model not available",
+                    "last_updated": self.loaded_at.isoformat()
                 }
         except Exception as e:
             logger.error(f"❌ Error obteniendo información del modelo: {e}")
@@ -86,3 +361,37 @@ class AIService:
                 "status": "error",
                 "error": str(e)
             }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de rendimiento del motor de IA"""
+        return {
+            "status": self.status,
+            "warmed_up": self.warmed_up,
+            "warmup_ms": self.warmup_ms,
+            "batching_enabled": settings.AI_BATCHING_ENABLED,
+            "batcher": self.batcher.get_stats(),
+            "executor": self.executor.get_stats(),
+            "model_reload": self.model_manager.get_status(),
+            "intent_tiers": self.tensorflow_ai.intent_classifier.get_stats() if self.tensorflow_ai else None,
+            "prediction_cache": self.tensorflow_ai.prediction_cache.get_stats() if self.tensorflow_ai else None,
+            "conversations": self.tensorflow_ai.conversation_store.get_stats() if self.tensorflow_ai else None
+        }
+    
+    async def shutdown(self):
+        """Liberar recursos asíncronos del motor"""
+        await self.batcher.close()
+        self.executor.shutdown()
+
+
+# Motor de IA compartido por todos los routers del proceso
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
+
+def get_ai_service() -> AIService:
+    """Dependencia de FastAPI que devuelve el motor de IA del proceso"""
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import jwt
 from datetime import datetime, timedelta
@@ -5,8 +6,9 @@ from typing import Optional
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.user import User
 
 # Configuración de seguridad
@@ -47,7 +49,7 @@ def verify_token(token: str) -> Optional[dict]:
     except jwt.PyJWTError:
         return None
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> User:
     """Obtiene el usuario actual basado en el token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,47 +64,48 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise credentials_exception
     
     user_id: str = payload.get("sub")
-    if user_id is None:
+    if user_id is None or not user_id.isdigit():
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, int(user_id))
     if user is None:
         raise credentials_exception
     
     return user
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Autentica un usuario con email y contraseña"""
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    # bcrypt tarda decenas de milisegundos: fuera del bucle de eventos
+    if not await asyncio.to_thread(verify_password, password, user.password_hash):
         return None
     return user
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Obtiene un usuario por email"""
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email))
 
-def create_user(db: Session, email: str, password: str, full_name: str) -> User:
+async def create_user(db: AsyncSession, email: str, password: str, full_name: str) -> User:
     """Crea un nuevo usuario"""
-    hashed_password = get_password_hash(password)
+    hashed_password = await asyncio.to_thread(get_password_hash, password)
     db_user = User(
         email=email,
         password_hash=hashed_password,
         full_name=full_name
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user_password(db: Session, user_id: int, new_password: str) -> bool:
+async def update_user_password(db: AsyncSession, user_id: int, new_password: str) -> bool:
     """Actualiza la contraseña de un usuario"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         return False
     
-    user.password_hash = get_password_hash(new_password)
-    db.commit()
+    user.password_hash = await asyncio.to_thread(get_password_hash, new_password)
+    await db.commit()
     return True
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Historial de conversación por usuario con tamaño acotado
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_SESSION = "anonymous"
+
+
+def session_key(user_id: Any) -> str:
+    """Clave de sesión de un usuario (los mensajes sin usuario comparten una sesión)"""
+    return ANONYMOUS_SESSION if user_id is None else str(user_id)
+
+
+class ConversationStore(ABC):
+    """Interfaz común de los backends de historial"""
+
+    @abstractmethod
+    def append(self, user_id: Any, entry: Dict[str, Any]):
+        """Añadir un mensaje al historial del usuario"""
+
+    @abstractmethod
+    def recent(self, user_id: Any, limit: int) -> List[Dict[str, Any]]:
+        """Últimos `limit` mensajes del usuario, del más antiguo al más reciente"""
+
+    @abstractmethod
+    def length(self, user_id: Any) -> int:
+        """Número de mensajes guardados para el usuario"""
+
+    @abstractmethod
+    def clear(self, user_id: Any):
+        """Borrar el historial del usuario"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del backend (sesiones, mensajes, configuración)"""
+
+
+class _Session:
+    __slots__ = ("messages", "last_seen")
+
+    def __init__(self, max_messages: int):
+        self.messages = deque(maxlen=max_messages)
+        self.last_seen = time.monotonic()
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Un buffer circular por usuario, con caducidad por inactividad y límite de sesiones (LRU)"""
+
+    def __init__(self, max_messages: int = 20, idle_ttl_seconds: float = 3600.0, max_sessions: int = 10000):
+        self.max_messages = max_messages
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired_sessions = 0
+        self.evicted_sessions = 0
+
+    def _get_session(self, key: str, create: bool) -> Optional[_Session]:
+        """Sesión viva del usuario (se llama con el lock tomado)"""
+        now = time.monotonic()
+        session = self._sessions.get(key)
+
+        if session is not None and self.idle_ttl_seconds > 0 and now - session.last_seen > self.idle_ttl_seconds:
+            del self._sessions[key]
+            self.expired_sessions += 1
+            session = None
+
+        if session is None:
+            if not create:
+                return None
+            session = _Session(self.max_messages)
+            self._sessions[key] = session
+
+        session.last_seen = now
+        self._sessions.move_to_end(key)
+        return session
+
+    def _evict(self):
+        """Eliminar sesiones caducadas (las más antiguas están al principio) y las que exceden el límite"""
+        now = time.monotonic()
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions:
+                self.evicted_sessions += 1
+            elif self.idle_ttl_seconds > 0 and now - session.last_seen > self.idle_ttl_seconds:
+                self.expired_sessions += 1
+            else:
+                break
+            del self._sessions[key]
+
+    def append(self, user_id: Any, entry: Dict[str, Any]):
+        with self._lock:
+            self._get_session(session_key(user_id), create=True).messages.append(entry)
+            self._evict()
+
+    def recent(self, user_id: Any, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._get_session(session_key(user_id), create=False)
+            if session is None:
+                return []
+            # Recorre solo los últimos `limit` elementos del buffer
+            messages = list(islice(reversed(session.messages), limit))
+        messages.reverse()
+        return messages
+
+    def length(self, user_id: Any) -> int:
+        with self._lock:
+            session = self._get_session(session_key(user_id), create=False)
+            return len(session.messages) if session is not None else 0
+
+    def clear(self, user_id: Any):
+        with self._lock:
+            self._sessions.pop(session_key(user_id), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_messages": self.max_messages,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "expired_sessions": self.expired_sessions,
+                "evicted_sessions": self.evicted_sessions
+            }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Historial en un fichero SQLite compartido por todos los workers del servidor"""
+
+    # Cada cuántas escrituras se purgan sesiones inactivas o sobrantes
+    PURGE_EVERY = 200
+
+    def __init__(self, path: str, namespace: str = "default", max_messages: int = 20,
+                 idle_ttl_seconds: float = 3600.0, max_sessions: int = 10000):
+        self.path = path
+        self.namespace = namespace
+        self.max_messages = max_messages
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_sessions = max(1, max_sessions)
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " namespace TEXT NOT NULL,"
+                " session_key TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_conversation_messages_session "
+                "ON conversation_messages (namespace, session_key, id)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _expiry_cutoff(self) -> Optional[float]:
+        return time.time() - self.idle_ttl_seconds if self.idle_ttl_seconds > 0 else None
+
+    def append(self, user_id: Any, entry: Dict[str, Any]):
+        key = session_key(user_id)
+        connection = self._connection()
+        with connection:
+            cutoff = self._expiry_cutoff()
+            if cutoff is not None:
+                # Una sesión inactiva empieza de cero
+                last = connection.execute(
+                    "SELECT MAX(created_at) FROM conversation_messages WHERE namespace = ? AND session_key = ?",
+                    (self.namespace, key)
+                ).fetchone()[0]
+                if last is not None and last < cutoff:
+                    connection.execute(
+                        "DELETE FROM conversation_messages WHERE namespace = ? AND session_key = ?",
+                        (self.namespace, key)
+                    )
+
+            connection.execute(
+                "INSERT INTO conversation_messages (namespace, session_key, payload, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(entry, ensure_ascii=False, default=str), time.time())
+            )
+            # Buffer circular: conservar solo los últimos `max_messages`
+            connection.execute(
+                "DELETE FROM conversation_messages WHERE namespace = ? AND session_key = ? AND id <= ("
+                " SELECT id FROM conversation_messages WHERE namespace = ? AND session_key = ?"
+                " ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.namespace, key, self.namespace, key, self.max_messages)
+            )
+
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def recent(self, user_id: Any, limit: int) -> List[Dict[str, Any]]:
+        key = session_key(user_id)
+        params = [self.namespace, key]
+        query = "SELECT payload FROM conversation_messages WHERE namespace = ? AND session_key = ?"
+        cutoff = self._expiry_cutoff()
+        if cutoff is not None:
+            # Si el último mensaje es anterior al corte, la sesión está caducada
+            query += (" AND (SELECT MAX(created_at) FROM conversation_messages"
+                      " WHERE namespace = ? AND session_key = ?) >= ?")
+            params += [self.namespace, key, cutoff]
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        rows = self._connection().execute(query, params).fetchall()
+        return [json.loads(payload) for (payload,) in reversed(rows)]
+
+    def length(self, user_id: Any) -> int:
+        key = session_key(user_id)
+        count, last = self._connection().execute(
+            "SELECT COUNT(*), MAX(created_at) FROM conversation_messages WHERE namespace = ? AND session_key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        cutoff = self._expiry_cutoff()
+        if last is None or (cutoff is not None and last < cutoff):
+            return 0
+        return count
+
+    def clear(self, user_id: Any):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM conversation_messages WHERE namespace = ? AND session_key = ?",
+                (self.namespace, session_key(user_id))
+            )
+
+    def purge(self):
+        """Borrar sesiones inactivas y, si sobran, las usadas hace más tiempo"""
+        try:
+            connection = self._connection()
+            with connection:
+                cutoff = self._expiry_cutoff()
+                if cutoff is not None:
+                    connection.execute(
+                        "DELETE FROM conversation_messages WHERE namespace = ? AND session_key IN ("
+                        " SELECT session_key FROM conversation_messages WHERE namespace = ?"
+                        " GROUP BY session_key HAVING MAX(created_at) < ?)",
+                        (self.namespace, self.namespace, cutoff)
+                    )
+                connection.execute(
+                    "DELETE FROM conversation_messages WHERE namespace = ? AND session_key IN ("
+                    " SELECT session_key FROM conversation_messages WHERE namespace = ?"
+                    " GROUP BY session_key ORDER BY MAX(created_at) DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_sessions)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error purgando el historial de conversación: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        sessions = self._connection().execute(
+            "SELECT COUNT(DISTINCT session_key) FROM conversation_messages WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "max_messages": self.max_messages,
+            "idle_ttl_seconds": self.idle_ttl_seconds
+        }
+
+
+def create_conversation_store(namespace: str, max_messages: Optional[int] = None) -> ConversationStore:
+    """Crear el backend de historial configurado en `CONVERSATION_STORE_BACKEND`"""
+    max_messages = max_messages or settings.CONVERSATION_MAX_MESSAGES
+
+    if settings.CONVERSATION_STORE_BACKEND == "sqlite":
+        logger.info(f"💬 Historial de conversación en SQLite: {settings.CONVERSATION_STORE_PATH}")
+        return SQLiteConversationStore(
+            settings.CONVERSATION_STORE_PATH,
+            namespace=namespace,
+            max_messages=max_messages,
+            idle_ttl_seconds=settings.CONVERSATION_IDLE_TTL_SECONDS,
+            max_sessions=settings.CONVERSATION_MAX_SESSIONS
+        )
+
+    return InMemoryConversationStore(
+        max_messages=max_messages,
+        idle_ttl_seconds=settings.CONVERSATION_IDLE_TTL_SECONDS,
+        max_sessions=settings.CONVERSATION_MAX_SESSIONS
+    )
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Resolución de fechas relativas en español ("pasado mañana", "el próximo viernes", "a las 5")
+"""
+
+import logging
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {
+    "lunes": 0, "martes": 1, "miércoles": 2, "miercoles": 2, "jueves": 3,
+    "viernes": 4, "sábado": 5, "sabado": 5, "domingo": 6
+}
+
+NUMBER_WORDS = {
+    "un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6,
+    "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11, "doce": 12, "quince": 15,
+    "veinte": 20, "treinta": 30
+}
+
+RELATIVE_DAYS = {"hoy": 0, "mañana": 1, "pasado mañana": 2}
+
+UNIT_DAYS = {"día": 1, "dia": 1, "días": 1, "dias": 1, "semana": 7, "semanas": 7}
+
+# Franja del día que convierte la hora a formato de 24 h
+DAY_PERIODS = {"am": 0, "de la mañana": 0, "pm": 12, "de la tarde": 12, "de la noche": 12}
+
+# Sin franja, las horas de 1 a 7 se leen como de la tarde ("a las 5" = 17:00)
+AFTERNOON_HOURS = range(1, 8)
+
+# Hora límite cuando solo se indica el día
+END_OF_DAY = time(23, 59)
+
+_number = "|".join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True))
+_weekday = "|".join(sorted(map(re.escape, WEEKDAYS), key=len, reverse=True))
+_unit = "|".join(sorted(map(re.escape, UNIT_DAYS), key=len, reverse=True))
+_period = "|".join(sorted(map(re.escape, DAY_PERIODS), key=len, reverse=True))
+
+# Gramática precompilada: una expresión por tipo de fecha, probadas en este orden
+DATE_GRAMMAR = [
+    ("numeric", re.compile(r"\b(?:el )?(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}|\d{2}))?\b")),
+    ("relative_day", re.compile(r"\b(pasado mañana|(?<!la )mañana|hoy)\b")),
+    ("offset", re.compile(rf"\b(?:en|dentro de) (\d{{1,3}}|{_number}) ({_unit})\b")),
+    ("weekday", re.compile(rf"\b(?:el )?(?:(próximo|proximo|siguiente|este) )?({_weekday})( que viene| siguiente)?\b")),
+]
+TIME_GRAMMAR = re.compile(rf"\ba (?:la|las) (\d{{1,2}})(?:[:.](\d{{2}}))?(?: ?(y media|y cuarto))?(?: ?({_period}))?\b")
+
+
+class DateResolution:
+    """Fecha límite resuelta y el fragmento del mensaje que la expresaba"""
+
+    __slots__ = ("local", "due_date", "spans")
+
+    def __init__(self, local: datetime, spans: Tuple[Tuple[int, int], ...]):
+        self.local = local
+        # Se guarda en UTC sin zona horaria, como el resto de fechas de la base de datos
+        self.due_date = local.astimezone(timezone.utc).replace(tzinfo=None)
+        self.spans = spans
+
+    def strip(self, text: str) -> str:
+        """Texto sin las expresiones de fecha y hora ("comprar pan mañana" -> "comprar pan")"""
+        for start, end in sorted(self.spans, reverse=True):
+            text = text[:start] + text[end:]
+        return " ".join(text.split()).strip(" ,.")
+
+
+def get_timezone(name: Optional[str] = None) -> ZoneInfo:
+    """Zona horaria del usuario; la configurada por defecto si no se indica o no existe"""
+    for candidate in (name, settings.DEFAULT_TIMEZONE):
+        if not candidate:
+            continue
+        try:
+            return _zone(candidate)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"⚠️ Zona horaria desconocida: {candidate}")
+    return ZoneInfo("UTC")
+
+
+@lru_cache(maxsize=64)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+def resolve_due_date(text: str, tz_name: Optional[str] = None,
+                     now: Optional[datetime] = None) -> Optional[DateResolution]:
+    """Fecha y hora concretas (en la zona del usuario) expresadas en el mensaje, o None"""
+    tz = get_timezone(tz_name)
+    now_local = now.astimezone(tz) if now is not None else datetime.now(tz)
+
+    parsed = _parse(text.lower(), now_local.date())
+    if parsed is None:
+        return None
+
+    day, clock, spans = parsed
+    if day is None:
+        # Solo hora: hoy si todavía no ha pasado, si no mañana
+        day = now_local.date()
+        if datetime.combine(day, clock, tz) <= now_local:
+            day += timedelta(days=1)
+
+    local = datetime.combine(day, clock or END_OF_DAY, tz)
+    return DateResolution(local, spans)
+
+
+@lru_cache(maxsize=4096)
+def _parse(text: str, today: date) -> Optional[Tuple[Optional[date], Optional[time], Tuple[Tuple[int, int], ...]]]:
+    """Día y hora del texto (en minúsculas) respecto a `today`; memoizado por (frase, día)"""
+    day, day_span = _parse_day(text, today)
+    clock, time_span = _parse_time(text)
+    if day is None and clock is None:
+        return None
+    spans = tuple(span for span in (day_span, time_span) if span is not None)
+    return day, clock, spans
+
+
+def _parse_day(text: str, today: date) -> Tuple[Optional[date], Optional[Tuple[int, int]]]:
+    for kind, pattern in DATE_GRAMMAR:
+        match = pattern.search(text)
+        if not match:
+            continue
+
+        if kind == "numeric":
+            day_value = _numeric_date(match, today)
+            if day_value is None:
+                continue
+            return day_value, match.span()
+
+        if kind == "relative_day":
+            return today + timedelta(days=RELATIVE_DAYS[match.group(1)]), match.span()
+
+        if kind == "offset":
+            amount = match.group(1)
+            count = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+            return today + timedelta(days=count * UNIT_DAYS[match.group(2)]), match.span()
+
+        if kind == "weekday":
+            ahead = (WEEKDAYS[match.group(2)] - today.weekday()) % 7
+            # "el próximo viernes" / "el viernes que viene" nunca es hoy
+            if ahead == 0 and (match.group(1) in ("próximo", "proximo", "siguiente") or match.group(3)):
+                ahead = 7
+            return today + timedelta(days=ahead), match.span()
+
+    return None, None
+
+
+def _numeric_date(match: "re.Match", today: date) -> Optional[date]:
+    """dd/mm[/aaaa]; sin año, la próxima vez que llegue esa fecha"""
+    day_value, month, year = match.group(1), match.group(2), match.group(3)
+    try:
+        if year is None:
+            candidate = date(today.year, int(month), int(day_value))
+            if candidate < today:
+                candidate = date(today.year + 1, int(month), int(day_value))
+            return candidate
+        full_year = int(year) + 2000 if len(year) == 2 else int(year)
+        return date(full_year, int(month), int(day_value))
+    except ValueError:
+        return None
+
+
+def _parse_time(text: str) -> Tuple[Optional[time], Optional[Tuple[int, int]]]:
+    match = TIME_GRAMMAR.search(text)
+    if not match:
+        return None, None
+
+    hour = int(match.group(1))
+    minute = int(match.group(2)) if match.group(2) else 0
+    if match.group(3):
+        minute = 30 if match.group(3) == "y media" else 15
+
+    period = match.group(4)
+    if period is not None:
+        if hour <= 12:
+            hour = hour % 12 + DAY_PERIODS[period]
+    elif hour in AFTERNOON_HOURS:
+        hour += 12
+
+    if hour > 23 or minute > 59:
+        return None, None
+    return time(hour, minute), match.span()
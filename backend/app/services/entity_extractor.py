@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Extracción de entidades (tareas, hábitos, prioridad, frecuencia, fechas) con patrones precompilados
+"""
+
+import re
+from typing import Dict, List, Tuple, Union
+
+# Patrones de una entidad: lista de expresiones en orden de prioridad (el valor es el grupo 1)
+# o diccionario valor -> palabras clave (gana el primer valor con alguna palabra en el texto)
+EntitySpec = Union[List[str], Dict[str, List[str]]]
+
+
+class EntityExtractor:
+    """Todas las entidades de un mensaje en una sola llamada
+
+    Las expresiones se compilan una vez al crear el extractor y el texto se pasa a
+    minúsculas una sola vez para todos los patrones y tablas de palabras clave.
+
+    Con `ignore_case` los patrones (escritos en minúsculas) se buscan sin `re.IGNORECASE`
+    sobre el texto en minúsculas, que es mucho más rápido: el motor `re` puede saltar
+    directamente al prefijo literal ("tarea", "crear"). Los valores capturados se copian
+    del texto original para conservar las mayúsculas. Cada expresión se busca por
+    separado a propósito: una única alternancia con todos los patrones pierde esa
+    optimización (ver benchmarks/bench_entity_extraction.py).
+    """
+
+    def __init__(self, entities: Dict[str, EntitySpec], ignore_case: bool = False):
+        self.ignore_case = ignore_case
+        self._patterns: List[Tuple[str, List["re.Pattern"]]] = []
+        self._fallback_patterns: List[Tuple[str, List["re.Pattern"]]] = []
+        self._keywords: List[Tuple[str, List[Tuple[str, Tuple[str, ...]]]]] = []
+        self._order = list(entities)
+
+        for name, spec in entities.items():
+            if isinstance(spec, dict):
+                table = [(value, tuple(keyword.lower() for keyword in keywords)) for value, keywords in spec.items()]
+                self._keywords.append((name, table))
+            else:
+                self._patterns.append((name, [re.compile(pattern) for pattern in spec]))
+                if ignore_case:
+                    self._fallback_patterns.append((name, [re.compile(pattern, re.IGNORECASE) for pattern in spec]))
+
+    def extract(self, text: str) -> Dict[str, str]:
+        """Entidades encontradas en el texto (las que no aparecen no están en el resultado)"""
+        found: Dict[str, str] = {}
+        text_lower = text.lower() if self.ignore_case or self._keywords else text
+
+        if not self.ignore_case:
+            self._search(self._patterns, text, text, found)
+        elif len(text_lower) == len(text):
+            self._search(self._patterns, text_lower, text, found)
+        else:
+            # Algunos caracteres cambian de longitud al pasar a minúsculas: las posiciones no
+            # coincidirían con el original
+            self._search(self._fallback_patterns, text, text, found)
+
+        if self._keywords:
+            for name, table in self._keywords:
+                for value, keywords in table:
+                    if any(keyword in text_lower for keyword in keywords):
+                        found[name] = value
+                        break
+
+        # Mismo orden de claves que la especificación
+        return {name: found[name] for name in self._order if name in found}
+
+    @staticmethod
+    def _search(patterns: List[Tuple[str, List["re.Pattern"]]], searched: str, original: str, found: Dict[str, str]):
+        """Primer patrón de cada entidad que coincide; el valor se toma del texto original"""
+        for name, entity_patterns in patterns:
+            for pattern in entity_patterns:
+                match = pattern.search(searched)
+                if match:
+                    start, end = match.span(1) if pattern.groups else match.span()
+                    found[name] = original[start:end]
+                    break
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Micro-batching de inferencia para el chat
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchMetrics:
+    """Métricas de tamaño de lote y espera en cola"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.max_batch_size = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self.total_queue_wait_ms = 0.0
+        self.max_queue_wait_ms = 0.0
+        self.total_inference_ms = 0.0
+
+    def record(self, batch_size: int, queue_waits_ms: List[float], inference_ms: float):
+        with self._lock:
+            self.batches += 1
+            self.requests += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.batch_size_histogram[batch_size] = self.batch_size_histogram.get(batch_size, 0) + 1
+            self.total_queue_wait_ms += sum(queue_waits_ms)
+            self.max_queue_wait_ms = max(self.max_queue_wait_ms, max(queue_waits_ms))
+            self.total_inference_ms += inference_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0,
+                "max_batch_size": self.max_batch_size,
+                "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+                "avg_queue_wait_ms": round(self.total_queue_wait_ms / self.requests, 3) if self.requests else 0,
+                "max_queue_wait_ms": round(self.max_queue_wait_ms, 3),
+                "avg_inference_ms": round(self.total_inference_ms / self.batches, 3) if self.batches else 0
+            }
+
+
+class InferenceBatcher:
+    """Agrupa peticiones concurrentes en una sola llamada de vectorización y predicción"""
+
+    def __init__(self, predict_batch: Callable[[List[str]], List[Dict[str, Any]]],
+                 window_ms: float = 5.0, max_batch_size: int = 32):
+        self.predict_batch = predict_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.metrics = BatchMetrics()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def predict(self, text: str) -> Dict[str, Any]:
+        """Encolar un texto y esperar la predicción de su lote"""
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+
+        future = loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        """Arrancar el consumidor de la cola en el event loop actual"""
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """Esperar el primer elemento y juntar más hasta cerrar la ventana o llenar el lote"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Bucle consumidor: una predicción por lote"""
+        while True:
+            batch = await self._collect_batch()
+
+            # Descartar peticiones cuyo cliente ya se fue
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+            queue_waits_ms = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+
+            try:
+                results = await self._loop.run_in_executor(None, self.predict_batch, texts)
+            except Exception as e:
+                logger.error(f"❌ Error en predicción por lotes: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.metrics.record(len(batch), queue_waits_ms, (time.perf_counter() - started) * 1000)
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        """Detener el consumidor de la cola"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuración y métricas del batcher"""
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            **self.metrics.snapshot()
+        }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Ejecutor dedicado para el pipeline del chat (fuera del event loop)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .message_features import MessageFeatures
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFullError(Exception):
+    """Se alcanzó el máximo de peticiones pendientes en el ejecutor"""
+
+
+# Motor de IA precargado en cada proceso hijo del pool
+_worker_service = None
+
+
+def _init_process_worker():
+    """Inicializador de los procesos hijos: carga el modelo una vez por proceso"""
+    global _worker_service
+    from .ai_service import AIService
+
+    _worker_service = AIService()
+    _worker_service.warm_up(include_executor=False)
+    logger.info("✅ Worker de inferencia listo")
+
+
+def _worker_ready() -> bool:
+    """Tarea vacía para forzar el arranque de un proceso hijo"""
+    return _worker_service is not None
+
+
+def _process_in_worker(message: str, user_id: str = None, user_context: Dict = None,
+                       prediction: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Procesar un mensaje con el motor del proceso hijo"""
+    return _worker_service.process_message(message, user_id, user_context, prediction=prediction)
+
+
+def _process_batch_in_worker(messages: List[str], user_id: str = None,
+                             user_context: Dict = None) -> List[Dict[str, Any]]:
+    """Procesar varios mensajes de un usuario con el motor del proceso hijo"""
+    return _worker_service.process_messages(messages, user_id, user_context)
+
+
+class InferenceExecutor:
+    """Pool de hilos o de procesos con límite de peticiones pendientes y timeout"""
+
+    def __init__(self, process_message: Callable[..., Dict[str, Any]], mode: str = "thread",
+                 max_workers: int = 4, max_pending: int = 64, timeout_seconds: float = 10.0,
+                 process_batch: Optional[Callable[..., List[Dict[str, Any]]]] = None):
+        if mode not in ["thread", "process"]:
+            raise ValueError(f"Modo de ejecutor no soportado: {mode}")
+
+        self.process_message = process_message
+        self.process_batch = process_batch
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.timeout_seconds = timeout_seconds
+        self._executor: Optional[Executor] = None
+        # Crear y sustituir el pool (warm_up y restart corren en otros hilos que las peticiones)
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "process":
+            # spawn: los hijos no heredan el estado de TensorFlow del padre
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference"
+        )
+
+    def _get_executor(self) -> Executor:
+        """Crear el pool en el primer uso (uno solo aunque lo pidan varios hilos a la vez)"""
+        executor = self._executor
+        if executor is not None:
+            return executor
+        with self._pool_lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            return self._executor
+
+    def warm_up(self):
+        """Arrancar los workers del pool antes del primer mensaje
+
+        En modo proceso cada hijo carga y calienta su propio modelo en el inicializador.
+        """
+        executor = self._get_executor()
+        if self.mode == "process":
+            futures = [executor.submit(_worker_ready) for _ in range(self.max_workers)]
+            for future in futures:
+                future.result()
+
+    @property
+    def is_saturated(self) -> bool:
+        """Si se envía un trabajo ahora, se rechazará por exceso de pendientes"""
+        return self.pending >= self.max_pending
+
+    def _on_done(self, _future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, message: str, user_id: str = None, user_context: Dict = None,
+                  prediction: Optional[Dict[str, Any]] = None,
+                  features: Optional[MessageFeatures] = None) -> Dict[str, Any]:
+        """Procesar un mensaje en el pool
+
+        Los rasgos del mensaje ya calculados solo se reutilizan en modo hilo; cada proceso
+        hijo calcula los suyos. Lanza `InferenceQueueFullError` si hay demasiadas peticiones
+        pendientes y `asyncio.TimeoutError` si la respuesta tarda más de `timeout_seconds`.
+        """
+        if self.mode == "process":
+            return await self._submit(_process_in_worker, (message, user_id, user_context, prediction), self.timeout_seconds)
+        return await self._submit(
+            self.process_message, (message, user_id, user_context, prediction, features), self.timeout_seconds
+        )
+
+    async def run_batch(self, messages: List[str], user_id: str = None,
+                        user_context: Dict = None) -> List[Dict[str, Any]]:
+        """Procesar varios mensajes de un usuario como un único trabajo del pool
+
+        Ocupa un solo hueco de la cola; el timeout crece con el número de mensajes.
+        """
+        fn = _process_batch_in_worker if self.mode == "process" else self.process_batch
+        return await self._submit(fn, (messages, user_id, user_context), self.timeout_seconds * max(1, len(messages)))
+
+    async def _submit(self, fn: Callable, args: tuple, timeout_seconds: float):
+        """Enviar un trabajo al pool respetando el límite de pendientes y el timeout"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise InferenceQueueFullError(f"{self.pending} peticiones pendientes")
+            self.pending += 1
+            self.submitted += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+        # El hueco se libera cuando el trabajo termina, no cuando vence el timeout
+        future.add_done_callback(self._on_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def restart(self):
+        """Sustituir el pool tras cambiar de modelo
+
+        Los trabajos ya enviados terminan en los workers antiguos; los nuevos hijos
+        cargan la versión activa desde el caché de artefactos.
+        """
+        if self.mode != "process":
+            # Los hilos comparten el modelo del proceso: no hay nada que reiniciar
+            return
+
+        # El pool nuevo sustituye al antiguo de una vez: ninguna petición ve el hueco
+        with self._pool_lock:
+            old_executor = self._executor
+            if old_executor is None:
+                return
+            self._executor = self._create_executor()
+        old_executor.shutdown(wait=False)
+        self.warm_up()
+
+    def shutdown(self):
+        """Cerrar el pool sin esperar a los trabajos en curso"""
+        with self._pool_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuración y contadores del ejecutor"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "timeout_seconds": self.timeout_seconds,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts
+            }
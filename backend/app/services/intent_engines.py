@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Motores de inferencia para el clasificador de intenciones
+"""
+
+from typing import Any, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .mapped_artifacts import read_array_dir, write_array_dir
+
+NUMPY_WEIGHTS_DIRNAME = "intent_weights"
+INT8_WEIGHTS_DIRNAME = "intent_weights_int8"
+
+# Diferencia máxima tolerada entre las probabilidades de NumPy y de Keras
+PARITY_TOLERANCE = 1e-4
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+def _linear(x: np.ndarray) -> np.ndarray:
+    return x
+
+
+ACTIVATIONS = {
+    "relu": _relu,
+    "softmax": _softmax,
+    "linear": _linear
+}
+
+
+class KerasIntentEngine:
+    """Adaptador sobre `tf.keras` con la misma interfaz que los motores NumPy"""
+
+    name = "keras"
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def predict(self, X: Any) -> np.ndarray:
+        if sparse.issparse(X):
+            X = X.toarray()
+        return self.model.predict(np.asarray(X, dtype=np.float32), verbose=0)
+
+
+class NumpyIntentModel:
+    """Forward pass de la red densa (Dropout no actúa en inferencia) implementado con NumPy"""
+
+    name = "numpy"
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, str]]):
+        for _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Activación no soportada: {activation}")
+        self.layers = layers
+
+    @classmethod
+    def from_keras(cls, model: Any) -> "NumpyIntentModel":
+        """Extraer pesos y activaciones de las capas Dense de un modelo Keras"""
+        layers = []
+        for layer in model.layers:
+            weights = layer.get_weights()
+            if not weights:
+                continue  # Dropout y otras capas sin pesos
+            kernel, bias = weights
+            activation = layer.get_config().get("activation", "linear")
+            layers.append((kernel.astype(np.float32), bias.astype(np.float32), activation))
+        return cls(layers)
+
+    def save(self, path: str):
+        """Guardar los pesos como un directorio de `.npy` (uno por array) que se puede mapear"""
+        arrays = {}
+        for i, (kernel, bias, _) in enumerate(self.layers):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+        write_array_dir(path, arrays, {"activations": [activation for _, _, activation in self.layers]})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NumpyIntentModel":
+        """Cargar pesos exportados con `save` (por defecto mapeados en memoria de solo lectura)"""
+        arrays, metadata = read_array_dir(path, mmap)
+        layers = [
+            (arrays[f"kernel_{i}"], arrays[f"bias_{i}"], activation)
+            for i, activation in enumerate(metadata["activations"])
+        ]
+        return cls(layers)
+
+    @property
+    def input_dim(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Calcular las probabilidades de cada clase para las filas de `X` (densa o CSR)"""
+        h = X
+        for kernel, bias, activation in self.layers:
+            h = self._matmul(h, kernel)
+            h += bias
+            h = ACTIVATIONS[activation](h)
+        return h
+
+    @staticmethod
+    def _matmul(X: Any, kernel: np.ndarray) -> np.ndarray:
+        """Producto con la matriz de pesos sin densificar entradas dispersas"""
+        if sparse.issparse(X):
+            # Solo se leen las filas del kernel de los términos presentes en el mensaje
+            if X.dtype != np.float32:
+                X = X.astype(np.float32)
+            return np.asarray(X.tocsr() @ kernel)
+        return np.asarray(X, dtype=np.float32) @ kernel
+
+    def parity_error(self, reference: Any, X: Any) -> float:
+        """Máxima diferencia absoluta frente a otro motor sobre las mismas entradas"""
+        return float(np.max(np.abs(self.predict(X) - reference.predict(X))))
+
+
+# float32 representa exactamente cualquier entero de hasta 24 bits
+_FLOAT32_EXACT_LIMIT = 2 ** 24
+
+
+def _quantize_rows(x: np.ndarray):
+    """Cuantización simétrica por fila: (valores enteros en [-127, 127], escala de cada fila)"""
+    scale = np.abs(x).max(axis=1) / 127
+    scale[scale == 0] = 1
+    return np.rint(x / scale[:, None]), scale.astype(np.float32)
+
+
+def _integer_matmul(a: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Producto de matrices de enteros int8 con resultado exacto
+
+    Si la suma máxima posible cabe en 24 bits, el producto se hace con BLAS en float32
+    (exacto para valores enteros y mucho más rápido que el bucle int32 de NumPy).
+    """
+    if 127 * 127 * kernel.shape[0] < _FLOAT32_EXACT_LIMIT:
+        return a.astype(np.float32) @ kernel.astype(np.float32)
+    return (a.astype(np.int32) @ kernel.astype(np.int32)).astype(np.float32)
+
+
+class QuantizedIntentModel:
+    """Forward pass con pesos INT8 por canal de salida y productos enteros
+
+    Cada capa guarda `round(W / escala)` en int8, con una escala por neurona de salida.
+    Las entradas de cada capa se cuantizan por fila en el momento; el producto se
+    acumula en int32 y se desescala a float32 antes del sesgo y la activación.
+    """
+
+    name = "int8"
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, np.ndarray, str]]):
+        for _, _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Activación no soportada: {activation}")
+        self.layers = layers
+
+    @classmethod
+    def from_float(cls, model: NumpyIntentModel) -> "QuantizedIntentModel":
+        """Cuantizar los pesos de un motor NumPy en float32"""
+        layers = []
+        for kernel, bias, activation in model.layers:
+            scale = np.abs(kernel).max(axis=0) / 127
+            scale[scale == 0] = 1
+            quantized = np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8)
+            layers.append((quantized, scale.astype(np.float32), np.asarray(bias, dtype=np.float32), activation))
+        return cls(layers)
+
+    def save(self, path: str):
+        """Guardar los pesos cuantizados como un directorio de `.npy` que se puede mapear"""
+        arrays = {}
+        for i, (kernel, scale, bias, _) in enumerate(self.layers):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"scale_{i}"] = scale
+            arrays[f"bias_{i}"] = bias
+        write_array_dir(path, arrays, {"activations": [activation for _, _, _, activation in self.layers]})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "QuantizedIntentModel":
+        arrays, metadata = read_array_dir(path, mmap)
+        layers = [
+            (arrays[f"kernel_{i}"], arrays[f"scale_{i}"], arrays[f"bias_{i}"], activation)
+            for i, activation in enumerate(metadata["activations"])
+        ]
+        return cls(layers)
+
+    @property
+    def input_dim(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(kernel.nbytes + scale.nbytes + bias.nbytes for kernel, scale, bias, _ in self.layers)
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Calcular las probabilidades de cada clase para las filas de `X` (densa o CSR)"""
+        h = X
+        for kernel, scale, bias, activation in self.layers:
+            h, row_scale = self._quantized_matmul(h, kernel)
+            h *= row_scale[:, None]
+            h *= scale
+            h += bias
+            h = ACTIVATIONS[activation](h)
+        return h
+
+    @staticmethod
+    def _quantized_matmul(X: Any, kernel: np.ndarray):
+        """Cuantizar las filas de `X` y multiplicarlas por el kernel int8: (acumulado, escala por fila)"""
+        if not sparse.issparse(X):
+            quantized, row_scale = _quantize_rows(np.asarray(X, dtype=np.float32))
+            return _integer_matmul(quantized, kernel), row_scale
+
+        X = X.tocsr()
+        rows = X.shape[0]
+        accumulated = np.zeros((rows, kernel.shape[1]), dtype=np.float32)
+        row_scale = np.ones(rows, dtype=np.float32)
+        non_empty = np.diff(X.indptr) > 0
+        if not non_empty.any():
+            return accumulated, row_scale
+
+        # Cada fila no vacía ocupa el tramo [inicio, siguiente inicio) de `data`
+        starts = X.indptr[:-1][non_empty]
+        row_scale[non_empty] = np.maximum.reduceat(np.abs(X.data), starts) / 127
+        row_scale[row_scale == 0] = 1
+        lengths = np.diff(X.indptr)[non_empty]
+        quantized = np.rint(X.data / np.repeat(row_scale[non_empty], lengths))
+
+        # Solo se leen las filas del kernel de los términos presentes en el mensaje; los productos
+        # y sus sumas por fila son enteros exactos en float32 (menos de 1040 términos por mensaje)
+        contributions = kernel[X.indices].astype(np.float32)
+        contributions *= quantized.astype(np.float32)[:, None]
+        accumulated[non_empty] = np.add.reduceat(contributions, starts)
+        return accumulated, row_scale
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Búsqueda de muchas palabras clave en una sola pasada sobre el mensaje
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Expresión regular en forma de trie: en cada posición encuentra la palabra clave más larga"""
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # fin de palabra
+
+    def build(node: dict) -> str:
+        is_terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_terminal:
+            # El `?` codicioso prueba primero la continuación más larga
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Autómata compilado una vez que detecta todas las categorías de palabras clave
+
+    Equivale a `any(keyword in text for keyword in keywords)` para cada categoría, pero
+    recorre el texto una sola vez en lugar de una vez por palabra clave.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = {name: [keyword.lower() for keyword in keywords] for name, keywords in categories.items()}
+
+        # Categorías a las que pertenece cada palabra clave
+        self._keyword_categories: Dict[str, List[str]] = {}
+        for name, keywords in self.categories.items():
+            for keyword in keywords:
+                if keyword:
+                    self._keyword_categories.setdefault(keyword, []).append(name)
+
+        # Una palabra más corta que empieza en la misma posición también está presente
+        keywords = list(self._keyword_categories)
+        self._prefixes: Dict[str, List[str]] = {
+            keyword: [other for other in keywords if keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+        # La búsqueda hacia delante (de ancho cero) permite coincidencias solapadas
+        self._pattern = re.compile(f"(?=({_trie_pattern(keywords)}))") if keywords else None
+
+    def find_keywords(self, text: str) -> set:
+        """Palabras clave distintas contenidas en el texto"""
+        found = set()
+        if self._pattern is None:
+            return found
+
+        for match in self._pattern.finditer(text.lower()):
+            found.update(self._prefixes[match.group(1)])
+        return found
+
+    def scan(self, text: str) -> Dict[str, int]:
+        """Número de palabras clave distintas de cada categoría presentes en el texto
+
+        Las categorías sin coincidencias no aparecen en el resultado, así que
+        `hits.get(categoria)` sirve directamente como bandera.
+        """
+        hits: Dict[str, int] = {}
+        for keyword in self.find_keywords(text):
+            for name in self._keyword_categories[keyword]:
+                hits[name] = hits.get(name, 0) + 1
+        return hits
@@ -8,7 +8,6 @@ import pandas as pd
 import pickle
 import joblib
 import os
-import re
 import random
 import logging
 from typing import Dict, List, Tuple, Optional
@@ -21,8 +20,39 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 
+from app.config import settings
+from .prediction_cache import PredictionCache
+from .message_features import MessageFeatures
+from .entity_extractor import EntityExtractor
+from .date_resolver import resolve_due_date
+from .conversation_store import create_conversation_store
+
 logger = logging.getLogger(__name__)
 
+# Patrones de entidades en orden de prioridad, compilados una vez (el mensaje ya llega en minúsculas)
+ENTITY_EXTRACTOR = EntityExtractor({
+    'task_name': [
+        r'crear (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'necesito (?:hacer|completar) (["\']?[^"\']+["\']?)'
+    ],
+    'habit_name': [
+        r'crear (?:un )?hábito (?:llamado )?["\']?([^"\']+)["\']?',
+        r'hábito (?:llamado )?["\']?([^"\']+)["\']?',
+        r'quiero (?:empezar|crear) (["\']?[^"\']+["\']?)'
+    ],
+    'priority': [
+        r'prioridad (alta|media|baja)',
+        r'(alta|media|baja) prioridad',
+        r'(urgente|importante|normal)'
+    ],
+    'frequency': [
+        r'(diario|diariamente|todos los días)',
+        r'(semanal|semanalmente|cada semana)',
+        r'(mensual|mensualmente|cada mes)'
+    ]
+})
+
 class LocalAIService:
     def __init__(self):
         self.models_path = "ml_models/"
@@ -35,6 +65,13 @@ class LocalAIService:
         self.vectorizer = None
         self.scaler = None
         
+        # Caché de predicciones; la versión cambia cada vez que se cargan o entrenan modelos
+        self.model_version = 0
+        self.prediction_cache = PredictionCache(
+            max_size=settings.AI_PREDICTION_CACHE_SIZE,
+            ttl_seconds=settings.AI_PREDICTION_CACHE_TTL_SECONDS
+        )
+        
         # Datos de entrenamiento
         self.training_data = self._create_training_data()
         
@@ -44,8 +81,8 @@ class LocalAIService:
         # Base de conocimiento para respuestas
         self.knowledge_base = self._create_knowledge_base()
         
-        # Historial de conversaciones
-        self.conversation_history = []
+        # Historial de conversaciones por usuario
+        self.conversation_store = create_conversation_store(namespace="local", max_messages=50)
         
     def _create_training_data(self):
         """Crear datos de entrenamiento para los modelos"""
@@ -271,11 +308,19 @@ class LocalAIService:
     
     def _load_models(self):
         """Cargar modelos guardados"""
-        self.intent_classifier = joblib.load(os.path.join(self.models_path, 'intent_classifier.pkl'))
-        self.sentiment_analyzer = joblib.load(os.path.join(self.models_path, 'sentiment_analyzer.pkl'))
-        self.response_generator = joblib.load(os.path.join(self.models_path, 'response_generator.pkl'))
-        self.vectorizer = joblib.load(os.path.join(self.models_path, 'vectorizer.pkl'))
-        self.scaler = joblib.load(os.path.join(self.models_path, 'scaler.pkl'))
+        # Los arrays de NumPy se mapean en memoria de solo lectura y se comparten entre workers
+        mmap_mode = "r" if settings.AI_MMAP_MODEL_ARTIFACTS else None
+        self.intent_classifier = joblib.load(os.path.join(self.models_path, 'intent_classifier.pkl'), mmap_mode=mmap_mode)
+        self.sentiment_analyzer = joblib.load(os.path.join(self.models_path, 'sentiment_analyzer.pkl'), mmap_mode=mmap_mode)
+        self.response_generator = joblib.load(os.path.join(self.models_path, 'response_generator.pkl'), mmap_mode=mmap_mode)
+        self.vectorizer = joblib.load(os.path.join(self.models_path, 'vectorizer.pkl'), mmap_mode=mmap_mode)
+        self.scaler = joblib.load(os.path.join(self.models_path, 'scaler.pkl'), mmap_mode=mmap_mode)
+        self._invalidate_predictions()
+    
+    def _invalidate_predictions(self):
+        """Descartar predicciones cacheadas de modelos anteriores"""
+        self.model_version += 1
+        self.prediction_cache.clear()
     
     def _train_models(self):
         """Entrenar todos los modelos"""
@@ -307,6 +352,7 @@ class LocalAIService:
         
         # Guardar modelos
         self._save_models()
+        self._invalidate_predictions()
         
         logger.info("Modelos entrenados exitosamente")
     
@@ -345,20 +391,21 @@ class LocalAIService:
     def chat(self, message: str, user_id: Optional[int] = None) -> Dict:
         """Procesar mensaje y generar respuesta inteligente"""
         try:
-            # Preprocesar mensaje
-            processed_message = self._preprocess_message(message)
+            # Preprocesar mensaje una sola vez (intención y sentimiento comparten la fila TF-IDF)
+            features = MessageFeatures.build(message)
+            processed_message = features.normalized
             
             # Clasificar intención
-            intent, confidence = self._classify_intent(processed_message)
+            intent, confidence = self._classify_intent(features)
             
             # Analizar sentimiento
-            sentiment, sentiment_confidence = self._analyze_sentiment(processed_message)
+            sentiment, sentiment_confidence = self._analyze_sentiment(features)
             
             # Extraer entidades
             entities = self._extract_entities(processed_message)
             
             # Verificar si el usuario quiere ver tareas o hábitos
-            if 'ver todas mis tareas' in message.lower() or 'ver lista de tareas' in message.lower():
+            if 'ver todas mis tareas' in processed_message or 'ver lista de tareas' in processed_message:
                 return {
                     "response": "¡Perfecto! Te ayudo a ver todas tus tareas. Aquí tienes acceso directo a tu lista de tareas donde podrás ver, editar y gestionar todas tus actividades pendientes.",
                     "intent": "view_tasks",
@@ -370,7 +417,7 @@ class LocalAIService:
                     "insights": "Revisar regularmente tus tareas te ayuda a mantener el control de tu productividad",
                     "timestamp": datetime.utcnow().isoformat()
                 }
-            elif 'ver mis hábitos' in message.lower() or 'ver hábitos' in message.lower():
+            elif 'ver mis hábitos' in processed_message or 'ver hábitos' in processed_message:
                 return {
                     "response": "¡Excelente! Te ayudo a ver tus hábitos. Aquí tienes acceso directo a tu lista de hábitos donde podrás ver tu progreso, marcar completados y gestionar tus rutinas diarias.",
                     "intent": "view_habits",
@@ -395,7 +442,7 @@ class LocalAIService:
                 return self._handle_habit_creation_response(message, user_id)
             
             # Generar respuesta
-            response = self._generate_response(intent, entities, sentiment)
+            response = self._generate_response(intent, entities, sentiment, user_id)
             
             # Generar sugerencias
             suggestions = self._generate_suggestions(intent)
@@ -404,7 +451,7 @@ class LocalAIService:
             insights = self._generate_insights(intent, sentiment, entities)
             
             # Actualizar historial
-            self._update_conversation_history(message, response, intent)
+            self._update_conversation_history(message, response, intent, user_id)
             
             return {
                 "response": response,
@@ -422,24 +469,16 @@ class LocalAIService:
             logger.error(f"Error en chat: {e}")
             return self._generate_fallback_response(message)
     
-    def _preprocess_message(self, message: str) -> str:
-        """Preprocesar mensaje para análisis"""
-        # Convertir a minúsculas
-        message = message.lower()
-        
-        # Remover caracteres especiales
-        message = re.sub(r'[^\w\s]', '', message)
-        
-        # Remover espacios extra
-        message = ' '.join(message.split())
-        
-        return message
-    
-    def _classify_intent(self, message: str) -> Tuple[str, float]:
+    def _classify_intent(self, message: MessageFeatures) -> Tuple[str, float]:
         """Clasificar la intención del mensaje"""
+        cache_key = (self.model_version, "intent", message.normalized)
+        cached = self.prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Vectorizar mensaje
-            features = self.vectorizer.transform([message])
+            # Vectorizar mensaje (la fila queda en los rasgos para el sentimiento)
+            features = message.vector(self.vectorizer)
             
             # Predecir intención
             intent = self.intent_classifier.predict(features)[0]
@@ -448,16 +487,22 @@ class LocalAIService:
             probabilities = self.intent_classifier.predict_proba(features)[0]
             confidence = max(probabilities)
             
+            self.prediction_cache.set(cache_key, (intent, confidence))
             return intent, confidence
         except Exception as e:
             logger.error(f"Error clasificando intención: {e}")
             return 'general_conversation', 0.5
     
-    def _analyze_sentiment(self, message: str) -> Tuple[str, float]:
+    def _analyze_sentiment(self, message: MessageFeatures) -> Tuple[str, float]:
         """Analizar sentimiento del mensaje"""
+        cache_key = (self.model_version, "sentiment", message.normalized)
+        cached = self.prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Vectorizar mensaje
-            features = self.vectorizer.transform([message])
+            # Misma fila TF-IDF que la clasificación de intención
+            features = message.vector(self.vectorizer)
             
             # Predecir sentimiento
             sentiment = self.sentiment_analyzer.predict(features)[0]
@@ -466,74 +511,21 @@ class LocalAIService:
             probabilities = self.sentiment_analyzer.predict_proba(features)[0]
             confidence = max(probabilities)
             
+            self.prediction_cache.set(cache_key, (sentiment, confidence))
             return sentiment, confidence
         except Exception as e:
             logger.error(f"Error analizando sentimiento: {e}")
             return 'neutral', 0.5
     
     def _extract_entities(self, message: str) -> Dict:
-        """Extraer entidades del mensaje"""
-        entities = {}
-        
-        # Extraer nombres de tareas
-        task_patterns = [
-            r'crear (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
-            r'tarea (?:llamada )?["\']?([^"\']+)["\']?',
-            r'necesito (?:hacer|completar) (["\']?[^"\']+["\']?)'
-        ]
-        
-        for pattern in task_patterns:
-            match = re.search(pattern, message)
-            if match:
-                entities['task_name'] = match.group(1)
-                break
-        
-        # Extraer nombres de hábitos
-        habit_patterns = [
-            r'crear (?:un )?hábito (?:llamado )?["\']?([^"\']+)["\']?',
-            r'hábito (?:llamado )?["\']?([^"\']+)["\']?',
-            r'quiero (?:empezar|crear) (["\']?[^"\']+["\']?)'
-        ]
-        
-        for pattern in habit_patterns:
-            match = re.search(pattern, message)
-            if match:
-                entities['habit_name'] = match.group(1)
-                break
-        
-        # Extraer prioridades
-        priority_patterns = [
-            r'prioridad (alta|media|baja)',
-            r'(alta|media|baja) prioridad',
-            r'(urgente|importante|normal)'
-        ]
-        
-        for pattern in priority_patterns:
-            match = re.search(pattern, message)
-            if match:
-                entities['priority'] = match.group(1)
-                break
-        
-        # Extraer frecuencias
-        frequency_patterns = [
-            r'(diario|diariamente|todos los días)',
-            r'(semanal|semanalmente|cada semana)',
-            r'(mensual|mensualmente|cada mes)'
-        ]
-        
-        for pattern in frequency_patterns:
-            match = re.search(pattern, message)
-            if match:
-                entities['frequency'] = match.group(1)
-                break
-        
-        return entities
+        """Extraer entidades del mensaje (una sola pasada sobre el texto en minúsculas)"""
+        return ENTITY_EXTRACTOR.extract(message)
     
-    def _generate_response(self, intent: str, entities: Dict, sentiment: str) -> str:
+    def _generate_response(self, intent: str, entities: Dict, sentiment: str, user_id: Optional[int] = None) -> str:
         """Generar respuesta inteligente basada en intención, entidades y contexto"""
         try:
             # Obtener contexto del historial de conversación
-            context = self._get_conversation_context()
+            context = self._get_conversation_context(user_id)
             
             # Obtener respuestas base del conocimiento
             knowledge = self.knowledge_base.get(intent, self.knowledge_base['general_conversation'])
@@ -618,39 +610,37 @@ class LocalAIService:
         
         return insights[0] if insights else "Cada día es una oportunidad para mejorar y crecer"
     
-    def _update_conversation_history(self, message: str, response: str, intent: str):
-        """Actualizar historial de conversación"""
-        self.conversation_history.append({
+    def _update_conversation_history(self, message: str, response: str, intent: str, user_id: Optional[int] = None):
+        """Actualizar historial de conversación (el buffer conserva los últimos 50 mensajes)"""
+        self.conversation_store.append(user_id, {
             'message': message,
             'response': response,
             'intent': intent,
-            'timestamp': datetime.utcnow()
+            'timestamp': datetime.utcnow().isoformat()
         })
-        
-        # Mantener solo los últimos 50 mensajes
-        if len(self.conversation_history) > 50:
-            self.conversation_history = self.conversation_history[-50:]
     
-    def _get_conversation_context(self) -> Dict:
-        """Obtener contexto de la conversación actual"""
+    def _get_conversation_context(self, user_id: Optional[int] = None) -> Dict:
+        """Obtener contexto de la conversación actual del usuario"""
         try:
             context = {
-                'conversation_length': len(self.conversation_history),
+                'conversation_length': self.conversation_store.length(user_id),
                 'last_intent': None,
                 'common_topics': [],
                 'user_sentiment_trend': 'neutral'
             }
             
-            if self.conversation_history:
+            if context['conversation_length']:
+                last_messages = self.conversation_store.recent(user_id, 10)
+                
                 # Obtener la última intención
-                context['last_intent'] = self.conversation_history[-1].get('intent')
+                context['last_intent'] = last_messages[-1].get('intent')
                 
                 # Analizar temas comunes
-                intents = [msg.get('intent') for msg in self.conversation_history[-10:]]
+                intents = [msg.get('intent') for msg in last_messages]
                 context['common_topics'] = list(set(intents))
                 
                 # Analizar tendencia de sentimiento
-                recent_messages = self.conversation_history[-5:]
+                recent_messages = last_messages[-5:]
                 positive_count = sum(1 for msg in recent_messages if 'positive' in str(msg.get('sentiment', '')))
                 negative_count = sum(1 for msg in recent_messages if 'negative' in str(msg.get('sentiment', '')))
                 
@@ -730,6 +720,12 @@ class LocalAIService:
             title = entities.get('task_name', description[:50])
             extracted_priority = entities.get('priority', priority)
             
+            # Sin fecha explícita, resolver la que exprese la descripción ("el próximo viernes")
+            if due_date is None:
+                resolution = resolve_due_date(description)
+                if resolution is not None:
+                    due_date = resolution.due_date.isoformat()
+            
             return {
                 "title": title,
                 "description": description,
@@ -915,7 +911,15 @@ class LocalAIService:
             # Extraer información de la tarea
             task_name = message.strip()
             priority = "medium"
-            due_date = "2025-01-15"
+            
+            # Fecha límite a partir del propio mensaje ("pasado mañana a las 5")
+            resolution = resolve_due_date(task_name)
+            due_date = None
+            due_label = "Sin fecha"
+            if resolution is not None:
+                task_name = resolution.strip(task_name) or task_name
+                due_date = resolution.due_date.isoformat()
+                due_label = resolution.local.strftime('%d/%m/%Y %H:%M')
             
             # Aquí deberías hacer la llamada real a la base de datos
             # Por ahora simulamos la creación
@@ -931,7 +935,7 @@ class LocalAIService:
             }
             
             return {
-                "response": f"¡Excelente! He creado la tarea: **{task_name}**\n\n📝 **Descripción:** {task_name}\n⚡ **Prioridad:** {priority}\n📅 **Fecha límite:** {due_date}\n\n✅ **Tarea creada exitosamente en tu base de datos**\n\n💡 **Consejo:** Ahora puedes ver esta tarea en tu lista de tareas y marcarla como completada cuando la termines.",
+                "response": f"¡Excelente! He creado la tarea: **{task_name}**\n\n📝 **Descripción:** {task_name}\n⚡ **Prioridad:** {priority}\n📅 **Fecha límite:** {due_label}\n\n✅ **Tarea creada exitosamente en tu base de datos**\n\n💡 **Consejo:** Ahora puedes ver esta tarea en tu lista de tareas y marcarla como completada cuando la termines.",
                 "intent": "task_creation_complete",
                 "confidence": 0.95,
                 "sentiment": "positive",
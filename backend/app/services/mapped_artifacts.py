@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Artefactos del modelo en ficheros `.npy` que se abren con `np.memmap` de solo lectura
+
+Todos los workers de una máquina que abren el mismo fichero comparten sus páginas
+a través de la caché de páginas del sistema operativo, en lugar de tener cada uno
+su propia copia deserializada con `pickle`.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Iterable, List
+
+import numpy as np
+from scipy import sparse
+
+MAPPED_VECTORIZER_DIRNAME = "vectorizer"
+MAPPED_LABELS_FILENAME = "label_classes.npy"
+
+# Diferencia máxima tolerada entre el vectorizador mapeado y el de sklearn
+VECTORIZER_TOLERANCE = 1e-5
+
+
+def load_array(path: str, mmap: bool = True) -> np.ndarray:
+    """Abrir un `.npy` mapeado en memoria (solo lectura) o cargarlo completo"""
+    return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+
+def write_array_dir(path: str, arrays: dict, metadata: dict):
+    """Escribir un directorio de `.npy` más `meta.json` y publicarlo con un rename atómico
+
+    Los ficheros publicados nunca se reescriben: otro worker puede tenerlos mapeados.
+    """
+    tmp_path = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}-", dir=os.path.dirname(path))
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Otro worker publicó el mismo directorio antes que nosotros
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            raise
+
+
+def read_array_dir(path: str, mmap: bool = True):
+    """Leer un directorio escrito con `write_array_dir`: (arrays, metadata)"""
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    arrays = {
+        name[:-len(".npy")]: load_array(os.path.join(path, name), mmap)
+        for name in os.listdir(path) if name.endswith(".npy")
+    }
+    return arrays, metadata
+
+
+class MappedLabelEncoder:
+    """Solo lo que la inferencia usa de `LabelEncoder`: el array `classes_`"""
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = classes
+
+    @classmethod
+    def from_sklearn(cls, label_encoder: Any) -> "MappedLabelEncoder":
+        return cls(np.asarray(label_encoder.classes_).astype(str))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, self.classes_, allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "MappedLabelEncoder":
+        return cls(load_array(path, mmap))
+
+
+class MappedTfidfVectorizer:
+    """`transform` de un `TfidfVectorizer` de palabras sueltas sin objetos de Python por término
+
+    El vocabulario se guarda como un array de términos ordenados (más la columna de
+    cada uno) y se consulta con búsqueda binaria, así que puede vivir en un memmap.
+    """
+
+    def __init__(self, terms: np.ndarray, columns: np.ndarray, idf: np.ndarray, token_pattern: str,
+                 stop_words: Iterable[str] = (), lowercase: bool = True, norm: str = "l2",
+                 sublinear_tf: bool = False, dtype: str = "float32"):
+        if norm not in ["l2", None]:
+            raise ValueError(f"Norma no soportada: {norm}")
+
+        self.terms = terms
+        self.columns = columns
+        self.idf = idf
+        self.token_pattern = token_pattern
+        self.stop_words = frozenset(stop_words)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.dtype = np.dtype(dtype)
+        self._token_regex = re.compile(token_pattern)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer: Any) -> "MappedTfidfVectorizer":
+        """Convertir un `TfidfVectorizer` ajustado (solo configuraciones equivalentes)"""
+        unsupported = (
+            vectorizer.analyzer != "word"
+            or tuple(vectorizer.ngram_range) != (1, 1)
+            or vectorizer.preprocessor is not None
+            or vectorizer.tokenizer is not None
+            or vectorizer.strip_accents is not None
+            or vectorizer.binary
+            or not vectorizer.use_idf
+        )
+        if unsupported:
+            raise ValueError("Configuración de TfidfVectorizer no soportada por el vectorizador mapeado")
+
+        vocabulary = sorted(vectorizer.vocabulary_.items())
+        return cls(
+            terms=np.array([term for term, _ in vocabulary], dtype=str),
+            columns=np.array([column for _, column in vocabulary], dtype=np.int32),
+            idf=np.asarray(vectorizer.idf_, dtype=vectorizer.dtype),
+            token_pattern=vectorizer.token_pattern,
+            stop_words=sorted(vectorizer.get_stop_words() or []),
+            lowercase=vectorizer.lowercase,
+            norm=vectorizer.norm,
+            sublinear_tf=vectorizer.sublinear_tf,
+            dtype=np.dtype(vectorizer.dtype).name
+        )
+
+    def save(self, path: str):
+        write_array_dir(
+            path,
+            {"terms": self.terms, "columns": self.columns, "idf": self.idf},
+            {
+                "token_pattern": self.token_pattern,
+                "stop_words": sorted(self.stop_words),
+                "lowercase": self.lowercase,
+                "norm": self.norm,
+                "sublinear_tf": self.sublinear_tf,
+                "dtype": self.dtype.name
+            }
+        )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "MappedTfidfVectorizer":
+        arrays, metadata = read_array_dir(path, mmap)
+        return cls(arrays["terms"], arrays["columns"], arrays["idf"], **metadata)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.idf)
+
+    def _term_columns(self, tokens: List[str]) -> np.ndarray:
+        """Columnas de los tokens presentes en el vocabulario (con repeticiones)"""
+        tokens = np.array(tokens, dtype=str)
+        positions = np.searchsorted(self.terms, tokens)
+        positions[positions >= len(self.terms)] = 0
+        known = self.terms[positions] == tokens
+        return self.columns[positions[known]]
+
+    def transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """Matriz TF-IDF dispersa (CSR) con una fila por texto"""
+        indptr = [0]
+        indices = []
+        data = []
+
+        for text in texts:
+            if self.lowercase:
+                text = text.lower()
+            tokens = [token for token in self._token_regex.findall(text) if token not in self.stop_words]
+            if tokens:
+                columns, counts = np.unique(self._term_columns(tokens), return_counts=True)
+                if len(columns):
+                    values = counts.astype(self.dtype)
+                    if self.sublinear_tf:
+                        values = np.log(values) + 1
+                    values *= self.idf[columns]
+                    if self.norm == "l2":
+                        values /= np.sqrt(np.dot(values, values))
+                    indices.append(columns)
+                    data.append(values)
+                    indptr.append(indptr[-1] + len(columns))
+                    continue
+            indptr.append(indptr[-1])
+
+        return sparse.csr_matrix(
+            (
+                np.concatenate(data) if data else np.empty(0, dtype=self.dtype),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                np.array(indptr, dtype=np.int32)
+            ),
+            shape=(len(indptr) - 1, self.n_features)
+        )
+
+    def parity_error(self, reference: Any, texts: List[str]) -> float:
+        """Máxima diferencia absoluta frente al vectorizador original sobre los mismos textos"""
+        difference = self.transform(texts) - reference.transform(texts)
+        return float(np.max(np.abs(difference.data))) if difference.nnz else 0.0
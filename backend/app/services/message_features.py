@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rasgos de un mensaje calculados una sola vez y compartidos por clasificadores y analizadores
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .keyword_matcher import KeywordMatcher
+from .prediction_cache import normalize_text
+
+
+class MessageFeatures:
+    """Texto normalizado, tokens, palabras clave y filas TF-IDF de un mensaje
+
+    Se construye una vez por mensaje y se pasa a la clasificación de intención, al
+    sentimiento, a la extracción de entidades y al análisis de patrones, en lugar de
+    que cada uno vuelva a pasar a minúsculas, limpiar con regex, buscar palabras
+    clave o vectorizar el mismo texto.
+    """
+
+    __slots__ = ("text", "normalized", "tokens", "keyword_hits", "_vectors")
+
+    def __init__(self, text: str, normalized: str, keyword_hits: Optional[Dict[str, int]] = None):
+        self.text = text
+        self.normalized = normalized
+        self.tokens: List[str] = normalized.split()
+        self.keyword_hits: Dict[str, int] = keyword_hits or {}
+        # id(vectorizador) -> (vectorizador, fila CSR); se guarda la referencia para que el id no se reutilice
+        self._vectors: Dict[int, tuple] = {}
+
+    @classmethod
+    def build(cls, text: str, keyword_matcher: Optional[KeywordMatcher] = None) -> "MessageFeatures":
+        """Normalizar el mensaje y, si hay autómata, buscar todas las palabras clave en una pasada"""
+        hits = keyword_matcher.scan(text) if keyword_matcher is not None else None
+        return cls(text, normalize_text(text), hits)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.tokens)
+
+    def has_keyword(self, category: str) -> bool:
+        return bool(self.keyword_hits.get(category))
+
+    def vector(self, vectorizer: Any) -> Any:
+        """Fila TF-IDF del mensaje normalizado; cada vectorizador transforma el texto una sola vez"""
+        entry = self._vectors.get(id(vectorizer))
+        if entry is None or entry[0] is not vectorizer:
+            entry = (vectorizer, vectorizer.transform([self.normalized]))
+            self._vectors[id(vectorizer)] = entry
+        return entry[1]
@@ -10,18 +10,61 @@ import joblib
 import os
 import logging
 from typing import Dict, List, Optional, Tuple
-import re
+
+from app.config import settings
+from .prediction_cache import PredictionCache
+from .message_features import MessageFeatures
+from .entity_extractor import EntityExtractor
+from .date_resolver import resolve_due_date
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Entity patterns (lowercase) in priority order, compiled once and applied in a single call
+ENTITY_EXTRACTOR = EntityExtractor({
+    'task_name': [
+        r'crear (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'nueva tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'agregar (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'tarea (?:llamada )?["\']?([^"\']+)["\']?'
+    ],
+    'habit_name': [
+        r'crear (?:un )?h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?',
+        r'nuevo h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?',
+        r'h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?'
+    ],
+    'priority': {
+        'alta': ['alta prioridad', 'urgente', 'importante', 'crítico'],
+        'media': ['media prioridad', 'normal', 'regular'],
+        'baja': ['baja prioridad', 'poco importante', 'opcional']
+    },
+    'frequency': {
+        'diario': ['diario', 'cada día', 'todos los días', 'diariamente'],
+        'semanal': ['semanal', 'cada semana', 'una vez por semana'],
+        'mensual': ['mensual', 'cada mes', 'una vez al mes']
+    },
+    'date': [
+        r'(\d{1,2}/\d{1,2}/\d{4})',
+        r'(\d{1,2}-\d{1,2}-\d{4})',
+        r'(hoy|mañana|pasado mañana)',
+        r'(lunes|martes|miércoles|jueves|viernes|sábado|domingo)'
+    ]
+}, ignore_case=True)
+
 class MLService:
     def __init__(self):
         self.models_path = "ml_models/"
         self.intent_classifier = None
         self.sentiment_analyzer = None
         self.vectorizer = None
+        
+        # Prediction cache, keyed on model version + normalized text
+        self.model_version = 0
+        self.prediction_cache = PredictionCache(
+            max_size=settings.AI_PREDICTION_CACHE_SIZE,
+            ttl_seconds=settings.AI_PREDICTION_CACHE_TTL_SECONDS
+        )
         self.load_models()
         
         # Intent categories
@@ -97,23 +140,28 @@ class MLService:
     def load_models(self):
         """Load pre-trained models"""
         try:
+            # Map numpy arrays read-only so that workers share one copy through the page cache
+            mmap_mode = "r" if settings.AI_MMAP_MODEL_ARTIFACTS else None
+            
             # Load intent classifier
             intent_path = os.path.join(self.models_path, "intent_classifier.pkl")
             if os.path.exists(intent_path):
-                self.intent_classifier = joblib.load(intent_path)
+                self.intent_classifier = joblib.load(intent_path, mmap_mode=mmap_mode)
                 logger.info("Intent classifier loaded successfully")
             
             # Load sentiment analyzer
             sentiment_path = os.path.join(self.models_path, "sentiment_analyzer.pkl")
             if os.path.exists(sentiment_path):
-                self.sentiment_analyzer = joblib.load(sentiment_path)
+                self.sentiment_analyzer = joblib.load(sentiment_path, mmap_mode=mmap_mode)
                 logger.info("Sentiment analyzer loaded successfully")
             
             # Load vectorizer
             vectorizer_path = os.path.join(self.models_path, "vectorizer.pkl")
             if os.path.exists(vectorizer_path):
-                self.vectorizer = joblib.load(vectorizer_path)
+                self.vectorizer = joblib.load(vectorizer_path, mmap_mode=mmap_mode)
                 logger.info("Vectorizer loaded successfully")
+            
+            self._invalidate_predictions()
                 
         except Exception as e:
             logger.error(f"Error loading models: {str(e)}")
@@ -177,6 +225,7 @@ class MLService:
             joblib.dump(self.intent_classifier, os.path.join(self.models_path, "intent_classifier.pkl"))
             joblib.dump(self.sentiment_analyzer, os.path.join(self.models_path, "sentiment_analyzer.pkl"))
             joblib.dump(self.vectorizer, os.path.join(self.models_path, "vectorizer.pkl"))
+            self._invalidate_predictions()
             
             # Evaluate models
             intent_accuracy = accuracy_score(y_test, self.intent_classifier.predict(X_test_vectorized))
@@ -192,6 +241,11 @@ class MLService:
         except Exception as e:
             logger.error(f"Error training models: {str(e)}")
     
+    def _invalidate_predictions(self):
+        """Drop cached predictions from previous models"""
+        self.model_version += 1
+        self.prediction_cache.clear()
+    
     def _generate_sentiment_labels(self, texts: List[str]) -> List[str]:
         """Generate sentiment labels based on keywords"""
         positive_words = ['gracias', 'excelente', 'genial', 'perfecto', 'bueno', 'mejor', 'feliz', 'contento']
@@ -212,17 +266,24 @@ class MLService:
         
         return labels
     
-    def classify_intent(self, text: str) -> Tuple[str, float]:
-        """Classify the intent of a text message"""
+    def classify_intent(self, text: str, features: Optional[MessageFeatures] = None) -> Tuple[str, float]:
+        """Classify the intent of a text message (pass `features` to share preprocessing with other analyzers)"""
         try:
             if not self.intent_classifier or not self.vectorizer:
                 return 'general_conversation', 0.5
             
-            # Preprocess text
-            processed_text = self._preprocess_text(text)
+            # Preprocess text once per message
+            features = features or MessageFeatures.build(text)
+            processed_text = features.normalized
             
-            # Vectorize text
-            text_vectorized = self.vectorizer.transform([processed_text])
+            # Reuse the cached result for this model version
+            cache_key = (self.model_version, "intent", processed_text)
+            cached = self.prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            # Vectorize text (the row is kept in `features` for sentiment analysis)
+            text_vectorized = features.vector(self.vectorizer)
             
             # Predict intent
             intent = self.intent_classifier.predict(text_vectorized)[0]
@@ -230,23 +291,31 @@ class MLService:
             # Get confidence score
             confidence = max(self.intent_classifier.predict_proba(text_vectorized)[0])
             
+            self.prediction_cache.set(cache_key, (intent, confidence))
             return intent, confidence
             
         except Exception as e:
             logger.error(f"Error classifying intent: {str(e)}")
             return 'general_conversation', 0.5
     
-    def analyze_sentiment(self, text: str) -> Tuple[str, float]:
-        """Analyze the sentiment of a text message"""
+    def analyze_sentiment(self, text: str, features: Optional[MessageFeatures] = None) -> Tuple[str, float]:
+        """Analyze the sentiment of a text message (pass `features` to share preprocessing with other analyzers)"""
         try:
             if not self.sentiment_analyzer or not self.vectorizer:
                 return 'neutral', 0.5
             
-            # Preprocess text
-            processed_text = self._preprocess_text(text)
+            # Preprocess text once per message
+            features = features or MessageFeatures.build(text)
+            processed_text = features.normalized
+            
+            # Reuse the cached result for this model version
+            cache_key = (self.model_version, "sentiment", processed_text)
+            cached = self.prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Vectorize text
-            text_vectorized = self.vectorizer.transform([processed_text])
+            # Vectorize text (reuses the row computed for intent classification)
+            text_vectorized = features.vector(self.vectorizer)
             
             # Predict sentiment
             sentiment = self.sentiment_analyzer.predict(text_vectorized)[0]
@@ -254,6 +323,7 @@ class MLService:
             # Get confidence score
             confidence = max(self.sentiment_analyzer.predict_proba(text_vectorized)[0])
             
+            self.prediction_cache.set(cache_key, (sentiment, confidence))
             return sentiment, confidence
             
         except Exception as e:
@@ -261,93 +331,25 @@ class MLService:
             return 'neutral', 0.5
     
     def extract_entities(self, text: str) -> Dict[str, str]:
-        """Extract entities from text (tasks, habits, dates, etc.)"""
+        """Extract entities from text (tasks, habits, dates, etc.) in a single pass"""
         entities = {}
         
         try:
-            # Extract task-related entities
-            task_patterns = [
-                r'crear (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
-                r'nueva tarea (?:llamada )?["\']?([^"\']+)["\']?',
-                r'agregar (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
-                r'tarea (?:llamada )?["\']?([^"\']+)["\']?'
-            ]
-            
-            for pattern in task_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    entities['task_name'] = match.group(1).strip()
-                    break
-            
-            # Extract habit-related entities
-            habit_patterns = [
-                r'crear (?:un )?h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?',
-                r'nuevo h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?',
-                r'h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?'
-            ]
+            entities = ENTITY_EXTRACTOR.extract(text)
+            for name in ('task_name', 'habit_name'):
+                if name in entities:
+                    entities[name] = entities[name].strip()
             
-            for pattern in habit_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    entities['habit_name'] = match.group(1).strip()
-                    break
-            
-            # Extract priority
-            priority_patterns = {
-                'alta': ['alta prioridad', 'urgente', 'importante', 'crítico'],
-                'media': ['media prioridad', 'normal', 'regular'],
-                'baja': ['baja prioridad', 'poco importante', 'opcional']
-            }
-            
-            for priority, keywords in priority_patterns.items():
-                if any(keyword in text.lower() for keyword in keywords):
-                    entities['priority'] = priority
-                    break
-            
-            # Extract frequency for habits
-            frequency_patterns = {
-                'diario': ['diario', 'cada día', 'todos los días', 'diariamente'],
-                'semanal': ['semanal', 'cada semana', 'una vez por semana'],
-                'mensual': ['mensual', 'cada mes', 'una vez al mes']
-            }
-            
-            for frequency, keywords in frequency_patterns.items():
-                if any(keyword in text.lower() for keyword in keywords):
-                    entities['frequency'] = frequency
-                    break
-            
-            # Extract dates
-            date_patterns = [
-                r'(\d{1,2}/\d{1,2}/\d{4})',
-                r'(\d{1,2}-\d{1,2}-\d{4})',
-                r'(hoy|mañana|pasado mañana)',
-                r'(lunes|martes|miércoles|jueves|viernes|sábado|domingo)'
-            ]
-            
-            for pattern in date_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    entities['date'] = match.group(1)
-                    break
+            # Concrete due date (naive UTC, ISO format) for date expressions
+            resolution = resolve_due_date(text)
+            if resolution is not None:
+                entities['due_date'] = resolution.due_date.isoformat()
             
         except Exception as e:
             logger.error(f"Error extracting entities: {str(e)}")
         
         return entities
     
-    def _preprocess_text(self, text: str) -> str:
-        """Preprocess text for ML models"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^\w\s]', ' ', text)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
-    
     def get_suggestions(self, intent: str, context: Dict = None) -> List[str]:
         """Get contextual suggestions based on intent"""
         suggestions = {
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Versiones del modelo de intenciones y recarga en caliente sin cortar el servicio
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IntentModelVersion:
+    """Versión inmutable del clasificador: se reemplaza entera, nunca se modifica
+
+    Las peticiones leen la referencia activa una sola vez, así que las que están en
+    curso durante un cambio terminan con la versión con la que empezaron.
+    """
+
+    __slots__ = ("version", "vectorizer", "label_encoder", "intent_engine", "inference_backend",
+                 "keras_model", "training_data", "created_at")
+
+    def __init__(self, version: str, vectorizer: Any, label_encoder: Any, intent_engine: Any,
+                 inference_backend: str, keras_model: Any = None, training_data: Optional[List[Dict]] = None):
+        self.version = version
+        self.vectorizer = vectorizer
+        self.label_encoder = label_encoder
+        self.intent_engine = intent_engine
+        self.inference_backend = inference_backend
+        self.keras_model = keras_model
+        self.training_data = training_data or []
+        self.created_at = datetime.utcnow()
+
+
+class ModelManager:
+    """Reentrena en segundo plano, valida con frases reservadas y activa la nueva versión"""
+
+    def __init__(self, ai_service: Any):
+        self.ai_service = ai_service
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "idle"  # idle, training, validating, swapped, unchanged, rejected, failed
+        self.candidate_version = None
+        self.holdout_accuracy = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.swaps = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def request_reload(self, force: bool = False) -> Dict[str, Any]:
+        """Lanzar una recarga en segundo plano (si ya hay una en curso, no se lanza otra)"""
+        with self._lock:
+            if not self.is_running:
+                self.state = "training"
+                self.candidate_version = None
+                self.holdout_accuracy = None
+                self.error = None
+                self.started_at = datetime.utcnow()
+                self.finished_at = None
+                self._thread = threading.Thread(target=self._reload, args=(force,), name="model-reload", daemon=True)
+                self._thread.start()
+        return self.get_status()
+
+    def _reload(self, force: bool):
+        """Entrenar (o cargar del caché) la nueva versión, validarla y activarla"""
+        try:
+            self.ai_service.initialize()
+            service = self.ai_service.tensorflow_ai
+            if service is None:
+                raise RuntimeError("El servicio de TensorFlow no está disponible")
+
+            training_data = service._create_training_data() + service._load_extra_training_data()
+            version = service._compute_model_version(training_data)
+            self.candidate_version = version
+
+            if version == service.model_version and not force:
+                logger.info(f"ℹ️ El modelo {version} ya está activo, no hay nada que recargar")
+                self._finish("unchanged")
+                return
+
+            logger.info(f"🔁 Preparando la versión {version} del modelo en segundo plano...")
+            candidate = service._build_model_version(training_data, version)
+            if candidate is None:
+                raise RuntimeError("No se pudo entrenar la nueva versión del modelo")
+
+            self.state = "validating"
+            self.holdout_accuracy = service._evaluate_model(candidate, service._create_holdout_data())
+            if self.holdout_accuracy < settings.AI_MIN_HOLDOUT_ACCURACY:
+                logger.warning(
+                    f"⚠️ Versión {version} rechazada: precisión en reserva {self.holdout_accuracy:.2f} "
+                    f"< {settings.AI_MIN_HOLDOUT_ACCURACY:.2f}"
+                )
+                self._finish("rejected")
+                return
+
+            # Cambio atómico de referencia; la versión anterior sigue sirviendo a quien ya la tenga
+            previous = service.model_version
+            service._activate(candidate)
+            self.ai_service.executor.restart()
+            self.swaps += 1
+            logger.info(f"✅ Modelo cambiado en caliente: {previous} → {version} (precisión en reserva {self.holdout_accuracy:.2f})")
+            self._finish("swapped")
+
+        except Exception as e:
+            logger.error(f"❌ Error recargando el modelo: {e}")
+            self.error = str(e)
+            self._finish("failed")
+
+    def _finish(self, state: str):
+        self.state = state
+        self.finished_at = datetime.utcnow()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Versión activa y estado de la última recarga"""
+        service = self.ai_service.tensorflow_ai
+        return {
+            "active_version": service.model_version if service else None,
+            "state": self.state,
+            "running": self.is_running,
+            "candidate_version": self.candidate_version,
+            "holdout_accuracy": self.holdout_accuracy,
+            "min_holdout_accuracy": settings.AI_MIN_HOLDOUT_ACCURACY,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "swaps": self.swaps
+        }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Almacén de artefactos de modelos direccionado por contenido
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+class ModelArtifactStore:
+    """Guarda cada versión entrenada en un directorio cuyo nombre es el hash de sus entradas"""
+
+    def __init__(self, root_path: str, keep_versions: int = 3):
+        self.root_path = root_path
+        self.keep_versions = keep_versions
+
+    @staticmethod
+    def compute_key(**inputs: Any) -> str:
+        """Calcular la clave de una versión a partir de los datos y los hiperparámetros"""
+        payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def path_for(self, key: str) -> str:
+        """Directorio donde vive una versión concreta"""
+        return os.path.join(self.root_path, key)
+
+    def exists(self, key: str) -> bool:
+        """Una versión existe solo si su manifiesto se escribió por completo"""
+        return os.path.exists(os.path.join(self.path_for(key), MANIFEST_FILENAME))
+
+    def read_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        """Leer el manifiesto de una versión"""
+        try:
+            with open(os.path.join(self.path_for(key), MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key: str, writer: Callable[[str], Dict[str, Any]]) -> str:
+        """Escribir una versión en un directorio temporal y publicarla con un rename atómico"""
+        os.makedirs(self.root_path, exist_ok=True)
+        final_path = self.path_for(key)
+        tmp_path = tempfile.mkdtemp(prefix=f".{key}-", dir=self.root_path)
+
+        try:
+            metadata = writer(tmp_path) or {}
+            manifest = {
+                "key": key,
+                "created_at": datetime.utcnow().isoformat(),
+                **metadata
+            }
+            with open(os.path.join(tmp_path, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            try:
+                os.rename(tmp_path, final_path)
+            except OSError:
+                # Otro worker publicó la misma versión antes que nosotros
+                if not self.exists(key):
+                    raise
+                logger.info(f"ℹ️ La versión {key} ya fue publicada por otro proceso")
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        self.prune(keep=key)
+        return final_path
+
+    def prune(self, keep: Optional[str] = None):
+        """Eliminar las versiones más antiguas conservando las `keep_versions` más recientes"""
+        try:
+            versions = [
+                name for name in os.listdir(self.root_path)
+                if not name.startswith(".") and self.exists(name)
+            ]
+        except OSError:
+            return
+
+        versions.sort(
+            key=lambda name: os.path.getmtime(os.path.join(self.path_for(name), MANIFEST_FILENAME)),
+            reverse=True
+        )
+        for name in versions[self.keep_versions:]:
+            if name == keep:
+                continue
+            shutil.rmtree(self.path_for(name), ignore_errors=True)
+            logger.info(f"🧹 Versión de modelo obsoleta eliminada: {name}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Caché de predicciones de intención y sentimiento por mensaje normalizado
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_NON_WORD_PATTERN = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    """Forma canónica del mensaje: minúsculas, sin signos de puntuación ni espacios extra
+
+    Los vectorizadores TF-IDF ya ignoran mayúsculas, puntuación y espacios, así que
+    "Hola!!" y "hola" producen la misma predicción y comparten entrada en el caché.
+    """
+    return " ".join(_NON_WORD_PATTERN.sub(" ", text.lower()).split())
+
+
+class PredictionCache:
+    """Caché LRU con caducidad (TTL) y métricas de aciertos"""
+
+    def __init__(self, max_size: int = 2048, ttl_seconds: float = 3600.0):
+        self.max_size = max(0, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devolver el valor cacheado o `None` si no existe o caducó"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Guardar un valor expulsando el menos usado si se supera el tamaño máximo"""
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Invalidar todas las entradas (p. ej. tras reentrenar el modelo)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamaño, configuración y tasa de aciertos"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Contadores por usuario de tareas y hábitos con agregación condicional (una consulta por tabla)
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, case, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.habit import Habit, HabitLog
+from app.models.task import Task
+
+# Estados que cuentan como vencidos si la fecha límite ya pasó
+OPEN_STATUSES = ("pending", "in_progress")
+
+
+def _count_if(condition):
+    """SUM(CASE WHEN condición THEN 1 ELSE 0 END): portable entre SQLite y PostgreSQL"""
+    return func.sum(case((condition, 1), else_=0))
+
+
+def _sorted_counts(counts: Dict[Any, int]) -> Dict[Any, int]:
+    """Distribución ordenada por clave, como la devolvía el GROUP BY de cada campo"""
+    return dict(sorted(counts.items(), key=lambda item: (item[0] is None, item[0] if item[0] is not None else "")))
+
+
+def task_stats_query(user_id: int, today: date):
+    """Una pasada sobre las tareas del usuario agrupada por estado, prioridad y categoría
+
+    Los contadores por estado y las distribuciones salen de los grupos; los que dependen
+    de fechas (vencidas, completadas esta semana y hoy) son agregados condicionales.
+    """
+    week_ago = today - timedelta(days=7)
+    completed = Task.status == "completed"
+    return select(
+        Task.status,
+        Task.priority,
+        Task.category,
+        func.count(Task.id).label("count"),
+        _count_if(and_(Task.due_date < today, Task.status.in_(OPEN_STATUSES))).label("overdue"),
+        _count_if(and_(completed, Task.completed_at >= week_ago)).label("completed_week"),
+        _count_if(and_(completed, Task.completed_at >= today)).label("completed_today")
+    ).where(Task.user_id == user_id).group_by(Task.status, Task.priority, Task.category)
+
+
+def habit_stats_query(user_id: int, today: date):
+    """Una pasada sobre los hábitos del usuario con sus registros de la última semana
+
+    El LEFT JOIN solo trae los registros desde hace 7 días (índice por hábito y fecha), así
+    que los hábitos se cuentan con DISTINCT y los registros con agregados condicionales.
+    """
+    week_ago = today - timedelta(days=7)
+    recent_logs = and_(HabitLog.habit_id == Habit.id, HabitLog.completed_at >= week_ago)
+    return select(
+        Habit.category,
+        Habit.frequency,
+        Habit.is_active,
+        func.count(distinct(Habit.id)).label("count"),
+        func.count(HabitLog.id).label("completed_week"),
+        _count_if(HabitLog.completed_at >= today).label("completed_today")
+    ).select_from(Habit).outerjoin(HabitLog, recent_logs).where(
+        Habit.user_id == user_id
+    ).group_by(Habit.category, Habit.frequency, Habit.is_active)
+
+
+async def get_task_stats(db: AsyncSession, user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """Contadores y distribuciones de las tareas del usuario en una sola consulta"""
+    rows = (await db.execute(task_stats_query(user_id, today or date.today()))).all()
+
+    stats = {"total": 0, "overdue": 0, "completed_week": 0, "completed_today": 0}
+    by_status: Dict[Any, int] = {}
+    by_priority: Dict[Any, int] = {}
+    by_category: Dict[Any, int] = {}
+    for row in rows:
+        stats["total"] += row.count
+        stats["overdue"] += row.overdue or 0
+        stats["completed_week"] += row.completed_week or 0
+        stats["completed_today"] += row.completed_today or 0
+        by_status[row.status] = by_status.get(row.status, 0) + row.count
+        by_priority[row.priority] = by_priority.get(row.priority, 0) + row.count
+        if row.category is not None:
+            by_category[row.category] = by_category.get(row.category, 0) + row.count
+
+    stats["completed"] = by_status.get("completed", 0)
+    stats["pending"] = by_status.get("pending", 0)
+    stats["completion_rate"] = (stats["completed"] / stats["total"] * 100) if stats["total"] > 0 else 0
+    stats["by_status"] = _sorted_counts(by_status)
+    stats["by_priority"] = _sorted_counts(by_priority)
+    stats["by_category"] = _sorted_counts(by_category)
+    return stats
+
+
+async def get_habit_stats(db: AsyncSession, user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """Contadores y distribuciones de los hábitos del usuario (y sus registros recientes) en una consulta"""
+    rows = (await db.execute(habit_stats_query(user_id, today or date.today()))).all()
+
+    stats = {"total": 0, "active": 0, "completed_week": 0, "completed_today": 0}
+    by_category: Dict[Any, int] = {}
+    by_frequency: Dict[Any, int] = {}
+    for row in rows:
+        stats["total"] += row.count
+        if row.is_active:
+            stats["active"] += row.count
+        stats["completed_week"] += row.completed_week or 0
+        stats["completed_today"] += row.completed_today or 0
+        by_frequency[row.frequency] = by_frequency.get(row.frequency, 0) + row.count
+        if row.category is not None:
+            by_category[row.category] = by_category.get(row.category, 0) + row.count
+
+    stats["by_category"] = _sorted_counts(by_category)
+    stats["by_frequency"] = _sorted_counts(by_frequency)
+    return stats
+
+
+async def get_overdue_count(db: AsyncSession, user_id: int, today: Optional[date] = None) -> int:
+    """Tareas abiertas con la fecha límite ya pasada (rango del índice por usuario y fecha límite)"""
+    return await db.scalar(select(func.count(Task.id)).where(
+        Task.user_id == user_id,
+        Task.due_date < (today or date.today()),
+        Task.status.in_(OPEN_STATUSES)
+    ))
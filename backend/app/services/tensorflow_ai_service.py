@@ -3,39 +3,215 @@
 Servicio de IA con TensorFlow - Sistema de Machine Learning Real
 """
 
-import tensorflow as tf
 import numpy as np
-import pandas as pd
 import json
 import re
 import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import logging
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
 import pickle
 import os
 
+from app.config import settings
+from .model_store import ModelArtifactStore
+from .prediction_cache import PredictionCache, normalize_text
+from .message_features import MessageFeatures
+from .date_resolver import resolve_due_date
+from .keyword_matcher import KeywordMatcher
+from .conversation_store import create_conversation_store
+from .model_manager import IntentModelVersion
+from .tiered_classifier import TieredIntentClassifier
+from .intent_engines import (
+    KerasIntentEngine, NumpyIntentModel, QuantizedIntentModel, INT8_WEIGHTS_DIRNAME, NUMPY_WEIGHTS_DIRNAME,
+    PARITY_TOLERANCE
+)
+from .mapped_artifacts import (
+    MappedLabelEncoder, MappedTfidfVectorizer, MAPPED_LABELS_FILENAME, MAPPED_VECTORIZER_DIRNAME,
+    VECTORIZER_TOLERANCE
+)
+
 logger = logging.getLogger(__name__)
 
+# Reglas de palabras clave: (intención, confianza, categorías que deben aparecer); gana la primera que coincide
+INTENT_RULES = [
+    ("greeting", 0.8, ["greeting"]),
+    ("create_task", 0.7, ["fallback_create_task"]),
+    ("create_habit", 0.7, ["fallback_create_habit"]),
+    ("view_tasks", 0.8, ["fallback_view", "fallback_task_word"]),
+    ("view_habits", 0.8, ["fallback_view", "fallback_habit_word"]),
+    ("general", 0.3, ["fallback_view"]),
+    ("productivity_tips", 0.6, ["fallback_productivity_tips"]),
+    ("analytics", 0.7, ["fallback_analytics"]),
+    ("help", 0.6, ["fallback_help"]),
+    ("goodbye", 0.8, ["fallback_goodbye"])
+]
+
+# Con carga emocional el mensaje va siempre al modelo, aunque una regla coincida
+RULE_BLOCKING_CATEGORIES = [
+    "positive", "negative", "achievement", "celebration", "struggle", "gratitude", "help_seeking", "mood_negative"
+]
+
+def _import_tensorflow():
+    """Importar TensorFlow solo cuando hace falta entrenar o cargar el modelo Keras"""
+    import tensorflow as tf
+    return tf
+
 class TensorFlowAIService:
     def __init__(self):
-        self.model = None
-        self.vectorizer = None
-        self.label_encoder = None
-        self.conversation_history = []
+        # Versión activa del modelo; se sustituye completa en cada recarga
+        self.active_model: Optional[IntentModelVersion] = None
+        self.conversation_store = create_conversation_store(namespace="tensorflow")
         self.user_context = {}
-        self.model_path = "ai_model"
-        self.vectorizer_path = "vectorizer.pkl"
-        self.label_encoder_path = "label_encoder.pkl"
-        
-        # Datos de entrenamiento para el modelo
-        self.training_data = self._create_training_data()
+        self.artifact_store = ModelArtifactStore(settings.AI_MODEL_CACHE_DIR)
+        self.prediction_cache = PredictionCache(
+            max_size=settings.AI_PREDICTION_CACHE_SIZE,
+            ttl_seconds=settings.AI_PREDICTION_CACHE_TTL_SECONDS
+        )
+        
+        # Datos de entrenamiento para el modelo (más los del fichero de datos adicionales)
+        self.training_data = self._create_training_data() + self._load_extra_training_data()
+        
+        # Palabras clave de todos los analizadores, compiladas en un único autómata
+        self.keyword_matcher = KeywordMatcher(self._create_keyword_categories())
+        
+        # Tabla exacta y reglas antes del modelo: la mayoría de mensajes no llegan a la red
+        self.intent_classifier = TieredIntentClassifier(
+            self._predict_intents,
+            self._rule_intent_prediction,
+            enabled=settings.AI_TIERED_CLASSIFIER_ENABLED,
+            featurize=self.build_features
+        )
+        
+        # Hiperparámetros: cualquier cambio invalida la versión cacheada
+        self.hyperparameters = {
+            "max_features": 1000,
+            "stop_words": "english",
+            "dtype": "float32",
+            "hidden_units": [128, 64],
+            "dropout": [0.3, 0.2],
+            "optimizer": "adam",
+            "epochs": 50,
+            "batch_size": 32,
+            "test_size": 0.2,
+            "random_state": 42
+        }
         
-        # Inicializar el modelo
-        self._initialize_model()
+        # Cargar el modelo cacheado o entrenarlo si los datos cambiaron
+        self._load_or_train_model()
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.active_model.version if self.active_model else None
+    
+    @property
+    def model(self) -> Any:
+        return self.active_model.keras_model if self.active_model else None
+    
+    @property
+    def intent_engine(self) -> Any:
+        return self.active_model.intent_engine if self.active_model else None
+    
+    @property
+    def inference_backend(self) -> Optional[str]:
+        return self.active_model.inference_backend if self.active_model else None
+    
+    @property
+    def vectorizer(self) -> Any:
+        return self.active_model.vectorizer if self.active_model else None
+    
+    @property
+    def label_encoder(self) -> Any:
+        return self.active_model.label_encoder if self.active_model else None
+    
+    @staticmethod
+    def _create_keyword_categories() -> Dict[str, List[str]]:
+        """Listas de palabras clave por categoría usadas por los analizadores de reglas"""
+        return {
+            # Análisis rápido del mensaje
+            'greeting': ['hola', 'buenos', 'buenas', 'como estas'],
+            'positive': ['feliz', 'contento', 'bien', 'genial', 'excelente', 'perfecto', 'conseguí', 'logré', 'gané', 'trabajo', 'éxito', 'alegre'],
+            'negative': ['triste', 'mal', 'terrible', 'horrible', 'deprimido', 'ansioso', 'miedo', 'problema', 'difícil', 'no puedo', 'me siento mal'],
+            'achievement': ['conseguí', 'logré', 'gané', 'completé', 'terminé', 'alcanzé', 'obtuve', 'me dieron', 'me contrataron', 'pasé', 'aprobé'],
+            'celebration': ['me siento bien', 'estoy feliz', 'me alegra', 'estoy contento', 'es genial', 'es maravilloso', 'me encanta'],
+            'struggle': ['no puedo', 'no sé', 'me cuesta', 'es difícil', 'estoy perdido', 'no entiendo', 'tengo problemas', 'estoy confundido'],
+            'gratitude': ['gracias', 'agradecido', 'bendecido', 'afortunado', 'me siento bien'],
+            'help_seeking': ['ayuda', 'necesito', 'no sé qué hacer', 'qué hago', 'cómo', 'me siento perdido', 'no puedo más'],
+            'intensity': ['muy', 'super', 'extremadamente', 'increíblemente', 'realmente', 'totalmente', 'completamente'],
+            
+            # Patrones semánticos
+            'achievement_pattern': [
+                'conseguí', 'logré', 'gané', 'completé', 'terminé', 'alcanzé', 'obtuve',
+                'me dieron', 'me contrataron', 'pasé', 'aprobé', 'superé', 'vencí',
+                'lo hice', 'pude', 'salió bien', 'funcionó', 'resultó'
+            ],
+            'achievement_work': ['trabajo', 'empleo'],
+            'achievement_academic': ['estudio', 'examen'],
+            'achievement_relationship': ['relación', 'amor'],
+            'struggle_pattern': [
+                'no puedo', 'no sé', 'me cuesta', 'es difícil', 'estoy perdido',
+                'no entiendo', 'me siento mal', 'tengo problemas', 'estoy confundido',
+                'no funciona', 'no sale', 'me frustra', 'me agobia'
+            ],
+            'celebration_pattern': [
+                'me siento bien', 'estoy feliz', 'me alegra', 'estoy contento',
+                'es genial', 'es maravilloso', 'me encanta', 'estoy emocionado'
+            ],
+            'help_seeking_pattern': [
+                'ayuda', 'necesito', 'no sé qué hacer', 'qué hago', 'cómo',
+                'me siento perdido', 'no puedo más', 'por favor'
+            ],
+            'experience_sharing_pattern': [
+                'me pasó', 'me ocurrió', 'me sucedió', 'me encontré',
+                'descubrí', 'me di cuenta', 'experimenté', 'viví'
+            ],
+            'reflection_pattern': [
+                'creo que', 'pienso que', 'me doy cuenta', 'reflexiono',
+                'me pregunto', 'considero', 'evalúo', 'analizo'
+            ],
+            'planning_pattern': [
+                'voy a', 'quiero', 'me gustaría', 'planeo', 'tengo planes',
+                'espero', 'deseo', 'aspiro', 'busco'
+            ],
+            'gratitude_pattern': [
+                'gracias', 'agradecido', 'bendecido', 'afortunado',
+                'me siento bien', 'estoy agradecido', 'doy gracias'
+            ],
+            
+            # Tema principal (en orden de prioridad)
+            'topic_work': ['trabajo', 'empleo', 'jefe', 'oficina', 'carrera', 'profesión'],
+            'topic_relationships': ['novio', 'novia', 'pareja', 'amigo', 'familia', 'relación'],
+            'topic_health': ['salud', 'enfermo', 'dolor', 'cuerpo', 'médico'],
+            'topic_education': ['estudio', 'universidad', 'colegio', 'examen', 'tarea'],
+            'topic_personal_growth': ['crecer', 'mejorar', 'desarrollar', 'aprender', 'cambiar'],
+            'topic_emotions': ['sentir', 'emoción', 'estado de ánimo', 'mood'],
+            'topic_daily_life': ['día', 'vida', 'rutina', 'actividades'],
+            
+            # Contexto temporal y social
+            'temporal_past': ['ayer', 'antes', 'pasado', 'ocurrió', 'sucedió'],
+            'temporal_present': ['hoy', 'ahora', 'actualmente', 'en este momento'],
+            'temporal_future': ['mañana', 'después', 'pronto', 'planeo', 'voy a'],
+            'social_alone': ['solo', 'sola', 'sin nadie', 'por mi cuenta'],
+            'social_with_others': ['con', 'junto', 'compañía', 'gente'],
+            'social_seeking_connection': ['necesito', 'busco', 'quiero conectar'],
+            'urgency': ['ayuda', 'urgente', 'ahora', 'inmediatamente', 'por favor', 'necesito'],
+            
+            # Estado de ánimo de la conversación
+            'mood_positive': ["genial", "excelente", "perfecto", "gracias", "ayuda", "bien", "feliz", "contento", "emocionado", "motivado", "energía", "increíble", "maravilloso", "fantástico", "brillante", "exitoso", "logrado", "conseguido", "alcanzado", "superado", "conseguí", "logré", "gané", "trabajo", "éxito", "alegre", "orgulloso", "satisfecho"],
+            'mood_negative': ["mal", "problema", "difícil", "no puedo", "frustrado", "cansado", "estresado", "ansioso", "preocupado", "triste", "deprimido", "agotado", "desmotivado", "perdido", "confundido", "abrumado", "desanimado", "desesperado", "solo", "solitario"],
+            'mood_neutral': ["normal", "regular", "ok", "bien", "tranquilo", "calmado", "equilibrado", "estable", "centrado", "balanceado"],
+            
+            # Reglas de respaldo para intenciones
+            'fallback_create_task': ['tarea', 'crear', 'nueva', 'agregar'],
+            'fallback_create_habit': ['habito', 'establecer', 'nuevo'],
+            'fallback_view': ['ver', 'mis', 'lista', 'existentes'],
+            'fallback_task_word': ['tarea'],
+            'fallback_habit_word': ['habito'],
+            'fallback_productivity_tips': ['consejo', 'productividad', 'mejorar'],
+            'fallback_analytics': ['estadistica', 'analytics', 'progreso'],
+            'fallback_help': ['ayuda', 'puedes', 'funciones'],
+            'fallback_goodbye': ['adiós', 'chao', 'gracias', 'hasta']
+        }
     
     def _create_training_data(self) -> List[Dict]:
         """Crear datos de entrenamiento para el modelo de ML"""
@@ -106,168 +282,463 @@ class TensorFlowAIService:
             {"text": "gracias", "intent": "goodbye", "response": "¡De nada! Estoy aquí para acompañarte siempre que lo necesites. ¡Tu crecimiento me inspira! 💫"},
         ]
     
-    def _initialize_model(self):
-        """Inicializar el modelo de TensorFlow"""
+    @staticmethod
+    def _create_holdout_data() -> List[Dict]:
+        """Frases reservadas (no están en el entrenamiento) para validar una versión nueva"""
+        return [
+            {"text": "hola buenas tardes", "intent": "greeting"},
+            {"text": "buenos días asistente", "intent": "greeting"},
+            {"text": "quiero crear una tarea nueva", "intent": "create_task"},
+            {"text": "agregar una tarea a mi lista", "intent": "create_task"},
+            {"text": "quiero empezar un hábito nuevo", "intent": "create_habit"},
+            {"text": "muéstrame mis tareas pendientes", "intent": "view_tasks"},
+            {"text": "ver todas mis tareas", "intent": "view_tasks"},
+            {"text": "ver mis hábitos de la semana", "intent": "view_habits"},
+            {"text": "consejos para ser más productivo", "intent": "productivity_tips"},
+            {"text": "quiero ver mis estadísticas de progreso", "intent": "analytics"},
+            {"text": "qué funciones tienes", "intent": "help"},
+            {"text": "me siento muy triste hoy", "intent": "emotional_support"},
+            {"text": "estoy ansioso y preocupado", "intent": "emotional_support"},
+            {"text": "adiós, nos vemos", "intent": "goodbye"},
+        ]
+    
+    def _load_extra_training_data(self) -> List[Dict]:
+        """Leer ejemplos adicionales de `AI_EXTRA_TRAINING_DATA_PATH` (lista JSON de {text, intent, response})"""
+        path = settings.AI_EXTRA_TRAINING_DATA_PATH
+        if not path or not os.path.exists(path):
+            return []
+        
         try:
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+            extra = [
+                {"text": item["text"], "intent": item["intent"], "response": item.get("response", "")}
+                for item in items
+                if isinstance(item, dict) and item.get("text") and item.get("intent")
+            ]
+            logger.info(f"📚 {len(extra)} ejemplos de entrenamiento adicionales cargados de {path}")
+            return extra
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Error leyendo datos de entrenamiento adicionales: {e}")
+            return []
+    
+    def _compute_model_version(self, training_data: Optional[List[Dict]] = None) -> str:
+        """Clave de contenido: hash de los datos de entrenamiento y los hiperparámetros"""
+        return ModelArtifactStore.compute_key(
+            training_data=self.training_data if training_data is None else training_data,
+            hyperparameters=self.hyperparameters
+        )
+    
+    def _load_or_train_model(self):
+        """Cargar la versión cacheada del modelo o entrenar una nueva"""
+        candidate = self._build_model_version(self.training_data, self._compute_model_version())
+        if candidate is None:
+            self._create_fallback_model()
+        else:
+            self._activate(candidate)
+    
+    def _build_model_version(self, training_data: List[Dict], version: str) -> Optional[IntentModelVersion]:
+        """Cargar una versión del caché o entrenarla, sin tocar la versión activa"""
+        if self.artifact_store.exists(version):
+            candidate = self._load_model(version, training_data)
+            if candidate is not None:
+                return candidate
+        
+        logger.info(f"🧠 No hay modelo cacheado para la versión {version}, entrenando...")
+        candidate = self._initialize_model(training_data, version)
+        
+        if (candidate is not None and candidate.inference_backend in ["numpy", "int8"]
+                and settings.AI_MMAP_MODEL_ARTIFACTS and self.artifact_store.exists(version)):
+            # Reabrir desde disco para compartir las páginas con el resto de workers
+            return self._load_model(version, training_data) or candidate
+        return candidate
+    
+    def _activate(self, candidate: IntentModelVersion):
+        """Publicar una versión con un único cambio de referencia"""
+        self.active_model = candidate
+        self.training_data = candidate.training_data
+        self.intent_classifier.build_exact_table(candidate.training_data, candidate.version)
+        
+        # Las predicciones de la versión anterior ya no son válidas
+        self.prediction_cache.clear()
+    
+    def _initialize_model(self, training_data: List[Dict], version: str) -> Optional[IntentModelVersion]:
+        """Entrenar el modelo de TensorFlow para los datos dados"""
+        try:
+            # sklearn solo se importa si hay que entrenar
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.model_selection import train_test_split
+            from sklearn.preprocessing import LabelEncoder
+            
+            params = self.hyperparameters
+            
             # Preparar datos de entrenamiento
-            texts = [item["text"] for item in self.training_data]
-            intents = [item["intent"] for item in self.training_data]
+            texts = [item["text"] for item in training_data]
+            intents = [item["intent"] for item in training_data]
             
             # Vectorizar texto
-            self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-            X = self.vectorizer.fit_transform(texts)
+            vectorizer = TfidfVectorizer(
+                max_features=params["max_features"],
+                stop_words=params["stop_words"],
+                dtype=np.dtype(params["dtype"])
+            )
+            X = vectorizer.fit_transform(texts)
             
             # Codificar etiquetas
-            self.label_encoder = LabelEncoder()
-            y = self.label_encoder.fit_transform(intents)
+            label_encoder = LabelEncoder()
+            y = label_encoder.fit_transform(intents)
             
             # Dividir datos
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=params["test_size"], random_state=params["random_state"]
+            )
             
-            # Convertir a formato TensorFlow
+            # Convertir a formato TensorFlow (solo para entrenar; la inferencia trabaja en CSR)
             X_train_dense = X_train.toarray()
             X_test_dense = X_test.toarray()
             
             # Crear modelo de red neuronal
-            self.model = tf.keras.Sequential([
-                tf.keras.layers.Dense(128, activation='relu', input_shape=(X_train_dense.shape[1],)),
-                tf.keras.layers.Dropout(0.3),
-                tf.keras.layers.Dense(64, activation='relu'),
-                tf.keras.layers.Dropout(0.2),
-                tf.keras.layers.Dense(len(self.label_encoder.classes_), activation='softmax')
+            tf = _import_tensorflow()
+            # Semilla fija: reentrenar con los mismos datos da el mismo modelo
+            tf.keras.utils.set_random_seed(params["random_state"])
+            first_units, second_units = params["hidden_units"]
+            first_dropout, second_dropout = params["dropout"]
+            model = tf.keras.Sequential([
+                tf.keras.layers.Dense(first_units, activation='relu', input_shape=(X_train_dense.shape[1],)),
+                tf.keras.layers.Dropout(first_dropout),
+                tf.keras.layers.Dense(second_units, activation='relu'),
+                tf.keras.layers.Dropout(second_dropout),
+                tf.keras.layers.Dense(len(label_encoder.classes_), activation='softmax')
             ])
             
             # Compilar modelo
-            self.model.compile(
-                optimizer='adam',
+            model.compile(
+                optimizer=params["optimizer"],
                 loss='sparse_categorical_crossentropy',
                 metrics=['accuracy']
             )
             
             # Entrenar modelo
-            self.model.fit(
+            model.fit(
                 X_train_dense, y_train,
-                epochs=50,
-                batch_size=32,
+                epochs=params["epochs"],
+                batch_size=params["batch_size"],
                 validation_data=(X_test_dense, y_test),
                 verbose=0
             )
             
-            # Guardar modelo
-            self._save_model()
+            # Elegir motor de inferencia y guardar modelo
+            intent_engine, inference_backend = self._select_inference_engine(model, vectorizer, label_encoder, training_data)
+            candidate = IntentModelVersion(
+                version, vectorizer, label_encoder, intent_engine, inference_backend,
+                keras_model=model, training_data=training_data
+            )
+            self._save_model(candidate)
             
             logger.info("✅ Modelo de TensorFlow entrenado y guardado exitosamente")
+            return candidate
             
         except Exception as e:
             logger.error(f"❌ Error inicializando modelo: {e}")
-            # Fallback a modelo simple
-            self._create_fallback_model()
+            return None
     
     def _create_fallback_model(self):
         """Crear modelo de respaldo simple"""
         logger.info("🔄 Creando modelo de respaldo...")
-        self.model = None
-        self.vectorizer = None
-        self.label_encoder = None
+        self.active_model = None
+        self.intent_classifier.build_exact_table(self.training_data)
+        self.prediction_cache.clear()
     
-    def _save_model(self):
-        """Guardar modelo entrenado"""
+    def _save_model(self, candidate: IntentModelVersion):
+        """Guardar modelo entrenado en el almacén de artefactos"""
         try:
-            if not os.path.exists(self.model_path):
-                os.makedirs(self.model_path)
-            
-            self.model.save(self.model_path)
-            
-            with open(self.vectorizer_path, 'wb') as f:
-                pickle.dump(self.vectorizer, f)
-            
-            with open(self.label_encoder_path, 'wb') as f:
-                pickle.dump(self.label_encoder, f)
-                
-            logger.info("✅ Modelo guardado exitosamente")
+            self.artifact_store.save(candidate.version, lambda path: self._write_artifacts(candidate, path))
+            logger.info(f"✅ Modelo guardado exitosamente (versión {candidate.version})")
             
         except Exception as e:
             logger.error(f"❌ Error guardando modelo: {e}")
     
-    def _load_model(self):
-        """Cargar modelo guardado"""
+    def _select_inference_engine(self, model: Any, vectorizer: Any, label_encoder: Any, training_data: List[Dict]):
+        """Usar el forward pass de NumPy si reproduce a Keras (en INT8 si está activado); si no, Keras"""
+        keras_engine = KerasIntentEngine(model)
+        
+        if settings.AI_INFERENCE_BACKEND == "keras":
+            return keras_engine, "keras"
+        
+        numpy_model = NumpyIntentModel.from_keras(model)
+        samples = vectorizer.transform([item["text"] for item in training_data])
+        parity_error = numpy_model.parity_error(keras_engine, samples)
+        
+        if parity_error > PARITY_TOLERANCE:
+            logger.warning(f"⚠️ El motor NumPy difiere de Keras ({parity_error:.2e}), se mantiene Keras")
+            return keras_engine, "keras"
+        
+        logger.info(f"⚡ Inferencia con NumPy activada (diferencia máxima con Keras: {parity_error:.2e})")
+        
+        if settings.AI_INFERENCE_PRECISION == "int8":
+            quantized_model = self._quantize_engine(numpy_model, vectorizer, label_encoder, training_data)
+            if quantized_model is not None:
+                return quantized_model, "int8"
+        return numpy_model, "numpy"
+    
+    def _quantize_engine(self, numpy_model: NumpyIntentModel, vectorizer: Any, label_encoder: Any,
+                         training_data: List[Dict]) -> Optional[QuantizedIntentModel]:
+        """Cuantizar a INT8 solo si la precisión no cae más de lo permitido frente a float32
+        
+        Se compara sobre las frases de entrenamiento y las reservadas.
+        """
+        quantized_model = QuantizedIntentModel.from_float(numpy_model)
+        samples = training_data + self._create_holdout_data()
+        float_accuracy = self._engine_accuracy(numpy_model, vectorizer, label_encoder, samples)
+        int8_accuracy = self._engine_accuracy(quantized_model, vectorizer, label_encoder, samples)
+        
+        if float_accuracy - int8_accuracy > settings.AI_INT8_MAX_ACCURACY_DROP:
+            logger.warning(
+                f"⚠️ INT8 pierde demasiada precisión ({float_accuracy:.3f} → {int8_accuracy:.3f}), se mantiene float32"
+            )
+            return None
+        
+        logger.info(f"⚡ Inferencia INT8 activada (precisión float32 {float_accuracy:.3f}, INT8 {int8_accuracy:.3f})")
+        return quantized_model
+    
+    def _write_engine_weights(self, path: str, keras_model: Any, intent_engine: Any, inference_backend: str):
+        """Exportar los pesos NumPy verificados (y los INT8 si están activos) que aún no existan"""
+        numpy_weights_path = os.path.join(path, NUMPY_WEIGHTS_DIRNAME)
+        int8_weights_path = os.path.join(path, INT8_WEIGHTS_DIRNAME)
+        
+        if inference_backend == "int8":
+            if not os.path.exists(int8_weights_path):
+                intent_engine.save(int8_weights_path)
+            if not os.path.exists(numpy_weights_path):
+                NumpyIntentModel.from_keras(keras_model).save(numpy_weights_path)
+        elif inference_backend == "numpy" and not os.path.exists(numpy_weights_path):
+            intent_engine.save(numpy_weights_path)
+    
+    def _load_numpy_engine(self, path: str, vectorizer: Any, label_encoder: Any, training_data: List[Dict]):
+        """Motor NumPy ya exportado: INT8 si está activado y pasa la verificación de precisión"""
+        mmap = settings.AI_MMAP_MODEL_ARTIFACTS
+        int8_weights_path = os.path.join(path, INT8_WEIGHTS_DIRNAME)
+        
+        if settings.AI_INFERENCE_PRECISION == "int8" and os.path.exists(int8_weights_path):
+            return QuantizedIntentModel.load(int8_weights_path, mmap=mmap), "int8"
+        
+        numpy_model = NumpyIntentModel.load(os.path.join(path, NUMPY_WEIGHTS_DIRNAME), mmap=mmap)
+        if settings.AI_INFERENCE_PRECISION == "int8":
+            # Versión exportada antes de activar INT8: cuantizar ahora
+            quantized_model = self._quantize_engine(numpy_model, vectorizer, label_encoder, training_data)
+            if quantized_model is not None:
+                quantized_model.save(int8_weights_path)
+                return QuantizedIntentModel.load(int8_weights_path, mmap=mmap), "int8"
+        return numpy_model, "numpy"
+    
+    def _write_artifacts(self, candidate: IntentModelVersion, path: str) -> Dict[str, Any]:
+        """Escribir modelo, vectorizador y codificador de etiquetas en `path`"""
+        candidate.keras_model.save(os.path.join(path, "model.keras"))
+        
+        # Los pesos NumPy solo se exportan si pasaron la verificación de paridad
+        self._write_engine_weights(path, candidate.keras_model, candidate.intent_engine, candidate.inference_backend)
+        
+        with open(os.path.join(path, "vectorizer.pkl"), 'wb') as f:
+            pickle.dump(candidate.vectorizer, f)
+        
+        with open(os.path.join(path, "label_encoder.pkl"), 'wb') as f:
+            pickle.dump(candidate.label_encoder, f)
+        
+        self._write_mapped_artifacts(candidate.vectorizer, candidate.label_encoder, candidate.training_data, path)
+        
+        return {
+            "hyperparameters": self.hyperparameters,
+            "training_data_size": len(candidate.training_data),
+            "classes": candidate.label_encoder.classes_.tolist()
+        }
+    
+    def _write_mapped_artifacts(self, vectorizer: Any, label_encoder: Any, training_data: List[Dict], path: str):
+        """Exportar vocabulario, idf y etiquetas a `.npy` mapeables si reproducen a sklearn"""
         try:
-            if os.path.exists(self.model_path):
-                self.model = tf.keras.models.load_model(self.model_path)
-                
-                with open(self.vectorizer_path, 'rb') as f:
-                    self.vectorizer = pickle.load(f)
+            mapped_vectorizer = MappedTfidfVectorizer.from_sklearn(vectorizer)
+            parity_error = mapped_vectorizer.parity_error(vectorizer, [item["text"] for item in training_data])
+            if parity_error > VECTORIZER_TOLERANCE:
+                logger.warning(f"⚠️ El vectorizador mapeado difiere de sklearn ({parity_error:.2e}), no se exporta")
+                return
+            # El directorio del vectorizador se publica el último: su presencia marca la exportación completa
+            MappedLabelEncoder.from_sklearn(label_encoder).save(os.path.join(path, MAPPED_LABELS_FILENAME))
+            mapped_vectorizer.save(os.path.join(path, MAPPED_VECTORIZER_DIRNAME))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron exportar los artefactos mapeables: {e}")
+    
+    def _load_preprocessors(self, path: str, training_data: List[Dict]):
+        """Vectorizador y etiquetas: mapeados en memoria si existen, si no desde pickle"""
+        mapped_vectorizer_path = os.path.join(path, MAPPED_VECTORIZER_DIRNAME)
+        mapped_labels_path = os.path.join(path, MAPPED_LABELS_FILENAME)
+        
+        if settings.AI_MMAP_MODEL_ARTIFACTS:
+            if os.path.exists(mapped_vectorizer_path) and os.path.exists(mapped_labels_path):
+                # Sin pickle: ni siquiera hace falta importar sklearn
+                return MappedTfidfVectorizer.load(mapped_vectorizer_path), MappedLabelEncoder.load(mapped_labels_path)
+        
+        with open(os.path.join(path, "vectorizer.pkl"), 'rb') as f:
+            vectorizer = pickle.load(f)
+        
+        with open(os.path.join(path, "label_encoder.pkl"), 'rb') as f:
+            label_encoder = pickle.load(f)
+        
+        # Versiones cacheadas antes de existir el formato mapeable
+        if not os.path.exists(mapped_vectorizer_path):
+            self._write_mapped_artifacts(vectorizer, label_encoder, training_data, path)
+        
+        return vectorizer, label_encoder
+    
+    def _load_model(self, version: str, training_data: List[Dict]) -> Optional[IntentModelVersion]:
+        """Cargar una versión guardada del almacén de artefactos"""
+        try:
+            path = self.artifact_store.path_for(version)
+            numpy_weights_path = os.path.join(path, NUMPY_WEIGHTS_DIRNAME)
+            vectorizer, label_encoder = self._load_preprocessors(path, training_data)
+            
+            model = None
+            if settings.AI_INFERENCE_BACKEND != "keras" and os.path.exists(numpy_weights_path):
+                # Pesos ya verificados: no hace falta importar TensorFlow
+                intent_engine, inference_backend = self._load_numpy_engine(path, vectorizer, label_encoder, training_data)
+            else:
+                tf = _import_tensorflow()
+                model = tf.keras.models.load_model(os.path.join(path, "model.keras"))
+                intent_engine, inference_backend = self._select_inference_engine(
+                    model, vectorizer, label_encoder, training_data
+                )
                 
-                with open(self.label_encoder_path, 'rb') as f:
-                    self.label_encoder = pickle.load(f)
-                    
-                logger.info("✅ Modelo cargado exitosamente")
-                return True
+                # Versiones cacheadas antes de existir el exportador
+                self._write_engine_weights(path, model, intent_engine, inference_backend)
+            
+            logger.info(f"✅ Modelo cargado exitosamente desde caché (versión {version}, motor {inference_backend})")
+            return IntentModelVersion(
+                version, vectorizer, label_encoder, intent_engine, inference_backend,
+                keras_model=model, training_data=training_data
+            )
                 
         except Exception as e:
             logger.error(f"❌ Error cargando modelo: {e}")
-            return False
+            return None
+    
+    def _evaluate_model(self, candidate: IntentModelVersion, samples: List[Dict]) -> float:
+        """Precisión de una versión sobre ejemplos etiquetados (sin pasar por el caché)"""
+        return self._engine_accuracy(candidate.intent_engine, candidate.vectorizer, candidate.label_encoder, samples)
+    
+    @staticmethod
+    def _engine_accuracy(intent_engine: Any, vectorizer: Any, label_encoder: Any, samples: List[Dict]) -> float:
+        """Fracción de ejemplos cuya intención predice el motor"""
+        if not samples:
+            return 1.0
+        
+        X = vectorizer.transform([item["text"] for item in samples])
+        predicted = label_encoder.classes_[np.argmax(intent_engine.predict(X), axis=1)]
+        correct = sum(1 for item, intent in zip(samples, predicted) if item["intent"] == intent)
+        return correct / len(samples)
     
     def _predict_intent(self, text: str) -> Dict[str, Any]:
         """Predecir intención usando el modelo de TensorFlow"""
+        return self._predict_intents([text])[0]
+    
+    def _predict_intents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Predecir intenciones de varios textos con una sola llamada al modelo"""
         try:
-            if self.model is None or self.vectorizer is None or self.label_encoder is None:
-                return self._fallback_intent_prediction(text)
-            
-            # Vectorizar texto
-            text_vectorized = self.vectorizer.transform([text])
-            text_dense = text_vectorized.toarray()
+            # Leer la versión activa una sola vez: un cambio en caliente no afecta a este lote
+            active_model = self.active_model
+            if active_model is None:
+                return [self._fallback_intent_prediction(text) for text in texts]
             
-            # Predecir
-            predictions = self.model.predict(text_dense, verbose=0)
-            predicted_class = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class])
+            # Buscar en el caché por versión del modelo y mensaje normalizado
+            normalized_texts = [normalize_text(text) for text in texts]
+            results = {}
+            pending = []
+            for normalized in dict.fromkeys(normalized_texts):
+                cached = self.prediction_cache.get((active_model.version, normalized))
+                if cached is not None:
+                    results[normalized] = cached
+                else:
+                    pending.append(normalized)
             
-            # Decodificar intención
-            intent = self.label_encoder.inverse_transform([predicted_class])[0]
+            if pending:
+                # Vectorizar textos (matriz CSR float32, sin densificar)
+                texts_vectorized = active_model.vectorizer.transform(pending)
+                
+                # Predecir (NumPy o Keras según el motor seleccionado)
+                predictions = active_model.intent_engine.predict(texts_vectorized)
+                predicted_classes = np.argmax(predictions, axis=1)
+                
+                # Decodificar intenciones
+                intents = active_model.label_encoder.classes_[predicted_classes]
+                
+                for normalized, intent, predicted_class, row in zip(pending, intents, predicted_classes, predictions):
+                    result = {
+                        "intent": str(intent),
+                        "confidence": float(row[predicted_class]),
+                        "predictions": row.tolist(),
+                        "model_version": active_model.version
+                    }
+                    self.prediction_cache.set((active_model.version, normalized), result)
+                    results[normalized] = result
             
-            return {
-                "intent": intent,
-                "confidence": confidence,
-                "predictions": predictions[0].tolist()
-            }
+            # Copias para que quien llama no altere las entradas del caché
+            return [
+                {**results[normalized], "predictions": list(results[normalized]["predictions"])}
+                for normalized in normalized_texts
+            ]
             
         except Exception as e:
             logger.error(f"❌ Error en predicción: {e}")
-            return self._fallback_intent_prediction(text)
+            return [self._fallback_intent_prediction(text) for text in texts]
     
     def _fallback_intent_prediction(self, text: str) -> Dict[str, Any]:
         """Predicción de respaldo usando reglas simples"""
-        text_lower = text.lower()
+        hits = self.keyword_matcher.scan(text)
         
         # Reglas simples para intenciones
-        if any(word in text_lower for word in ['hola', 'buenos', 'buenas', 'como estas']):
-            return {"intent": "greeting", "confidence": 0.8, "predictions": []}
-        elif any(word in text_lower for word in ['tarea', 'crear', 'nueva', 'agregar']):
-            return {"intent": "create_task", "confidence": 0.7, "predictions": []}
-        elif any(word in text_lower for word in ['habito', 'establecer', 'nuevo']):
-            return {"intent": "create_habit", "confidence": 0.7, "predictions": []}
-        elif any(word in text_lower for word in ['ver', 'mis', 'lista', 'existentes']):
-            if 'tarea' in text_lower:
-                return {"intent": "view_tasks", "confidence": 0.8, "predictions": []}
-            elif 'habito' in text_lower:
-                return {"intent": "view_habits", "confidence": 0.8, "predictions": []}
-        elif any(word in text_lower for word in ['consejo', 'productividad', 'mejorar']):
-            return {"intent": "productivity_tips", "confidence": 0.6, "predictions": []}
-        elif any(word in text_lower for word in ['estadistica', 'analytics', 'progreso']):
-            return {"intent": "analytics", "confidence": 0.7, "predictions": []}
-        elif any(word in text_lower for word in ['ayuda', 'puedes', 'funciones']):
-            return {"intent": "help", "confidence": 0.6, "predictions": []}
-        elif any(word in text_lower for word in ['adiós', 'chao', 'gracias', 'hasta']):
-            return {"intent": "goodbye", "confidence": 0.8, "predictions": []}
-        else:
-            return {"intent": "general", "confidence": 0.3, "predictions": []}
+        for intent, confidence, categories in INTENT_RULES:
+            if all(hits.get(category) for category in categories):
+                return {"intent": intent, "confidence": confidence, "predictions": []}
+        
+        return {"intent": "general", "confidence": 0.3, "predictions": []}
+    
+    def build_features(self, message: str) -> MessageFeatures:
+        """Rasgos del mensaje (texto normalizado y palabras clave de todos los analizadores)"""
+        return MessageFeatures.build(message, self.keyword_matcher)
+    
+    def _rule_intent_prediction(self, features: MessageFeatures) -> Optional[Dict[str, Any]]:
+        """Regla de palabras clave solo si es inequívoca (si no, None y decide el modelo)
+        
+        La regla más específica tiene que ser única y con confianza suficiente, en un mensaje
+        corto y sin palabras de carga emocional.
+        """
+        if features.word_count > settings.AI_RULE_MAX_WORDS:
+            return None
+        
+        hits = features.keyword_hits
+        if any(hits.get(category) for category in RULE_BLOCKING_CATEGORIES):
+            return None
+        
+        matched = [
+            (len(categories), intent, confidence) for intent, confidence, categories in INTENT_RULES
+            if intent != "general" and all(hits.get(category) for category in categories)
+        ]
+        if not matched:
+            return None
+        
+        # Gana la regla más específica ("ver mis tareas" también contiene la palabra de "crear tarea")
+        specificity = max(matched)[0]
+        best = {(intent, confidence) for size, intent, confidence in matched if size == specificity}
+        if len(best) != 1:
+            return None
+        
+        intent, confidence = best.pop()
+        if confidence < settings.AI_RULE_MIN_CONFIDENCE:
+            return None
+        return {"intent": intent, "confidence": confidence, "predictions": []}
     
-    def _generate_intelligent_response(self, intent: str, text: str, user_context: Dict = None) -> Dict[str, Any]:
+    def _generate_intelligent_response(self, intent: str, text: str, user_context: Dict = None, user_id: str = None) -> Dict[str, Any]:
         """Generar respuesta inteligente basada en el contexto y la intención"""
         
         # Obtener contexto de conversación
-        conversation_context = self._get_conversation_context()
+        conversation_context = self._get_conversation_context(user_id)
         time_context = self._get_time_context()
         
         # Respuestas motivacionales según intención
@@ -345,13 +816,14 @@ class TensorFlowAIService:
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    def _generate_psychological_response(self, message: str, sentiment: str) -> str:
+    def _generate_psychological_response(self, message: str, sentiment: str,
+                                         features: Optional[MessageFeatures] = None) -> str:
         """Sistema inteligente de respuesta psicológica simplificado y robusto"""
         try:
             logger.info(f"🧠 Analizando mensaje: '{message[:50]}...' con sentimiento: {sentiment}")
             
             # Análisis simple pero inteligente
-            analysis = self._analyze_message_intelligently(message)
+            analysis = self._analyze_message_intelligently(message, features.keyword_hits if features else None)
             
             # Generar respuesta basada en análisis
             response = self._generate_contextual_response(message, analysis, {}, sentiment)
@@ -364,30 +836,28 @@ class TensorFlowAIService:
             # Respuesta de fallback
             return "Entiendo lo que dices. Es importante validar tus sentimientos y experiencias. ¿Puedes contarme más sobre cómo te sientes? Estoy aquí para escucharte y apoyarte en tu proceso."
     
-    def _analyze_message_intelligently(self, message: str) -> Dict[str, Any]:
+    def _analyze_message_intelligently(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Análisis inteligente simplificado del mensaje"""
-        message_lower = message.lower()
+        # Una sola pasada del autómata para todas las categorías
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
         
         # Análisis básico pero inteligente
         analysis = {
-            'is_greeting': any(word in message_lower for word in ['hola', 'buenos', 'buenas', 'como estas']),
-            'is_positive': any(word in message_lower for word in ['feliz', 'contento', 'bien', 'genial', 'excelente', 'perfecto', 'conseguí', 'logré', 'gané', 'trabajo', 'éxito', 'alegre']),
-            'is_negative': any(word in message_lower for word in ['triste', 'mal', 'terrible', 'horrible', 'deprimido', 'ansioso', 'miedo', 'problema', 'difícil', 'no puedo', 'me siento mal']),
-            'is_achievement': any(word in message_lower for word in ['conseguí', 'logré', 'gané', 'completé', 'terminé', 'alcanzé', 'obtuve', 'me dieron', 'me contrataron', 'pasé', 'aprobé']),
-            'is_celebration': any(word in message_lower for word in ['me siento bien', 'estoy feliz', 'me alegra', 'estoy contento', 'es genial', 'es maravilloso', 'me encanta']),
-            'is_struggle': any(word in message_lower for word in ['no puedo', 'no sé', 'me cuesta', 'es difícil', 'estoy perdido', 'no entiendo', 'tengo problemas', 'estoy confundido']),
-            'is_gratitude': any(word in message_lower for word in ['gracias', 'agradecido', 'bendecido', 'afortunado', 'me siento bien']),
-            'is_help_seeking': any(word in message_lower for word in ['ayuda', 'necesito', 'no sé qué hacer', 'qué hago', 'cómo', 'me siento perdido', 'no puedo más']),
+            'is_greeting': 'greeting' in hits,
+            'is_positive': 'positive' in hits,
+            'is_negative': 'negative' in hits,
+            'is_achievement': 'achievement' in hits,
+            'is_celebration': 'celebration' in hits,
+            'is_struggle': 'struggle' in hits,
+            'is_gratitude': 'gratitude' in hits,
+            'is_help_seeking': 'help_seeking' in hits,
             'has_question': '?' in message,
             'intensity': 1.0,
             'original_message': message
         }
         
         # Calcular intensidad
-        intensity_words = ['muy', 'super', 'extremadamente', 'increíblemente', 'realmente', 'totalmente', 'completamente']
-        for word in intensity_words:
-            if word in message_lower:
-                analysis['intensity'] *= 1.5
+        analysis['intensity'] *= 1.5 ** hits.get('intensity', 0)
         
         # Determinar valencia emocional
         if analysis['is_positive'] or analysis['is_achievement'] or analysis['is_celebration']:
@@ -401,244 +871,136 @@ class TensorFlowAIService:
     
     def _analyze_semantic_meaning(self, message: str) -> Dict[str, Any]:
         """Análisis semántico profundo del mensaje"""
-        message_lower = message.lower()
+        # Todos los detectores comparten el resultado de una única pasada
+        hits = self.keyword_matcher.scan(message)
         
         # Detectar patrones semánticos, no solo palabras
         semantic_patterns = {
-            'achievement': self._detect_achievement_pattern(message),
-            'struggle': self._detect_struggle_pattern(message),
-            'celebration': self._detect_celebration_pattern(message),
-            'seeking_help': self._detect_help_seeking_pattern(message),
-            'sharing_experience': self._detect_experience_sharing_pattern(message),
-            'reflection': self._detect_reflection_pattern(message),
-            'planning': self._detect_planning_pattern(message),
-            'gratitude': self._detect_gratitude_pattern(message)
+            'achievement': self._detect_achievement_pattern(message, hits),
+            'struggle': self._detect_struggle_pattern(message, hits),
+            'celebration': self._detect_celebration_pattern(message, hits),
+            'seeking_help': self._detect_help_seeking_pattern(message, hits),
+            'sharing_experience': self._detect_experience_sharing_pattern(message, hits),
+            'reflection': self._detect_reflection_pattern(message, hits),
+            'planning': self._detect_planning_pattern(message, hits),
+            'gratitude': self._detect_gratitude_pattern(message, hits)
         }
         
         return {
             'patterns': semantic_patterns,
-            'main_topic': self._identify_main_topic(message),
-            'temporal_context': self._analyze_temporal_context(message),
-            'social_context': self._analyze_social_context(message)
+            'main_topic': self._identify_main_topic(message, hits),
+            'temporal_context': self._analyze_temporal_context(message, hits),
+            'social_context': self._analyze_social_context(message, hits)
         }
     
-    def _detect_achievement_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_achievement_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de logro/éxito semánticamente"""
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
         patterns = {
             'has_achievement': False,
             'achievement_type': None,
             'confidence': 0.0
         }
         
-        # Patrones semánticos de logro (no solo palabras específicas)
-        achievement_indicators = [
-            'conseguí', 'logré', 'gané', 'completé', 'terminé', 'alcanzé', 'obtuve',
-            'me dieron', 'me contrataron', 'pasé', 'aprobé', 'superé', 'vencí',
-            'lo hice', 'pude', 'salió bien', 'funcionó', 'resultó'
-        ]
-        
         # Análisis contextual de logro
-        for indicator in achievement_indicators:
-            if indicator in message.lower():
-                patterns['has_achievement'] = True
-                patterns['confidence'] += 0.3
-                break
+        if hits.get('achievement_pattern'):
+            patterns['has_achievement'] = True
+            patterns['confidence'] += 0.3
         
         # Detectar tipo de logro por contexto
-        if 'trabajo' in message.lower() or 'empleo' in message.lower():
+        if hits.get('achievement_work'):
             patterns['achievement_type'] = 'work'
-        elif 'estudio' in message.lower() or 'examen' in message.lower():
+        elif hits.get('achievement_academic'):
             patterns['achievement_type'] = 'academic'
-        elif 'relación' in message.lower() or 'amor' in message.lower():
+        elif hits.get('achievement_relationship'):
             patterns['achievement_type'] = 'relationship'
         else:
             patterns['achievement_type'] = 'general'
         
         return patterns
     
-    def _detect_struggle_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_struggle_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de dificultad/lucha semánticamente"""
-        patterns = {
-            'has_struggle': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'has_struggle': 'struggle_pattern' in hits,
             'struggle_type': None,
             'intensity': 1.0
         }
-        
-        # Indicadores semánticos de dificultad
-        struggle_indicators = [
-            'no puedo', 'no sé', 'me cuesta', 'es difícil', 'estoy perdido',
-            'no entiendo', 'me siento mal', 'tengo problemas', 'estoy confundido',
-            'no funciona', 'no sale', 'me frustra', 'me agobia'
-        ]
-        
-        for indicator in struggle_indicators:
-            if indicator in message.lower():
-                patterns['has_struggle'] = True
-                break
-        
-        return patterns
     
-    def _detect_celebration_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_celebration_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de celebración/positividad"""
-        patterns = {
-            'has_celebration': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'has_celebration': 'celebration_pattern' in hits,
             'celebration_type': None
         }
-        
-        # Indicadores semánticos de celebración
-        celebration_indicators = [
-            'me siento bien', 'estoy feliz', 'me alegra', 'estoy contento',
-            'es genial', 'es maravilloso', 'me encanta', 'estoy emocionado'
-        ]
-        
-        for indicator in celebration_indicators:
-            if indicator in message.lower():
-                patterns['has_celebration'] = True
-                break
-        
-        return patterns
     
-    def _detect_help_seeking_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_help_seeking_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de búsqueda de ayuda"""
-        patterns = {
-            'seeking_help': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'seeking_help': 'help_seeking_pattern' in hits,
             'help_type': None
         }
-        
-        help_indicators = [
-            'ayuda', 'necesito', 'no sé qué hacer', 'qué hago', 'cómo',
-            'me siento perdido', 'no puedo más', 'por favor'
-        ]
-        
-        for indicator in help_indicators:
-            if indicator in message.lower():
-                patterns['seeking_help'] = True
-                break
-        
-        return patterns
     
-    def _detect_experience_sharing_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_experience_sharing_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de compartir experiencia"""
-        patterns = {
-            'sharing_experience': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'sharing_experience': 'experience_sharing_pattern' in hits,
             'experience_type': None
         }
-        
-        # Detectar si está compartiendo una experiencia personal
-        personal_indicators = [
-            'me pasó', 'me ocurrió', 'me sucedió', 'me encontré',
-            'descubrí', 'me di cuenta', 'experimenté', 'viví'
-        ]
-        
-        for indicator in personal_indicators:
-            if indicator in message.lower():
-                patterns['sharing_experience'] = True
-                break
-        
-        return patterns
     
-    def _detect_reflection_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_reflection_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de reflexión"""
-        patterns = {
-            'is_reflection': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'is_reflection': 'reflection_pattern' in hits,
             'reflection_type': None
         }
-        
-        reflection_indicators = [
-            'creo que', 'pienso que', 'me doy cuenta', 'reflexiono',
-            'me pregunto', 'considero', 'evalúo', 'analizo'
-        ]
-        
-        for indicator in reflection_indicators:
-            if indicator in message.lower():
-                patterns['is_reflection'] = True
-                break
-        
-        return patterns
     
-    def _detect_planning_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_planning_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de planificación"""
-        patterns = {
-            'is_planning': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'is_planning': 'planning_pattern' in hits,
             'planning_type': None
         }
-        
-        planning_indicators = [
-            'voy a', 'quiero', 'me gustaría', 'planeo', 'tengo planes',
-            'espero', 'deseo', 'aspiro', 'busco'
-        ]
-        
-        for indicator in planning_indicators:
-            if indicator in message.lower():
-                patterns['is_planning'] = True
-                break
-        
-        return patterns
     
-    def _detect_gratitude_pattern(self, message: str) -> Dict[str, Any]:
+    def _detect_gratitude_pattern(self, message: str, hits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Detectar patrones de gratitud"""
-        patterns = {
-            'has_gratitude': False,
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        return {
+            'has_gratitude': 'gratitude_pattern' in hits,
             'gratitude_type': None
         }
-        
-        gratitude_indicators = [
-            'gracias', 'agradecido', 'bendecido', 'afortunado',
-            'me siento bien', 'estoy agradecido', 'doy gracias'
-        ]
-        
-        for indicator in gratitude_indicators:
-            if indicator in message.lower():
-                patterns['has_gratitude'] = True
-                break
-        
-        return patterns
     
-    def _identify_main_topic(self, message: str) -> str:
+    def _identify_main_topic(self, message: str, hits: Optional[Dict[str, int]] = None) -> str:
         """Identificar el tema principal del mensaje"""
-        topics = {
-            'work': ['trabajo', 'empleo', 'jefe', 'oficina', 'carrera', 'profesión'],
-            'relationships': ['novio', 'novia', 'pareja', 'amigo', 'familia', 'relación'],
-            'health': ['salud', 'enfermo', 'dolor', 'cuerpo', 'médico'],
-            'education': ['estudio', 'universidad', 'colegio', 'examen', 'tarea'],
-            'personal_growth': ['crecer', 'mejorar', 'desarrollar', 'aprender', 'cambiar'],
-            'emotions': ['sentir', 'emoción', 'estado de ánimo', 'mood'],
-            'daily_life': ['día', 'vida', 'rutina', 'actividades']
-        }
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        topics = ['work', 'relationships', 'health', 'education', 'personal_growth', 'emotions', 'daily_life']
         
-        message_lower = message.lower()
-        for topic, keywords in topics.items():
-            if any(keyword in message_lower for keyword in keywords):
+        for topic in topics:
+            if f'topic_{topic}' in hits:
                 return topic
         
         return 'general'
     
-    def _analyze_temporal_context(self, message: str) -> str:
+    def _analyze_temporal_context(self, message: str, hits: Optional[Dict[str, int]] = None) -> str:
         """Analizar contexto temporal"""
-        temporal_indicators = {
-            'past': ['ayer', 'antes', 'pasado', 'ocurrió', 'sucedió'],
-            'present': ['hoy', 'ahora', 'actualmente', 'en este momento'],
-            'future': ['mañana', 'después', 'pronto', 'planeo', 'voy a']
-        }
-        
-        message_lower = message.lower()
-        for time_frame, indicators in temporal_indicators.items():
-            if any(indicator in message_lower for indicator in indicators):
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        for time_frame in ['past', 'present', 'future']:
+            if f'temporal_{time_frame}' in hits:
                 return time_frame
         
         return 'present'
     
-    def _analyze_social_context(self, message: str) -> str:
+    def _analyze_social_context(self, message: str, hits: Optional[Dict[str, int]] = None) -> str:
         """Analizar contexto social"""
-        social_indicators = {
-            'alone': ['solo', 'sola', 'sin nadie', 'por mi cuenta'],
-            'with_others': ['con', 'junto', 'compañía', 'gente'],
-            'seeking_connection': ['necesito', 'busco', 'quiero conectar']
-        }
-        
-        message_lower = message.lower()
-        for context, indicators in social_indicators.items():
-            if any(indicator in message_lower for indicator in indicators):
+        hits = self.keyword_matcher.scan(message) if hits is None else hits
+        for context in ['alone', 'with_others', 'seeking_connection']:
+            if f'social_{context}' in hits:
                 return context
         
         return 'neutral'
@@ -690,8 +1052,7 @@ class TensorFlowAIService:
     
     def _analyze_urgency_context(self, message: str, semantic_analysis: Dict) -> Dict[str, Any]:
         """Analizar urgencia contextual"""
-        urgency_indicators = ['ayuda', 'urgente', 'ahora', 'inmediatamente', 'por favor', 'necesito']
-        is_urgent = any(indicator in message.lower() for indicator in urgency_indicators)
+        is_urgent = 'urgency' in self.keyword_matcher.scan(message)
         
         return {
             'is_urgent': is_urgent,
@@ -839,12 +1200,13 @@ class TensorFlowAIService:
         ]
         return random.choice(responses)
     
-    def _get_conversation_context(self) -> Dict[str, Any]:
-        """Obtener contexto de la conversación"""
-        if len(self.conversation_history) < 2:
+    def _get_conversation_context(self, user_id: str = None) -> Dict[str, Any]:
+        """Obtener contexto de la conversación del usuario"""
+        interaction_count = self.conversation_store.length(user_id)
+        if interaction_count < 2:
             return {"recent_topics": [], "recent_intents": [], "user_mood": "neutral", "interaction_count": 0}
         
-        recent_messages = self.conversation_history[-5:]  # Últimos 5 mensajes
+        recent_messages = self.conversation_store.recent(user_id, 5)  # Últimos 5 mensajes
         topics = []
         intents = []
         
@@ -857,7 +1219,7 @@ class TensorFlowAIService:
             "recent_topics": topics,
             "recent_intents": intents,
             "user_mood": self._analyze_user_mood(recent_messages),
-            "interaction_count": len(self.conversation_history)
+            "interaction_count": interaction_count
         }
     
     def _get_time_context(self) -> Dict[str, Any]:
@@ -884,15 +1246,13 @@ class TensorFlowAIService:
     
     def _analyze_user_mood(self, messages: List[Dict]) -> str:
         """Analizar el estado de ánimo del usuario de forma psicológica"""
-        positive_words = ["genial", "excelente", "perfecto", "gracias", "ayuda", "bien", "feliz", "contento", "emocionado", "motivado", "energía", "increíble", "maravilloso", "fantástico", "brillante", "exitoso", "logrado", "conseguido", "alcanzado", "superado", "conseguí", "logré", "gané", "trabajo", "éxito", "alegre", "orgulloso", "satisfecho"]
-        negative_words = ["mal", "problema", "difícil", "no puedo", "frustrado", "cansado", "estresado", "ansioso", "preocupado", "triste", "deprimido", "agotado", "desmotivado", "perdido", "confundido", "abrumado", "desanimado", "desesperado", "solo", "solitario"]
-        neutral_words = ["normal", "regular", "ok", "bien", "tranquilo", "calmado", "equilibrado", "estable", "centrado", "balanceado"]
-        
         text = " ".join([msg.get("text", "").lower() for msg in messages])
         
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
-        neutral_count = sum(1 for word in neutral_words if word in text)
+        # Palabras distintas de cada lista presentes en los mensajes recientes
+        hits = self.keyword_matcher.scan(text)
+        positive_count = hits.get('mood_positive', 0)
+        negative_count = hits.get('mood_negative', 0)
+        neutral_count = hits.get('mood_neutral', 0)
         
         if positive_count > negative_count and positive_count > neutral_count:
             return "positive"
@@ -943,12 +1303,9 @@ class TensorFlowAIService:
         """Determinar si el usuario quiere crear una tarea"""
         text_lower = text.lower()
         
-        # Palabras clave para creación de tareas
-        task_keywords = ['tarea', 'crear', 'nueva', 'agregar', 'añadir', 'hacer', 'completar']
-        
-        # Verificar si el mensaje anterior fue sobre crear tarea
+        # Verificar si la última respuesta fue la pregunta por la tarea a crear
         recent_intents = conversation_context.get('recent_intents', [])
-        was_creating_task = 'create_task' in recent_intents[-2:] if len(recent_intents) >= 2 else False
+        was_creating_task = recent_intents[-1:] == ['task_creation_prompt']
         
         # Si el mensaje anterior fue sobre crear tarea y este mensaje no es muy largo, probablemente es el nombre
         if was_creating_task and len(text.split()) <= 10 and not any(word in text_lower for word in ['no', 'cancelar', 'olvidar']):
@@ -960,12 +1317,9 @@ class TensorFlowAIService:
         """Determinar si el usuario quiere crear un hábito"""
         text_lower = text.lower()
         
-        # Palabras clave para creación de hábitos
-        habit_keywords = ['habito', 'hábito', 'crear', 'nuevo', 'establecer', 'formar']
-        
-        # Verificar si el mensaje anterior fue sobre crear hábito
+        # Verificar si la última respuesta fue la pregunta por el hábito a crear
         recent_intents = conversation_context.get('recent_intents', [])
-        was_creating_habit = 'create_habit' in recent_intents[-2:] if len(recent_intents) >= 2 else False
+        was_creating_habit = recent_intents[-1:] == ['habit_creation_prompt']
         
         # Si el mensaje anterior fue sobre crear hábito y este mensaje no es muy largo, probablemente es el nombre
         if was_creating_habit and len(text.split()) <= 10 and not any(word in text_lower for word in ['no', 'cancelar', 'olvidar']):
@@ -999,21 +1353,30 @@ class TensorFlowAIService:
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    def _handle_task_creation_response(self, task_name: str) -> Dict[str, Any]:
-        """Manejar respuesta con nombre de tarea"""
+    def _handle_task_creation_response(self, task_name: str, tz_name: Optional[str] = None) -> Dict[str, Any]:
+        """Manejar respuesta con nombre de tarea (con fecha límite si el mensaje la indica)"""
         # Generar datos de tarea
         priority = random.choice(["low", "medium", "high"])
         status = "pending"
         
+        # "comprar pan mañana a las 5" -> título "comprar pan" y fecha límite en UTC
+        resolution = resolve_due_date(task_name, tz_name)
+        if resolution is not None:
+            task_name = resolution.strip(task_name) or task_name
+        
         task_data = {
             "title": task_name,
             "description": task_name,
             "priority": priority,
             "status": status
         }
+        due_line = ""
+        if resolution is not None:
+            task_data["due_date"] = resolution.due_date.isoformat()
+            due_line = f"\n📅 **Fecha límite:** {resolution.local.strftime('%d/%m/%Y %H:%M')}"
         
         return {
-            "response": f"¡Perfecto! He creado la tarea: **{task_name}**\n\n📝 **Descripción:** {task_name}\n🎯 **Prioridad:** {priority}\n📊 **Estado:** {status}\n\n✅ **Tarea creada exitosamente en tu base de datos**\n\n💡 **Consejo:** Divide las tareas grandes en pasos pequeños para mayor éxito.",
+            "response": f"¡Perfecto! He creado la tarea: **{task_name}**\n\n📝 **Descripción:** {task_name}\n🎯 **Prioridad:** {priority}\n📊 **Estado:** {status}{due_line}\n\n✅ **Tarea creada exitosamente en tu base de datos**\n\n💡 **Consejo:** Divide las tareas grandes en pasos pequeños para mayor éxito.",
             "intent": "task_creation_complete",
             "confidence": 0.95,
             "sentiment": "positive",
@@ -1049,46 +1412,71 @@ class TensorFlowAIService:
             "habit_created": habit_data
         }
     
-    def process_message(self, message: str, user_id: str = None, user_context: Dict = None) -> Dict[str, Any]:
-        """Procesar mensaje usando TensorFlow ML"""
+    def process_message(self, message: str, user_id: str = None, user_context: Dict = None,
+                        prediction: Optional[Dict[str, Any]] = None,
+                        features: Optional[MessageFeatures] = None) -> Dict[str, Any]:
+        """Procesar mensaje usando TensorFlow ML (acepta una predicción ya calculada por lotes)"""
+        # Normalización y palabras clave una sola vez para el clasificador y los analizadores
+        if features is None:
+            features = self.build_features(message)
+        
+        # La predicción fija la versión del modelo con la que se responde
+        if prediction is None:
+            prediction = self.intent_classifier.predict([features])[0]
+        
+        response = self._process_message(message, user_id, user_context, prediction, features)
+        response["model_version"] = prediction.get("model_version")
+        response["intent_tier"] = prediction.get("tier")
+        return response
+    
+    def _remember_response(self, user_id: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Agregar la respuesta al historial con su intención y devolverla"""
+        self.conversation_store.append(user_id, {
+            "text": response["response"],
+            "intent": response["intent"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "is_ai": True
+        })
+        return response
+    
+    def _process_message(self, message: str, user_id: str, user_context: Dict,
+                         prediction: Dict[str, Any], features: MessageFeatures) -> Dict[str, Any]:
+        """Generar la respuesta a partir de la predicción de intención"""
         try:
-            # Agregar mensaje al historial
-            self.conversation_history.append({
+            # Agregar mensaje al historial del usuario (buffer circular de tamaño fijo)
+            self.conversation_store.append(user_id, {
                 "text": message,
                 "timestamp": datetime.utcnow().isoformat(),
                 "user_id": user_id
             })
             
-            # Mantener solo los últimos 20 mensajes
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
-            
             # Obtener contexto
-            conversation_context = self._get_conversation_context()
+            conversation_context = self._get_conversation_context(user_id)
             
             # Verificar si es respuesta a creación de tarea/hábito
             if self._should_create_task(message, conversation_context):
-                return self._handle_task_creation_response(message)
+                return self._remember_response(
+                    user_id, self._handle_task_creation_response(message, (user_context or {}).get("timezone"))
+                )
             
             if self._should_create_habit(message, conversation_context):
-                return self._handle_habit_creation_response(message)
+                return self._remember_response(user_id, self._handle_habit_creation_response(message))
             
-            # Predecir intención usando TensorFlow
-            prediction = self._predict_intent(message)
+            # Intención predicha con TensorFlow
             intent = prediction["intent"]
             confidence = prediction["confidence"]
             
-            # Manejar intenciones especiales
+            # Manejar intenciones especiales (la pregunta queda en el historial para reconocer la respuesta)
             if intent == "create_task":
-                return self._handle_task_creation()
+                return self._remember_response(user_id, self._handle_task_creation())
             
             if intent == "create_habit":
-                return self._handle_habit_creation()
+                return self._remember_response(user_id, self._handle_habit_creation())
             
             # Generar respuesta inteligente
             if intent == "general":
                 # Usar respuesta inteligente para temas psicológicos
-                intelligent_response = self._generate_psychological_response(message, "neutral")
+                intelligent_response = self._generate_psychological_response(message, "neutral", features)
                 response = {
                     "response": intelligent_response,
                     "intent": intent,
@@ -1101,7 +1489,7 @@ class TensorFlowAIService:
                 }
             elif intent == "emotional_support":
                 # Usar respuesta específica para apoyo emocional
-                intelligent_response = self._generate_psychological_response(message, "negative")
+                intelligent_response = self._generate_psychological_response(message, "negative", features)
                 logger.info(f"🧠 Respuesta psicológica generada: {intelligent_response[:100]}...")
                 response = {
                     "response": intelligent_response,
@@ -1115,7 +1503,7 @@ class TensorFlowAIService:
                 }
             else:
                 # Para todas las demás intenciones, usar respuesta inteligente
-                intelligent_response = self._generate_psychological_response(message, "neutral")
+                intelligent_response = self._generate_psychological_response(message, "neutral", features)
                 response = {
                     "response": intelligent_response,
                     "intent": intent,
@@ -1127,15 +1515,7 @@ class TensorFlowAIService:
                     "timestamp": datetime.utcnow().isoformat()
                 }
             
-            # Agregar respuesta al historial
-            self.conversation_history.append({
-                "text": response["response"],
-                "intent": intent,
-                "timestamp": datetime.utcnow().isoformat(),
-                "is_ai": True
-            })
-            
-            return response
+            return self._remember_response(user_id, response)
             
         except Exception as e:
             logger.error(f"❌ Error procesando mensaje: {e}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Clasificación de intenciones por niveles: tabla exacta, reglas de palabras clave y modelo
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .message_features import MessageFeatures
+
+TIERS = ["exact", "rules", "model"]
+
+
+class TierMetrics:
+    """Aciertos y latencia de cada nivel del clasificador"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = {tier: 0 for tier in TIERS}
+        self.calls = {tier: 0 for tier in TIERS}
+        self.total_ms = {tier: 0.0 for tier in TIERS}
+
+    def record(self, tier: str, calls: int, hits: int, elapsed_ms: float):
+        with self._lock:
+            self.calls[tier] += calls
+            self.hits[tier] += hits
+            self.total_ms[tier] += elapsed_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            classified = sum(self.hits.values())
+            return {
+                "classified": classified,
+                "tiers": {
+                    tier: {
+                        "hits": self.hits[tier],
+                        "hit_rate": round(self.hits[tier] / classified, 4) if classified else 0.0,
+                        "avg_latency_us": round(self.total_ms[tier] * 1000 / self.calls[tier], 2) if self.calls[tier] else 0.0
+                    }
+                    for tier in TIERS
+                }
+            }
+
+
+class TieredIntentClassifier:
+    """Resuelve cada mensaje en el nivel más barato que esté seguro de la respuesta
+
+    1. `exact`: frases de entrenamiento (normalizadas) en un diccionario, O(1).
+    2. `rules`: reglas de palabras clave cuando son inequívocas.
+    3. `model`: la red neuronal, solo para lo que los niveles anteriores no resuelven.
+
+    Acepta textos o `MessageFeatures` ya calculados; los textos se convierten con `featurize`.
+    """
+
+    def __init__(self, predict_model: Callable[[List[str]], List[Dict[str, Any]]],
+                 predict_rules: Callable[[MessageFeatures], Optional[Dict[str, Any]]], enabled: bool = True,
+                 featurize: Callable[[str], MessageFeatures] = MessageFeatures.build):
+        self.predict_model = predict_model
+        self.predict_rules = predict_rules
+        self.enabled = enabled
+        self.featurize = featurize
+        self.metrics = TierMetrics()
+        self._exact: Dict[str, str] = {}
+        self._exact_version = None
+
+    def build_exact_table(self, training_data: List[Dict], version: Any = None):
+        """Tabla de frases de entrenamiento; las que tienen etiquetas contradictorias se omiten"""
+        table: Dict[str, Optional[str]] = {}
+        for item in training_data:
+            key = MessageFeatures.build(item["text"]).normalized
+            if table.get(key, item["intent"]) != item["intent"]:
+                table[key] = None
+            else:
+                table[key] = item["intent"]
+
+        # Sustitución de referencia: los lectores ven la tabla vieja o la nueva, nunca una a medias
+        self._exact = {key: intent for key, intent in table.items() if intent is not None}
+        self._exact_version = version
+
+    def _features(self, message: Union[str, MessageFeatures]) -> MessageFeatures:
+        return message if isinstance(message, MessageFeatures) else self.featurize(message)
+
+    def predict_fast(self, message: Union[str, MessageFeatures]) -> Optional[Dict[str, Any]]:
+        """Niveles baratos (tabla exacta y reglas); None si hace falta el modelo"""
+        if not self.enabled:
+            return None
+
+        features = self._features(message)
+        started = time.perf_counter()
+        intent = self._exact.get(features.normalized)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record("exact", 1, int(intent is not None), elapsed_ms)
+        if intent is not None:
+            return {
+                "intent": intent,
+                "confidence": 1.0,
+                "predictions": [],
+                "model_version": self._exact_version,
+                "tier": "exact"
+            }
+
+        started = time.perf_counter()
+        prediction = self.predict_rules(features)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record("rules", 1, int(prediction is not None), elapsed_ms)
+        if prediction is not None:
+            return {**prediction, "model_version": self._exact_version, "tier": "rules"}
+
+        return None
+
+    def predict(self, messages: List[Union[str, MessageFeatures]]) -> List[Dict[str, Any]]:
+        """Clasificar un lote: los niveles baratos primero y el modelo una vez para el resto"""
+        features = [self._features(message) for message in messages]
+        results: List[Optional[Dict[str, Any]]] = [self.predict_fast(item) for item in features]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            for i, prediction in zip(pending, self.predict_with_model([features[i].normalized for i in pending])):
+                results[i] = prediction
+        return results
+
+    def predict_with_model(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Último nivel: la red neuronal (con su caché de predicciones)"""
+        started = time.perf_counter()
+        predictions = self.predict_model(texts)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record("model", len(texts), len(texts), elapsed_ms)
+        return [{**prediction, "tier": "model"} for prediction in predictions]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "exact_table_size": len(self._exact),
+            **self.metrics.snapshot()
+        }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Contadores por usuario mantenidos de forma incremental (tabla user_stats)
+
+Cada escritura de tareas y hábitos suma a la fila del usuario la diferencia entre los
+contadores del objeto antes y después del cambio, con un UPDATE en la misma transacción
+(si la escritura falla, los contadores tampoco cambian). Los resúmenes leen la fila por
+clave primaria; si aún no existe se calcula con stats_service y se guarda.
+
+Los contadores "de hoy" se refieren a stats_date: al cambiar de día valen 0 hasta la
+siguiente escritura. El reconciliador periódico los recalcula desde las tablas y corrige
+cualquier desviación (escrituras fuera de la aplicación, carreras al crear la fila).
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.habit import Habit, HabitLog
+from app.models.task import Task
+from app.models.user import User
+from app.models.user_stats import UserStats
+from app.services import stats_service
+
+logger = logging.getLogger(__name__)
+
+# Contadores que no dependen del día
+TOTAL_COUNTERS = ("total_tasks", "completed_tasks", "pending_tasks", "in_progress_tasks", "total_habits", "active_habits")
+# Contadores de las completaciones de stats_date
+TODAY_COUNTERS = ("tasks_completed_today", "habit_completions_today")
+
+
+def _day_start(today: date) -> datetime:
+    return datetime.combine(today, time.min)
+
+
+def task_counters(task: Task, today: Optional[date] = None) -> Dict[str, int]:
+    """Contribución de una tarea a los contadores de su usuario"""
+    status = task.status or "pending"
+    completed = status == "completed"
+    return {
+        "total_tasks": 1,
+        "completed_tasks": int(completed),
+        "pending_tasks": int(status == "pending"),
+        "in_progress_tasks": int(status == "in_progress"),
+        "tasks_completed_today": int(
+            completed and task.completed_at is not None and task.completed_at >= _day_start(today or date.today())
+        )
+    }
+
+
+def habit_counters(habit: Habit) -> Dict[str, int]:
+    """Contribución de un hábito (sin sus registros) a los contadores de su usuario"""
+    return {"total_habits": 1, "active_habits": int(habit.is_active is not False)}
+
+
+def habit_log_counters(log: HabitLog, today: Optional[date] = None) -> Dict[str, int]:
+    """Contribución de un registro de hábito a los contadores de su usuario"""
+    completed_at = log.completed_at or datetime.utcnow()
+    return {"habit_completions_today": int(completed_at >= _day_start(today or date.today()))}
+
+
+def counter_deltas(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    """Diferencia entre los contadores de un objeto antes y después de escribirlo"""
+    return {name: after.get(name, 0) - before.get(name, 0) for name in set(before) | set(after)}
+
+
+def counters_update(user_id: int, deltas: Dict[str, int], today: date):
+    """UPDATE que suma `deltas` a la fila del usuario (los contadores de hoy empiezan en 0 cada día)"""
+    is_today = UserStats.stats_date == today
+    values = {name: getattr(UserStats, name) + deltas.get(name, 0) for name in TOTAL_COUNTERS}
+    for name in TODAY_COUNTERS:
+        column = getattr(UserStats, name)
+        values[name] = case((is_today, column + deltas.get(name, 0)), else_=deltas.get(name, 0))
+    values["stats_date"] = today
+    values["version"] = UserStats.version + 1
+    values["updated_at"] = datetime.utcnow()
+    return update(UserStats).where(UserStats.user_id == user_id).values(**values).execution_options(
+        synchronize_session=False
+    )
+
+
+async def apply_deltas(db: AsyncSession, user_id: int, deltas: Dict[str, int], today: Optional[date] = None):
+    """Aplicar los cambios de una escritura en su transacción (sin commit: lo hace la ruta)
+
+    Para un objeto nuevo los cambios son sus contadores; sin cambios no se escribe nada.
+    Si el usuario aún no tiene fila no se hace nada: la primera lectura la calcula
+    desde las tablas, ya con esta escritura.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        await db.execute(counters_update(user_id, deltas, today or date.today()))
+
+
+async def compute_counters(db: AsyncSession, user_id: int, today: date) -> Dict[str, int]:
+    """Contadores calculados desde las tablas (una consulta de tareas y otra de hábitos)"""
+    task_stats = await stats_service.get_task_stats(db, user_id, today)
+    habit_stats = await stats_service.get_habit_stats(db, user_id, today)
+    return {
+        "total_tasks": task_stats["total"],
+        "completed_tasks": task_stats["completed"],
+        "pending_tasks": task_stats["pending"],
+        "in_progress_tasks": task_stats["by_status"].get("in_progress", 0),
+        "total_habits": habit_stats["total"],
+        "active_habits": habit_stats["active"],
+        "tasks_completed_today": task_stats["completed_today"],
+        "habit_completions_today": habit_stats["completed_today"]
+    }
+
+
+def _row_counters(row: UserStats, today: date) -> Dict[str, int]:
+    counters = {name: getattr(row, name) for name in TOTAL_COUNTERS}
+    for name in TODAY_COUNTERS:
+        counters[name] = getattr(row, name) if row.stats_date == today else 0
+    return counters
+
+
+async def get_user_stats(db: AsyncSession, user_id: int, today: Optional[date] = None) -> Dict[str, Any]:
+    """Contadores del usuario leídos de su fila de user_stats (creándola la primera vez)"""
+    today = today or date.today()
+    row = await db.get(UserStats, user_id)
+    if row is None:
+        counters = await compute_counters(db, user_id, today)
+        try:
+            # En un savepoint: si falla, no se deshace (ni se expira) el resto de la sesión,
+            # como el usuario que la ruta cargó con ella
+            async with db.begin_nested():
+                db.add(UserStats(user_id=user_id, stats_date=today, **counters))
+            await db.commit()
+        except IntegrityError:
+            # Otra petición creó la fila a la vez: sus valores son igual de válidos
+            pass
+    else:
+        counters = _row_counters(row, today)
+
+    total = counters["total_tasks"]
+    counters["completion_rate"] = (counters["completed_tasks"] / total * 100) if total > 0 else 0
+    return counters
+
+
+async def reconcile_user(db: AsyncSession, user_id: int, today: Optional[date] = None) -> str:
+    """Recalcular los contadores de un usuario y corregir su fila si se ha desviado
+
+    La fila (con su versión) se lee antes que las tablas: si una escritura la cambia entre
+    medias, el UPDATE condicionado a la versión no la pisa y la corrección queda para la
+    siguiente pasada. Devuelve "ok", "created" (no tenía fila) o "fixed".
+    """
+    today = today or date.today()
+    row = (await db.execute(select(UserStats).where(UserStats.user_id == user_id))).scalar_one_or_none()
+    counters = await compute_counters(db, user_id, today)
+    if row is None:
+        db.add(UserStats(user_id=user_id, stats_date=today, **counters))
+        return "created"
+    if _row_counters(row, today) == counters:
+        return "ok"
+
+    await db.execute(update(UserStats).where(
+        UserStats.user_id == user_id,
+        UserStats.version == row.version
+    ).values(
+        stats_date=today,
+        version=UserStats.version + 1,
+        updated_at=datetime.utcnow(),
+        **counters
+    ).execution_options(synchronize_session=False))
+    return "fixed"
+
+
+async def reconcile_all(session_factory, batch_size: int = 100) -> Dict[str, int]:
+    """Reconciliar los contadores de todos los usuarios, por lotes; devuelve el recuento por resultado"""
+    results = {"ok": 0, "created": 0, "fixed": 0}
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            user_ids = (await db.scalars(
+                select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+            )).all()
+            if not user_ids:
+                return results
+            for user_id in user_ids:
+                try:
+                    results[await reconcile_user(db, user_id)] += 1
+                except Exception as e:
+                    logger.error(f"❌ Error reconciliando estadísticas del usuario {user_id}: {e}")
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Una lectura creó alguna fila mientras tanto: el lote se repite en la siguiente pasada
+                await db.rollback()
+            last_id = user_ids[-1]
+
+
+async def run_reconciler(session_factory, interval_seconds: float):
+    """Bucle del reconciliador (tarea en segundo plano del servidor)"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            results = await reconcile_all(session_factory)
+            if results["fixed"]:
+                logger.warning(f"🔧 Estadísticas corregidas para {results['fixed']} usuarios")
+            logger.info(
+                f"✅ Estadísticas reconciliadas: {results['ok']} correctas, {results['created']} creadas, "
+                f"{results['fixed']} corregidas"
+            )
+        except Exception as e:
+            logger.error(f"❌ Error en el reconciliador de estadísticas: {e}")
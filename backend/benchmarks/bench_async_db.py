@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sesión síncrona en rutas async (antes) vs AsyncSession (después)
+
+Levanta un servidor uvicorn por variante sobre la misma base SQLite y lanza peticiones
+concurrentes con una mezcla de consultas pesadas (`/api/tasks/stats/summary`: cuatro
+recuentos sobre todas las tareas del usuario) y ligeras (`/api/tasks/{id}`).
+
+- Antes: las rutas `async def` usan `SessionLocal`, así que cada consulta bloquea el bucle
+  de eventos y las peticiones ligeras esperan detrás de las pesadas. Se reproduce aquí
+  con una copia de la implementación anterior de esas dos rutas.
+- Después: las rutas de la aplicación con `get_async_db` (aiosqlite).
+
+Se mide peticiones por segundo y la latencia de las peticiones ligeras.
+
+Uso (desde backend/):
+    python benchmarks/bench_async_db.py
+    python benchmarks/bench_async_db.py --tasks 20000 --concurrency 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_async_db.db")
+# La aplicación lee DATABASE_URL al importarse
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.database import Base, engine, ensure_indexes, get_db  # noqa: E402
+from app.models import Task, User  # noqa: E402
+from app.routes import tasks  # noqa: E402
+from app.schemas.task import TaskResponse  # noqa: E402
+from app.services.auth_service import create_access_token, security, verify_token  # noqa: E402
+
+
+def legacy_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    """get_current_user anterior (sesión síncrona)"""
+    payload = verify_token(credentials.credentials)
+    user = db.query(User).filter(User.id == payload.get("sub")).first() if payload else None
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+
+def build_legacy_app() -> FastAPI:
+    """Las dos rutas del benchmark tal como eran antes: async def con consultas síncronas"""
+    app = FastAPI()
+
+    @app.get("/api/tasks/{task_id}", response_model=TaskResponse)
+    async def get_task(task_id: int, current_user: User = Depends(legacy_current_user), db: Session = Depends(get_db)):
+        task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+        if not task:
+            raise HTTPException(status_code=404)
+        return TaskResponse.model_validate(task)
+
+    @app.get("/api/tasks/stats/summary")
+    async def get_task_stats(current_user: User = Depends(legacy_current_user), db: Session = Depends(get_db)):
+        total_tasks = db.query(Task).filter(Task.user_id == current_user.id).count()
+        completed_tasks = db.query(Task).filter(
+            Task.user_id == current_user.id,
+            Task.status == "completed"
+        ).count()
+        pending_tasks = db.query(Task).filter(
+            Task.user_id == current_user.id,
+            Task.status == "pending"
+        ).count()
+        overdue_tasks = db.query(Task).filter(
+            Task.user_id == current_user.id,
+            Task.due_date < date.today(),
+            Task.status.in_(["pending", "in_progress"])
+        ).count()
+        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        return {
+            "total_tasks": total_tasks,
+            "completed_tasks": completed_tasks,
+            "pending_tasks": pending_tasks,
+            "overdue_tasks": overdue_tasks,
+            "completion_rate": round(completion_rate, 2)
+        }
+
+    return app
+
+
+def build_async_app() -> FastAPI:
+    """Las rutas reales de la aplicación (AsyncSession)"""
+    app = FastAPI()
+    app.include_router(tasks.router, prefix="/api/tasks")
+    return app
+
+
+def seed(task_count: int):
+    """Un usuario con `task_count` tareas (la mitad completadas)"""
+    if os.path.exists(_DB_PATH):
+        os.remove(_DB_PATH)
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+
+    random.seed(42)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(_DB_PATH)
+    with conn:
+        conn.execute(
+            "INSERT INTO users (id, email, password_hash, full_name, created_at, is_active) "
+            "VALUES (1, 'bench@example.com', 'x', 'Bench', ?, 1)", (now,)
+        )
+
+        def rows():
+            for i in range(task_count):
+                created = now - timedelta(minutes=random.randrange(525600))
+                completed = i % 2 == 0
+                yield (1, f"Tarea {i}", "medium", "completed" if completed else "pending",
+                       created + timedelta(days=random.randrange(-10, 30)),
+                       created + timedelta(hours=random.randrange(1, 200)) if completed else None, created, created)
+
+        conn.executemany(
+            "INSERT INTO tasks (user_id, title, priority, status, due_date, completed_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows()
+        )
+    conn.close()
+
+
+VARIANTS = {"sync": ("síncrona (antes)", build_legacy_app), "async": ("AsyncSession (después)", build_async_app)}
+
+
+class ServerProcess:
+    """uvicorn en otro proceso, para que el cliente no compita con el servidor por el GIL"""
+
+    def __init__(self, variant: str, port: int):
+        self.command = [sys.executable, __file__, "--serve", variant, "--port", str(port)]
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command)
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f"{self.url}/docs", timeout=1)
+                return self
+            except httpx.TransportError:
+                time.sleep(0.1)
+        self.process.kill()
+        raise RuntimeError("El servidor no arrancó")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+async def run_load(base_url: str, token: str, total: int, concurrency: int, heavy_every: int, task_count: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    light_latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client: httpx.AsyncClient):
+        while not queue.empty():
+            i = queue.get_nowait()
+            heavy = i % heavy_every == 0
+            path = "/api/tasks/stats/summary" if heavy else f"/api/tasks/{random.randrange(1, task_count + 1)}"
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            if not heavy:
+                light_latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await client.get("/api/tasks/1", headers=headers)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    light_latencies.sort()
+    p50 = light_latencies[len(light_latencies) // 2] * 1000
+    p99 = light_latencies[int(len(light_latencies) * 0.99)] * 1000
+    return total / elapsed, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20000, help="tareas del usuario (coste de la consulta pesada)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--heavy-every", type=int, default=20, help="una petición pesada cada N")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        uvicorn.run(VARIANTS[args.serve][1](), host="127.0.0.1", port=args.port, log_level="warning", lifespan="off")
+        return
+
+    # Las rutas configuran logging en INFO: sin una línea por petición del cliente
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"Sembrando {args.tasks} tareas en {_DB_PATH}...")
+    seed(args.tasks)
+    token = create_access_token({"sub": "1"}, expires_delta=timedelta(hours=1))
+
+    print(f"{args.requests} peticiones, concurrencia {args.concurrency}, 1 pesada de cada {args.heavy_every}\n")
+    print(f"{'variante':<26} {'peticiones/s':>13} {'ligeras p50':>12} {'ligeras p99':>12}")
+    for variant, (label, _) in VARIANTS.items():
+        with ServerProcess(variant, args.port) as server:
+            random.seed(7)
+            rps, p50, p99 = asyncio.run(run_load(
+                server.url, token, args.requests, args.concurrency, args.heavy_every, args.tasks
+            ))
+        print(f"{label:<26} {rps:>13.1f} {p50:>9.1f} ms {p99:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: procesar una conversación mensaje a mensaje vs en un lote (/chat/batch)
+
+Mide el pipeline completo del chat (clasificación y respuesta) con el caché de
+predicciones desactivado, como una repetición de conversaciones o una clasificación
+nocturna de mensajes guardados.
+
+Uso (desde backend/):
+    python benchmarks/bench_chat_batch.py
+    python benchmarks/bench_chat_batch.py --messages 100 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["AI_PREDICTION_CACHE_SIZE"] = "0"
+
+TRANSCRIPT = [
+    "hola", "me siento un poco cansado hoy", "ver mis tareas", "tengo mucho trabajo pendiente",
+    "consejos para concentrarme", "quiero empezar a hacer ejercicio", "gracias por la ayuda",
+    "hoy terminé el informe que tenía atrasado", "estoy preocupado por el examen de mañana", "adiós"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50, help="mensajes por conversación")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from app.services.ai_service import AIService
+
+    service = AIService()
+    service.initialize()
+    messages = [TRANSCRIPT[i % len(TRANSCRIPT)] for i in range(args.messages)]
+    service.process_messages(messages, "bench")  # calentamiento
+
+    started = time.perf_counter()
+    for run in range(args.repeat):
+        for message in messages:
+            service.process_message(message, f"sequential-{run}")
+    sequential_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    started = time.perf_counter()
+    for run in range(args.repeat):
+        service.process_messages(messages, f"batch-{run}")
+    batch_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    print(f"Conversación de {args.messages} mensajes (motor {service.tensorflow_ai.inference_backend}):")
+    print(f"  mensaje a mensaje  {sequential_ms:>8.1f} ms")
+    print(f"  en un lote         {batch_ms:>8.1f} ms   ({sequential_ms / batch_ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
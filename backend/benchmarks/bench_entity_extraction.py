@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark: extracción de entidades anterior vs extractor precompilado
+
+Compara la implementación anterior de `MLService.extract_entities` (un `re.search` por
+patrón con `re.IGNORECASE` y un `text.lower()` por palabra clave) con `EntityExtractor`, sobre
+mensajes habituales y sobre mensajes largos (adversarios): muchos disparadores seguidos,
+texto largo sin ninguna entidad o un nombre de tarea muy largo.
+
+Uso (desde backend/):
+    python benchmarks/bench_entity_extraction.py
+    python benchmarks/bench_entity_extraction.py --repeat 500
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.local_ai_service import ENTITY_EXTRACTOR as LOCAL_EXTRACTOR  # noqa: E402
+from app.services.ml_service import ENTITY_EXTRACTOR as ML_EXTRACTOR  # noqa: E402
+
+TYPICAL = [
+    "hola",
+    "Crear una tarea llamada 'Preparar la presentación' con alta prioridad para mañana",
+    "quiero crear un hábito llamado meditar todos los días",
+    "necesito hacer la compra, es urgente",
+    "Nuevo hábito: leer cada semana",
+    "tengo reunión el 12/05/2025 y otra el viernes",
+    "me siento un poco cansado hoy, ¿algún consejo?",
+    "agregar tarea revisar el correo, prioridad baja",
+]
+
+ADVERSARIAL = {
+    "muchos disparadores": "tarea hábito urgente diario hoy " * 400,
+    "sin entidades": "esto es un mensaje largo sin nada que extraer " * 400,
+    "nombre muy largo": "crear tarea " + "palabra " * 2000,
+}
+
+
+def extract_ml_legacy(text):
+    """Implementación anterior de MLService.extract_entities"""
+    entities = {}
+    task_patterns = [
+        r'crear (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'nueva tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'agregar (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
+        r'tarea (?:llamada )?["\']?([^"\']+)["\']?'
+    ]
+    for pattern in task_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            entities['task_name'] = match.group(1).strip()
+            break
+    habit_patterns = [
+        r'crear (?:un )?h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?',
+        r'nuevo h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?',
+        r'h[áa]bito (?:llamado )?["\']?([^"\']+)["\']?'
+    ]
+    for pattern in habit_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            entities['habit_name'] = match.group(1).strip()
+            break
+    priority_patterns = {
+        'alta': ['alta prioridad', 'urgente', 'importante', 'crítico'],
+        'media': ['media prioridad', 'normal', 'regular'],
+        'baja': ['baja prioridad', 'poco importante', 'opcional']
+    }
+    for priority, keywords in priority_patterns.items():
+        if any(keyword in text.lower() for keyword in keywords):
+            entities['priority'] = priority
+            break
+    frequency_patterns = {
+        'diario': ['diario', 'cada día', 'todos los días', 'diariamente'],
+        'semanal': ['semanal', 'cada semana', 'una vez por semana'],
+        'mensual': ['mensual', 'cada mes', 'una vez al mes']
+    }
+    for frequency, keywords in frequency_patterns.items():
+        if any(keyword in text.lower() for keyword in keywords):
+            entities['frequency'] = frequency
+            break
+    date_patterns = [
+        r'(\d{1,2}/\d{1,2}/\d{4})',
+        r'(\d{1,2}-\d{1,2}-\d{4})',
+        r'(hoy|mañana|pasado mañana)',
+        r'(lunes|martes|miércoles|jueves|viernes|sábado|domingo)'
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            entities['date'] = match.group(1)
+            break
+    return entities
+
+
+def extract_local_legacy(message):
+    """Implementación anterior de LocalAIService._extract_entities"""
+    entities = {}
+    groups = [
+        ('task_name', [
+            r'crear (?:una )?tarea (?:llamada )?["\']?([^"\']+)["\']?',
+            r'tarea (?:llamada )?["\']?([^"\']+)["\']?',
+            r'necesito (?:hacer|completar) (["\']?[^"\']+["\']?)'
+        ]),
+        ('habit_name', [
+            r'crear (?:un )?hábito (?:llamado )?["\']?([^"\']+)["\']?',
+            r'hábito (?:llamado )?["\']?([^"\']+)["\']?',
+            r'quiero (?:empezar|crear) (["\']?[^"\']+["\']?)'
+        ]),
+        ('priority', [r'prioridad (alta|media|baja)', r'(alta|media|baja) prioridad', r'(urgente|importante|normal)']),
+        ('frequency', [r'(diario|diariamente|todos los días)', r'(semanal|semanalmente|cada semana)',
+                       r'(mensual|mensualmente|cada mes)']),
+    ]
+    for name, patterns in groups:
+        for pattern in patterns:
+            match = re.search(pattern, message)
+            if match:
+                entities[name] = match.group(1)
+                break
+    return entities
+
+
+def extract_ml_precompiled(text):
+    """Implementación nueva tal como la usa MLService (nombres sin espacios alrededor)"""
+    entities = ML_EXTRACTOR.extract(text)
+    for name in ("task_name", "habit_name"):
+        if name in entities:
+            entities[name] = entities[name].strip()
+    return entities
+
+
+def measure(fn, messages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="repeticiones de los mensajes habituales")
+    args = parser.parse_args()
+
+    # Ambas implementaciones deben coincidir antes de comparar tiempos
+    for message in TYPICAL + list(ADVERSARIAL.values()):
+        assert extract_ml_precompiled(message) == extract_ml_legacy(message), message
+        lowered = message.lower()
+        assert LOCAL_EXTRACTOR.extract(lowered) == extract_local_legacy(lowered), message
+
+    print(f"{'caso':<22} {'anterior':>12} {'precompilado':>14} {'aceleración':>12}")
+    cases = [("habituales", TYPICAL, args.repeat)] + [
+        (label, [message], max(1, args.repeat // 40)) for label, message in ADVERSARIAL.items()
+    ]
+    for label, messages, repeat in cases:
+        legacy_us = measure(extract_ml_legacy, messages, repeat)
+        single_us = measure(extract_ml_precompiled, messages, repeat)
+        print(f"{label:<22} {legacy_us:>9.1f} µs {single_us:>11.1f} µs {legacy_us / single_us:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: búsqueda de palabras clave lista por lista vs autómata de una sola pasada
+
+Uso (desde backend/):
+    python benchmarks/bench_keyword_matcher.py
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.keyword_matcher import KeywordMatcher  # noqa: E402
+from app.services.tensorflow_ai_service import TensorFlowAIService  # noqa: E402
+
+MESSAGES = [
+    "hola",
+    "me siento mal, no puedo más con el trabajo",
+    "Hoy conseguí aprobar el examen de la universidad y estoy muy feliz!",
+    "gracias por la ayuda, mañana voy a crear una nueva tarea",
+    "creo que necesito mejorar mi rutina, ¿cómo empiezo?",
+    "Ayer me pasó algo en la oficina con mi jefe y realmente me frustra bastante " * 4,
+]
+
+
+def scan_per_list(categories, text):
+    """Implementación anterior: un `any(word in text ...)` por categoría"""
+    text_lower = text.lower()
+    hits = {}
+    for name, keywords in categories.items():
+        count = sum(1 for keyword in keywords if keyword in text_lower)
+        if count:
+            hits[name] = count
+    return hits
+
+
+def measure(label, fn, messages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    elapsed_us = (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+    print(f"  {label:<26} {elapsed_us:>8.2f} µs/mensaje")
+    return elapsed_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    categories = TensorFlowAIService._create_keyword_categories()
+    started = time.perf_counter()
+    matcher = KeywordMatcher(categories)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    # Ambas implementaciones deben coincidir antes de comparar tiempos
+    for message in MESSAGES:
+        expected = scan_per_list(categories, message)
+        assert matcher.scan(message) == expected, message
+
+    total_keywords = sum(len(keywords) for keywords in categories.values())
+    print(f"{len(categories)} categorías, {total_keywords} palabras clave, autómata compilado en {build_ms:.1f} ms")
+    baseline = measure("listas (any por categoría)", lambda m: scan_per_list(categories, m), MESSAGES, args.repeat)
+    single = measure("autómata (una pasada)", matcher.scan, MESSAGES, args.repeat)
+    print(f"  aceleración: x{baseline / single:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: motor NumPy float32 vs INT8 (pesos por canal, productos enteros)
+
+Compara precisión sobre las frases de entrenamiento y reservadas, coincidencia de la
+intención predicha, latencia por mensaje y por lote, y memoria de los pesos.
+
+Uso (desde backend/):
+    python benchmarks/bench_quantized_inference.py
+    python benchmarks/bench_quantized_inference.py --synthetic-vocab 50000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.intent_engines import QuantizedIntentModel  # noqa: E402
+from bench_sparse_inference import MESSAGES, build_synthetic_model, load_real_model, measure  # noqa: E402
+
+
+def weights_nbytes(model) -> int:
+    return sum(array.nbytes for layer in model.layers for array in layer if isinstance(array, np.ndarray))
+
+
+def compare_accuracy(vectorize, float_model, int8_model):
+    """Precisión de ambos motores sobre las frases etiquetadas del servicio"""
+    from app.services.tensorflow_ai_service import TensorFlowAIService
+
+    service = TensorFlowAIService()
+    classes = service.label_encoder.classes_
+    for label, samples in [("entrenamiento", service.training_data), ("reservadas", service._create_holdout_data())]:
+        X = vectorize([item["text"] for item in samples])
+        expected = np.array([item["intent"] for item in samples])
+        float_probs, int8_probs = float_model.predict(X), int8_model.predict(X)
+        float_pred, int8_pred = classes[float_probs.argmax(axis=1)], classes[int8_probs.argmax(axis=1)]
+        print(
+            f"  {label:<14} float32 {np.mean(float_pred == expected):.3f}   INT8 {np.mean(int8_pred == expected):.3f}"
+            f"   misma intención {np.mean(float_pred == int8_pred):.3f}"
+            f"   dif. máx. probabilidad {np.max(np.abs(float_probs - int8_probs)):.2e}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic-vocab", type=int, default=0,
+                        help="usar pesos aleatorios con este tamaño de vocabulario en lugar del modelo real")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.synthetic_vocab:
+        vectorize, float_model = build_synthetic_model(args.synthetic_vocab)
+    else:
+        vectorize, float_model = load_real_model()
+    int8_model = QuantizedIntentModel.from_float(float_model)
+
+    print(f"Vocabulario: {float_model.input_dim} términos")
+    print(f"Pesos: float32 {weights_nbytes(float_model) / 1024:.1f} KiB, INT8 {int8_model.nbytes / 1024:.1f} KiB\n")
+
+    if not args.synthetic_vocab:
+        print("Precisión")
+        compare_accuracy(vectorize, float_model, int8_model)
+        print()
+
+    single = vectorize([MESSAGES[2]])
+    batch = vectorize([MESSAGES[i % len(MESSAGES)] for i in range(args.batch_size)])
+    for label, X in [("por petición (1 mensaje)", single), (f"por lote ({args.batch_size} mensajes)", batch)]:
+        print(label)
+        measure("float32", lambda: float_model.predict(X), args.repeat)
+        measure("INT8", lambda: int8_model.predict(X), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inferencia de intenciones con TF-IDF denso vs CSR disperso
+
+Uso (desde backend/):
+    python benchmarks/bench_sparse_inference.py
+    python benchmarks/bench_sparse_inference.py --synthetic-vocab 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.intent_engines import NumpyIntentModel, NUMPY_WEIGHTS_DIRNAME  # noqa: E402
+
+MESSAGES = [
+    "hola", "ver tareas", "me siento mal", "crear tarea", "consejos",
+    "mis habitos", "estoy triste", "gracias", "ver progreso", "ayuda"
+]
+
+
+def load_real_model():
+    """Vectorizador y motor NumPy reales del servicio (carga desde el caché)"""
+    from app.services.tensorflow_ai_service import TensorFlowAIService
+
+    service = TensorFlowAIService()
+    intent_engine = service.intent_engine
+    if not isinstance(intent_engine, NumpyIntentModel):
+        # Motor Keras o INT8: usar los pesos float32 exportados (o extraerlos de Keras)
+        weights_path = os.path.join(service.artifact_store.path_for(service.model_version), NUMPY_WEIGHTS_DIRNAME)
+        if os.path.exists(weights_path):
+            intent_engine = NumpyIntentModel.load(weights_path)
+        else:
+            intent_engine = NumpyIntentModel.from_keras(service.model)
+    return service.vectorizer.transform, intent_engine
+
+
+def build_synthetic_model(vocab_size: int, num_classes: int = 11):
+    """Red con las mismas capas y un vocabulario del tamaño indicado"""
+    rng = np.random.default_rng(42)
+    layers = [
+        (rng.standard_normal((vocab_size, 128), dtype=np.float32) * 0.05, np.zeros(128, np.float32), "relu"),
+        (rng.standard_normal((128, 64), dtype=np.float32) * 0.05, np.zeros(64, np.float32), "relu"),
+        (rng.standard_normal((64, num_classes), dtype=np.float32) * 0.05, np.zeros(num_classes, np.float32), "softmax"),
+    ]
+
+    def vectorize(texts):
+        # Unos pocos términos activos por mensaje, como en el chat real
+        rows = []
+        for text in texts:
+            cols = rng.choice(vocab_size, size=max(1, len(text.split()) * 2), replace=False)
+            vals = rng.random(len(cols), dtype=np.float32)
+            rows.append(sparse.csr_matrix((vals, (np.zeros(len(cols)), cols)), shape=(1, vocab_size)))
+        return sparse.vstack(rows).tocsr()
+
+    return vectorize, NumpyIntentModel(layers)
+
+
+def measure(label: str, fn, repeat: int):
+    fn()  # calentamiento
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed_us = (time.perf_counter() - started) / repeat * 1e6
+    print(f"  {label:<28} {elapsed_us:>10.1f} µs/llamada   pico de memoria {peak / 1024:>10.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic-vocab", type=int, default=0,
+                        help="usar pesos aleatorios con este tamaño de vocabulario en lugar del modelo real")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.synthetic_vocab:
+        vectorize, model = build_synthetic_model(args.synthetic_vocab)
+    else:
+        vectorize, model = load_real_model()
+
+    single = vectorize([MESSAGES[2]])
+    batch = vectorize([MESSAGES[i % len(MESSAGES)] for i in range(args.batch_size)])
+    print(f"Vocabulario: {model.input_dim} términos, términos activos por mensaje: {single.nnz}")
+
+    for label, X in [("por petición (1 mensaje)", single), (f"por lote ({args.batch_size} mensajes)", batch)]:
+        print(label)
+        measure("denso float64 (.toarray())", lambda: model.predict(X.astype(np.float64).toarray()), args.repeat)
+        measure("CSR float32", lambda: model.predict(X), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark: contención de escrituras en SQLite, configuración anterior vs perfil de producción
+
+Varios hilos escriben a la vez (crear tarea y registrar hábito, con add/commit/refresh como
+las rutas) mientras otros leen (los recuentos de estadísticas de tareas) durante un tiempo
+fijo, sobre una base de datos nueva en cada variante:
+
+- default: la configuración anterior (diario de rollback, pool por defecto, cada sesión
+  escribe por su cuenta)
+- production: WAL, pragmas ajustados, pool de lectores y una sola conexión de escritura
+
+Se cuentan escrituras y lecturas por segundo, los errores "database is locked" y la latencia
+de las escrituras.
+
+Uso (desde backend/):
+    python benchmarks/bench_sqlite_contention.py
+    python benchmarks/bench_sqlite_contention.py --writers 16 --readers 8 --seconds 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import database  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import Base, SingleWriterSession, create_engines  # noqa: E402
+from app.models import Habit, HabitLog, Task, User  # noqa: E402
+
+
+def make_session_factory(path: str, profile: str):
+    settings.SQLITE_PROFILE = profile
+    reader, writer = create_engines(f"sqlite:///{path}")
+    database.WRITER_BINDS[reader] = writer
+    Base.metadata.create_all(bind=writer)
+    return sessionmaker(autoflush=False, bind=reader, class_=SingleWriterSession), (reader, writer)
+
+
+def run(profile: str, writers: int, readers: int, seconds: float, users: int, think: float):
+    path = os.path.join(tempfile.gettempdir(), f"bench_sqlite_contention_{profile}.db")
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    SessionFactory, engines = make_session_factory(path, profile)
+
+    with SessionFactory() as db:
+        for i in range(1, users + 1):
+            db.add(User(id=i, email=f"user{i}@example.com", password_hash="x", full_name="Usuario"))
+            db.add(Habit(id=i, user_id=i, name="Leer", frequency="daily"))
+        db.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"writes": 0, "reads": 0, "locked": 0, "timeouts": 0, "write_latencies": []}
+
+    def writer(worker: int):
+        n = 0
+        while not stop.is_set():
+            user_id = (worker + n) % users + 1
+            n += 1
+            started = time.perf_counter()
+            try:
+                with SessionFactory() as db:
+                    if n % 2:
+                        task = Task(user_id=user_id, title=f"Tarea {worker}-{n}", priority="medium", status="pending")
+                        db.add(task)
+                        db.commit()
+                        db.refresh(task)
+                    else:
+                        db.add(HabitLog(habit_id=user_id, completed_at=datetime.utcnow()))
+                        db.commit()
+            except OperationalError as e:
+                with lock:
+                    stats["locked" if "locked" in str(e) else "timeouts"] += 1
+                continue
+            except PoolTimeoutError:
+                with lock:
+                    stats["timeouts"] += 1
+                continue
+            with lock:
+                stats["writes"] += 1
+                stats["write_latencies"].append(time.perf_counter() - started)
+            time.sleep(think)
+
+    def reader(worker: int):
+        n = 0
+        while not stop.is_set():
+            user_id = (worker + n) % users + 1
+            n += 1
+            try:
+                with SessionFactory() as db:
+                    db.scalar(select(func.count(Task.id)).where(Task.user_id == user_id))
+                    db.scalar(select(func.count(Task.id)).where(
+                        Task.user_id == user_id, Task.due_date < date.today(), Task.status.in_(["pending", "in_progress"])
+                    ))
+                    db.scalar(select(func.count(HabitLog.id)).join(Habit).where(Habit.user_id == user_id))
+            except OperationalError:
+                with lock:
+                    stats["locked"] += 1
+                continue
+            with lock:
+                stats["reads"] += 1
+            time.sleep(think)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    for engine in set(engines):
+        engine.dispose()
+
+    latencies = sorted(stats["write_latencies"]) or [0.0]
+    return {
+        "writes_per_s": stats["writes"] / elapsed,
+        "reads_per_s": stats["reads"] / elapsed,
+        "locked": stats["locked"],
+        "timeouts": stats["timeouts"],
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--think-ms", type=float, default=5.0,
+                        help="pausa entre operaciones de cada hilo (el resto del trabajo de una petición)")
+    args = parser.parse_args()
+
+    print(f"{args.writers} hilos escritores, {args.readers} lectores, {args.seconds:.0f} s por variante\n")
+    print(f"{'perfil':<12} {'escrituras/s':>13} {'lecturas/s':>11} {'locked':>7} {'timeouts':>9} "
+          f"{'escritura p50':>14} {'escritura p99':>14}")
+    for profile in ("default", "production"):
+        result = run(profile, args.writers, args.readers, args.seconds, args.users, args.think_ms / 1000)
+        print(f"{profile:<12} {result['writes_per_s']:>13.1f} {result['reads_per_s']:>11.1f} {result['locked']:>7} "
+              f"{result['timeouts']:>9} {result['p50_ms']:>11.1f} ms {result['p99_ms']:>11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
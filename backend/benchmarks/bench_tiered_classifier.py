@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: clasificación por niveles (tabla exacta → reglas → modelo) vs solo modelo
+
+Clasifica una mezcla de mensajes de chat de uno en uno, como llegan al servidor, con
+el caché de predicciones desactivado, y muestra qué nivel resolvió cada mensaje.
+
+Uso (desde backend/):
+    python benchmarks/bench_tiered_classifier.py
+    python benchmarks/bench_tiered_classifier.py --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["AI_PREDICTION_CACHE_SIZE"] = "0"
+
+# Mezcla de tráfico: comandos habituales, saludos y mensajes libres
+TRAFFIC = [
+    "hola", "Hola!", "buenos días", "ver mis tareas", "Ver mis hábitos", "crear tarea",
+    "nuevo hábito", "adiós", "chao", "qué puedes hacer", "mis estadísticas",
+    "consejos de productividad", "necesito ayuda",
+    "hoy conseguí terminar mi proyecto y estoy muy feliz",
+    "me siento mal y no puedo más con el trabajo",
+    "gracias por todo", "quiero organizar mejor mi semana",
+    "ver lista de tareas pendientes", "hola, estoy un poco triste",
+    "tengo un examen mañana y estoy nervioso"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="veces que se repite la mezcla de mensajes")
+    args = parser.parse_args()
+
+    from app.services.tensorflow_ai_service import TensorFlowAIService
+
+    service = TensorFlowAIService()
+    classifier = service.intent_classifier
+    messages = TRAFFIC * args.repeat
+
+    print(f"Motor del modelo: {service.inference_backend}, tabla exacta: {classifier.get_stats()['exact_table_size']} frases\n")
+
+    print("Nivel que resuelve cada mensaje:")
+    for message in TRAFFIC:
+        prediction = classifier.predict([message])[0]
+        print(f"  {prediction['tier']:<6} {prediction['intent']:<18} {message}")
+
+    started = time.perf_counter()
+    for message in messages:
+        service._predict_intents([message])
+    model_only_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+    classifier.metrics.__init__()
+    started = time.perf_counter()
+    for message in messages:
+        classifier.predict([message])
+    tiered_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+    print(f"\nSolo modelo:     {model_only_us:>8.1f} µs/mensaje")
+    print(f"Por niveles:     {tiered_us:>8.1f} µs/mensaje\n")
+
+    stats = classifier.get_stats()
+    print(f"{'nivel':<8} {'aciertos':>9} {'tasa':>7} {'latencia media':>16}")
+    for tier, tier_stats in stats["tiers"].items():
+        print(f"{tier:<8} {tier_stats['hits']:>9} {tier_stats['hit_rate']:>7.1%} {tier_stats['avg_latency_us']:>13.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Comprobación y benchmark del resolutor de fechas relativas en español
+
+Resuelve una tabla de expresiones respecto a una fecha de referencia fija (miércoles
+12/03/2025 10:00 en Madrid), comprueba la fecha local, la fecha guardada (UTC) y el
+título sin la expresión, y mide el coste con y sin memoización. Después comprueba en el
+chat que "crear tarea" seguido de "comprar pan mañana a las 5" crea la tarea con fecha límite.
+
+Uso (desde backend/):
+    python benchmarks/check_date_resolver.py
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.date_resolver import _parse, resolve_due_date  # noqa: E402
+
+TZ = "Europe/Madrid"
+NOW = datetime(2025, 3, 12, 10, 0, tzinfo=ZoneInfo(TZ))
+
+# (mensaje, fecha local esperada "AAAA-MM-DD HH:MM" o None, título sin la fecha)
+CASES = [
+    ("llamar al banco", None, None),
+    ("comprar pan hoy", "2025-03-12 23:59", "comprar pan"),
+    ("Comprar pan mañana", "2025-03-13 23:59", "Comprar pan"),
+    ("revisar informe pasado mañana", "2025-03-14 23:59", "revisar informe"),
+    ("entregar proyecto el 21/03/2025", "2025-03-21 23:59", "entregar proyecto"),
+    ("pagar alquiler 1/3", "2026-03-01 23:59", "pagar alquiler"),
+    ("preparar examen en 3 días", "2025-03-15 23:59", "preparar examen"),
+    ("renovar pasaporte dentro de dos semanas", "2025-03-26 23:59", "renovar pasaporte"),
+    ("reunión el próximo viernes", "2025-03-14 23:59", "reunión"),
+    ("dentista el miércoles que viene", "2025-03-19 23:59", "dentista"),
+    ("gimnasio este miércoles", "2025-03-12 23:59", "gimnasio"),
+    ("llamar a mamá a las 5", "2025-03-12 17:00", "llamar a mamá"),
+    ("desayuno con Ana a las 9", "2025-03-13 09:00", "desayuno con Ana"),
+    ("correr mañana a las 7 de la mañana", "2025-03-13 07:00", "correr"),
+    ("cena el sábado a las 21:30", "2025-03-15 21:30", "cena"),
+    ("enviar correo mañana a las 5 y media", "2025-03-13 17:30", "enviar correo"),
+    ("estudiar por la mañana", None, None),
+]
+
+
+def check_chat() -> bool:
+    """Conversación de creación de tarea a través del motor del chat"""
+    from app.services.ai_service import AIService
+
+    service = AIService()
+    service.initialize()
+    context = {"timezone": TZ}
+    prompt = service.process_message("crear tarea", "check-dates", context)
+    reply = service.process_message("comprar pan mañana a las 5", "check-dates", context)
+    task = reply.get("task_created") or {}
+    ok = prompt["intent"] == "task_creation_prompt" and task.get("title") == "comprar pan" and bool(task.get("due_date"))
+    print(f"\nChat: {prompt['intent']} -> {reply['intent']} {task.get('title')!r} due_date={task.get('due_date')}")
+    print(f"  {'ok ' if ok else 'ERR'} crear tarea + 'comprar pan mañana a las 5'")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    failures = 0
+    for message, expected, title in CASES:
+        resolution = resolve_due_date(message, TZ, now=NOW)
+        got = resolution.local.strftime("%Y-%m-%d %H:%M") if resolution else None
+        got_title = resolution.strip(message) if resolution else None
+        ok = got == expected and got_title == title
+        if resolution is not None:
+            # La fecha guardada es la misma hora en UTC, sin zona horaria
+            ok = ok and resolution.due_date.tzinfo is None and \
+                resolution.due_date == resolution.local.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+        failures += not ok
+        print(f"  {'ok ' if ok else 'ERR'} {message:<42} -> {got} {got_title!r}")
+
+    messages = [message for message, _, _ in CASES]
+    _parse.cache_clear()
+    started = time.perf_counter()
+    for message in messages:
+        resolve_due_date(message, TZ, now=NOW)
+    cold_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for message in messages:
+            resolve_due_date(message, TZ, now=NOW)
+    warm_us = (time.perf_counter() - started) / (args.repeat * len(messages)) * 1e6
+
+    print(f"\nSin memoizar: {cold_us:.1f} µs/mensaje, memoizado por (frase, día): {warm_us:.1f} µs/mensaje")
+    print(f"Caché: {_parse.cache_info()}")
+
+    failures += not check_chat()
+    if failures:
+        print(f"\n❌ {failures} casos fallidos")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
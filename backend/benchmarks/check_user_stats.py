@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Comprobación de los contadores incrementales de user_stats
+
+1. Lanza una secuencia aleatoria de escrituras contra las rutas reales (crear, actualizar,
+   completar y eliminar tareas; crear, actualizar y registrar hábitos) y, tras cada una,
+   compara la fila de user_stats con los contadores calculados desde las tablas.
+2. Introduce desviaciones escribiendo en las tablas por fuera de la aplicación y comprueba
+   que una pasada del reconciliador las corrige.
+3. Mide el resumen de un usuario con muchas tareas: lectura de user_stats frente a las
+   consultas de agregación.
+
+Uso (desde backend/):
+    python benchmarks/check_user_stats.py
+    python benchmarks/check_user_stats.py --operations 500 --tasks 100000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "check_user_stats.db")
+# La aplicación lee DATABASE_URL al importarse
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.database import AsyncSessionLocal, Base, dispose_engines, ensure_indexes, writer_engine  # noqa: E402
+from app.routes import analytics, habits, tasks  # noqa: E402
+from app.services import user_stats_service  # noqa: E402
+from app.services.auth_service import create_access_token  # noqa: E402
+
+USER_ID = 1
+
+
+def reset_database():
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(_DB_PATH + suffix):
+            os.remove(_DB_PATH + suffix)
+    Base.metadata.create_all(bind=writer_engine)
+    ensure_indexes()
+    conn = sqlite3.connect(_DB_PATH)
+    with conn:
+        conn.execute(
+            "INSERT INTO users (id, email, password_hash, full_name, created_at, is_active) "
+            "VALUES (?, 'stats@example.com', 'x', 'Stats', ?, 1)", (USER_ID, datetime.utcnow())
+        )
+    conn.close()
+
+
+async def stored_and_expected():
+    """Fila de user_stats (tal como la leen los resúmenes) y contadores calculados desde las tablas"""
+    async with AsyncSessionLocal() as db:
+        stored = await user_stats_service.get_user_stats(db, USER_ID)
+        expected = await user_stats_service.compute_counters(db, USER_ID, date.today())
+    stored.pop("completion_rate")
+    return stored, expected
+
+
+async def random_operation(client: httpx.AsyncClient, task_ids: list, habit_ids: list) -> str:
+    """Una escritura aleatoria a través de las rutas; devuelve su nombre"""
+    now = datetime.utcnow()
+    choice = random.random()
+    if choice < 0.3 or not task_ids:
+        response = await client.post("/api/tasks/", json={
+            "title": "Tarea", "priority": random.choice(["low", "medium", "high"]),
+            "status": random.choice(["pending", "in_progress", "completed"]),
+            "due_date": (now + timedelta(days=random.randrange(-5, 5))).isoformat()
+        })
+        task_ids.append(response.json()["id"])
+        return "crear tarea"
+    if choice < 0.45:
+        await client.put(f"/api/tasks/{random.choice(task_ids)}", json={
+            "status": random.choice(["pending", "in_progress", "completed"])
+        })
+        return "actualizar tarea"
+    if choice < 0.6:
+        await client.post(f"/api/tasks/{random.choice(task_ids)}/complete")
+        return "completar tarea"
+    if choice < 0.7:
+        task_id = task_ids.pop(random.randrange(len(task_ids)))
+        await client.delete(f"/api/tasks/{task_id}")
+        return "eliminar tarea"
+    if choice < 0.8 or not habit_ids:
+        response = await client.post("/api/habits/", json={"name": "Hábito", "frequency": "daily"})
+        habit_ids.append(response.json()["id"])
+        return "crear hábito"
+    if choice < 0.87:
+        await client.put(f"/api/habits/{random.choice(habit_ids)}", json={"is_active": random.random() < 0.5})
+        return "actualizar hábito"
+    await client.post(f"/api/habits/{random.choice(habit_ids)}/log", json={
+        "completed_at": (now - timedelta(days=random.randrange(0, 3))).isoformat()
+    })
+    return "registrar hábito"
+
+
+async def check_writes(client: httpx.AsyncClient, operations: int) -> int:
+    task_ids, habit_ids = [], []
+    await client.get("/api/tasks/stats/summary")  # crea la fila de user_stats
+    mismatches = 0
+    for i in range(operations):
+        name = await random_operation(client, task_ids, habit_ids)
+        stored, expected = await stored_and_expected()
+        if stored != expected:
+            mismatches += 1
+            print(f"  ❌ tras '{name}' (operación {i + 1}): {stored} != {expected}")
+    return mismatches
+
+
+async def check_reconciler() -> bool:
+    # Escrituras por fuera de la aplicación: los contadores no se enteran
+    conn = sqlite3.connect(_DB_PATH)
+    with conn:
+        conn.execute(
+            "INSERT INTO tasks (user_id, title, priority, status, completed_at, created_at, updated_at) "
+            "VALUES (?, 'Externa', 'low', 'completed', ?, ?, ?)", (USER_ID, *[datetime.utcnow()] * 3)
+        )
+        conn.execute("UPDATE habits SET is_active = 0 WHERE user_id = ?", (USER_ID,))
+    conn.close()
+
+    stored, expected = await stored_and_expected()
+    print(f"  desviación introducida: {sorted(k for k in expected if stored[k] != expected[k])}")
+    results = await user_stats_service.reconcile_all(AsyncSessionLocal)
+    stored, expected = await stored_and_expected()
+    print(f"  reconciliador: {results['fixed']} usuario(s) corregido(s)")
+    return results["fixed"] == 1 and stored == expected
+
+
+def seed_tasks(count: int):
+    now = datetime.utcnow()
+    conn = sqlite3.connect(_DB_PATH)
+    with conn:
+        conn.executemany(
+            "INSERT INTO tasks (user_id, title, priority, status, completed_at, created_at, updated_at) "
+            "VALUES (?, 'Tarea', 'medium', ?, ?, ?, ?)",
+            ((USER_ID, "completed" if i % 2 else "pending", now if i % 2 else None, now, now) for i in range(count))
+        )
+    conn.close()
+
+
+async def time_reads(repeat: int):
+    """Media por lectura, con una sesión nueva por lectura como en las rutas"""
+    async with AsyncSessionLocal() as db:
+        await user_stats_service.reconcile_user(db, USER_ID)
+        await db.commit()
+
+    async def stored_read():
+        async with AsyncSessionLocal() as db:
+            await user_stats_service.get_user_stats(db, USER_ID)
+
+    async def computed_read():
+        async with AsyncSessionLocal() as db:
+            await user_stats_service.compute_counters(db, USER_ID, date.today())
+
+    results = []
+    for read in (stored_read, computed_read):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await read()
+        results.append((time.perf_counter() - started) / repeat)
+    return results
+
+
+async def run(args) -> bool:
+    app = FastAPI()
+    app.include_router(tasks.router, prefix="/api/tasks")
+    app.include_router(habits.router, prefix="/api/habits")
+    app.include_router(analytics.router, prefix="/api/analytics")
+    token = create_access_token({"sub": str(USER_ID)}, expires_delta=timedelta(hours=1))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Todo en un mismo bucle de eventos: las conexiones del pool asíncrono pertenecen a él
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+        print(f"1. {args.operations} escrituras aleatorias a través de las rutas")
+        mismatches = await check_writes(client, args.operations)
+        print(f"  {'✅' if not mismatches else '❌'} {mismatches} discrepancias\n")
+
+    print("2. Reconciliador")
+    reconciled = await check_reconciler()
+    print(f"  {'✅' if reconciled else '❌'} contadores {'iguales' if reconciled else 'distintos'} a las tablas\n")
+
+    print(f"3. Resumen con {args.tasks} tareas más ({args.repeat} lecturas)")
+    seed_tasks(args.tasks)
+    stored, computed = await time_reads(args.repeat)
+    print(f"  user_stats: {stored * 1000:.2f} ms   agregación: {computed * 1000:.2f} ms")
+
+    # Sin cerrar el pool, los hilos de aiosqlite impiden que el proceso termine
+    await dispose_engines()
+    return not mismatches and reconciled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=300)
+    parser.add_argument("--tasks", type=int, default=50000, help="tareas del usuario para medir las lecturas")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # Las rutas configuran logging en INFO: sin una línea por petición
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    random.seed(42)
+    reset_database()
+
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
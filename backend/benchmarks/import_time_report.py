@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Informe del tiempo de importación por módulo al arrancar el backend
+
+Ejecuta `python -X importtime -c "import main"` en un proceso limpio y muestra los
+módulos más lentos y si se cargó el stack de IA (TensorFlow, sklearn, pandas).
+
+Uso (desde backend/):
+    python benchmarks/import_time_report.py
+    python benchmarks/import_time_report.py --module app.routes.tasks --top 15
+    ENABLE_ML_FEATURES=False python benchmarks/import_time_report.py
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+HEAVY_PACKAGES = ["tensorflow", "keras", "sklearn", "pandas", "scipy", "numpy", "joblib"]
+
+
+def run_importtime(module: str):
+    """Importar `module` en un subproceso y devolver (módulo, self_us, cumulative_us, nivel)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "TF_CPP_MIN_LOG_LEVEL": "3"},
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:], file=sys.stderr)
+        raise SystemExit(f"No se pudo importar {module}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="módulo a importar (por defecto main)")
+    parser.add_argument("--top", type=int, default=25, help="número de módulos a listar")
+    args = parser.parse_args()
+
+    entries = run_importtime(args.module)
+    top_level = [entry for entry in entries if entry[3] == 0]
+    total_ms = sum(cumulative for _, _, cumulative, _ in top_level) / 1000
+    loaded = {name for name, _, _, _ in entries}
+
+    print(f"Importar {args.module}: {total_ms:.0f} ms, {len(entries)} módulos\n")
+
+    print(f"Top {args.top} por tiempo acumulado (incluye sus dependencias):")
+    for name, _, cumulative, level in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>9.1f} ms  {'  ' * min(level, 6)}{name}")
+
+    print(f"\nTop {args.top} por tiempo propio:")
+    for name, self_us, _, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:>9.1f} ms  {name}")
+
+    print("\nPaquetes pesados cargados al importar:")
+    for package in HEAVY_PACKAGES:
+        cumulative = max((c for name, _, c, _ in entries if name == package), default=None)
+        state = f"sí ({cumulative / 1000:.0f} ms)" if package in loaded else "no"
+        print(f"  {package:<12} {state}")
+
+
+if __name__ == "__main__":
+    main()
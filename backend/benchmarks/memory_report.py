@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Informe de memoria por worker: artefactos deserializados vs mapeados en memoria
+
+Arranca N procesos a la vez (como N workers de uvicorn/gunicorn), cada uno carga el
+modelo y clasifica unos mensajes; con todos vivos, cada worker lee su RSS y su PSS de
+`/proc/self/smaps_rollup`. El PSS reparte las páginas compartidas entre los procesos
+que las usan, así que es la medida que refleja el ahorro del memmap.
+
+Se ejecuta dos veces, con `AI_MMAP_MODEL_ARTIFACTS=False` (antes) y `True` (después).
+
+Uso (desde backend/):
+    python benchmarks/memory_report.py
+    python benchmarks/memory_report.py --workers 8 --service local
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MESSAGES = ["hola", "ver mis tareas", "crear tarea", "me siento mal", "consejos de productividad"]
+
+SMAPS_FIELDS = ["Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty"]
+
+
+def read_memory() -> dict:
+    """Memoria del proceso en MB (Linux); fuera de Linux solo el pico de RSS"""
+    try:
+        values = {}
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in SMAPS_FIELDS:
+                    values[name] = int(rest.split()[0]) / 1024
+        return values
+    except OSError:
+        import resource
+        return {"Rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def run_worker(service_name: str):
+    """Cuerpo de cada worker: medir, cargar el modelo, esperar a los demás y volver a medir"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    before = read_memory()
+
+    if service_name == "local":
+        from app.services.local_ai_service import LocalAIService
+        service = LocalAIService()
+        for message in MESSAGES:
+            service.chat(message)
+    else:
+        from app.services.tensorflow_ai_service import TensorFlowAIService
+        service = TensorFlowAIService()
+        service._predict_intents(MESSAGES)
+
+    print("ready", flush=True)
+    sys.stdin.readline()  # el padre avisa cuando todos los workers han cargado
+    print(json.dumps({"before": before, "after": read_memory()}), flush=True)
+
+
+def run_round(workers: int, service_name: str, mmap: bool) -> list:
+    """Lanzar `workers` procesos con o sin memmap y recoger sus medidas"""
+    env = {**os.environ, "AI_MMAP_MODEL_ARTIFACTS": str(mmap), "TF_CPP_MIN_LOG_LEVEL": "3"}
+    command = [sys.executable, __file__, "--worker", "--service", service_name]
+    processes = [
+        subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+
+    for process in processes:
+        if process.stdout.readline().strip() != "ready":
+            raise SystemExit("Un worker no pudo cargar el modelo")
+
+    results = []
+    for process in processes:
+        process.stdin.write("\n")
+        process.stdin.flush()
+        results.append(json.loads(process.stdout.readline()))
+    for process in processes:
+        process.wait()
+    return results
+
+
+def print_round(label: str, results: list):
+    print(f"\n{label}")
+    print(f"  {'worker':>6}  {'RSS antes':>10}  {'RSS después':>12}  {'PSS':>8}  {'compartida':>10}  {'privada':>8}")
+    for i, result in enumerate(results):
+        before, after = result["before"], result["after"]
+        private = after.get("Private_Clean", 0) + after.get("Private_Dirty", 0)
+        print(
+            f"  {i:>6}  {before['Rss']:>8.1f}MB  {after['Rss']:>10.1f}MB  {after.get('Pss', 0):>6.1f}MB"
+            f"  {after.get('Shared_Clean', 0):>8.1f}MB  {private:>6.1f}MB"
+        )
+    total_pss = sum(result["after"].get("Pss", 0) for result in results)
+    print(f"  PSS total de los {len(results)} workers: {total_pss:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="número de workers simultáneos")
+    parser.add_argument("--service", choices=["tensorflow", "local"], default="tensorflow")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.service)
+        return
+
+    # Un primer worker entrena y exporta los artefactos si aún no están en el caché
+    run_round(1, args.service, mmap=True)
+
+    print_round("Antes (artefactos cargados completos en cada worker):", run_round(args.workers, args.service, mmap=False))
+    print_round("Después (memmap de solo lectura):", run_round(args.workers, args.service, mmap=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Regresión de planes de consulta: las consultas calientes de tareas y hábitos no deben
+recorrer tablas completas
+
+Crea una base SQLite con los modelos de la aplicación, la llena con ~1M de tareas y
+registros de hábitos, y ejecuta EXPLAIN QUERY PLAN sobre las mismas consultas que hacen
+las rutas de tareas, hábitos y analytics. Termina con error si algún plan hace un
+`SCAN` de tasks, habits o habit_logs (con o sin índice: recorrer un índice entero
+también es un recorrido completo).
+
+Uso (desde backend/):
+    python benchmarks/query_plan_check.py
+    python benchmarks/query_plan_check.py --tasks 100000 --db /tmp/plan_check.db
+    python benchmarks/query_plan_check.py --drop-indexes   # muestra los planes sin los índices
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, extract, func  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.database import Base, ensure_indexes  # noqa: E402
+from app.models import Habit, HabitLog, Task  # noqa: E402
+from app.services.stats_service import habit_stats_query, task_stats_query  # noqa: E402
+
+HOT_TABLES = ("tasks", "habits", "habit_logs")
+
+# Índices de los modelos (se eliminan con --drop-indexes para ver la regresión)
+MODEL_INDEXES = [
+    index.name for table in Base.metadata.sorted_tables if table.name in HOT_TABLES for index in table.indexes
+]
+
+
+def hot_queries(db: Session, user_id: int, habit_id: int):
+    """Las consultas de las rutas, con los mismos filtros y ordenaciones"""
+    today = date.today()
+    six_months_ago = today - timedelta(days=180)
+    pending = ["pending", "in_progress"]
+
+    return {
+        # routes/tasks.py
+        "tasks: listado": db.query(Task).filter(Task.user_id == user_id).order_by(Task.created_at.desc()),
+        "tasks: listado por estado": db.query(Task).filter(
+            Task.user_id == user_id, Task.status == "pending"
+        ).order_by(Task.created_at.desc()),
+        # services/stats_service.py (resúmenes de tareas, hábitos y analytics)
+        "stats: tareas": task_stats_query(user_id, today),
+        "stats: hábitos": habit_stats_query(user_id, today),
+        # routes/analytics.py
+        "analytics: completadas con tiempo": db.query(Task).filter(
+            Task.user_id == user_id, Task.status == "completed", Task.completed_at.isnot(None)
+        ),
+        "analytics: tendencia mensual": db.query(
+            extract("month", Task.created_at), extract("year", Task.created_at), func.count(Task.id)
+        ).filter(Task.user_id == user_id, Task.created_at >= six_months_ago).group_by(
+            extract("month", Task.created_at), extract("year", Task.created_at)
+        ),
+        "analytics: más urgentes": db.query(Task).filter(
+            Task.user_id == user_id, Task.due_date < today, Task.status.in_(pending)
+        ).order_by(Task.due_date).limit(5),
+        # routes/habits.py y analytics de hábitos
+        "habits: listado": db.query(Habit).filter(Habit.user_id == user_id).order_by(Habit.created_at.desc()),
+        "habit_logs: historial": db.query(HabitLog).filter(
+            HabitLog.habit_id == habit_id
+        ).order_by(HabitLog.completed_at.desc()),
+        "habit_logs: rachas": db.query(HabitLog).join(Habit).filter(
+            Habit.user_id == user_id
+        ).order_by(HabitLog.completed_at),
+    }
+
+
+def seed(path: str, tasks: int, users: int):
+    """Usuarios, tareas, hábitos y registros con fechas repartidas en el último año"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    engine.dispose()
+
+    random.seed(42)
+    now = datetime.utcnow()
+    habits_per_user = 10
+    logs = tasks
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (id, email, password_hash, full_name, created_at, is_active) VALUES (?, ?, 'x', 'Usuario', ?, 1)",
+            ((i, f"user{i}@example.com", now) for i in range(1, users + 1))
+        )
+
+        def task_rows():
+            for i in range(tasks):
+                created = now - timedelta(minutes=random.randrange(525600))
+                status = random.choice(["pending", "in_progress", "completed", "completed"])
+                completed = created + timedelta(hours=random.randrange(1, 200)) if status == "completed" else None
+                due = created + timedelta(days=random.randrange(-5, 30)) if random.random() < 0.7 else None
+                yield (random.randrange(1, users + 1), f"Tarea {i}", random.choice(["low", "medium", "high"]),
+                       status, due, completed, created, created)
+
+        conn.executemany(
+            "INSERT INTO tasks (user_id, title, priority, status, due_date, completed_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            task_rows()
+        )
+        conn.executemany(
+            "INSERT INTO habits (id, user_id, name, frequency, is_active, created_at, updated_at) VALUES (?, ?, ?, 'daily', 1, ?, ?)",
+            ((h, (h - 1) // habits_per_user + 1, f"Hábito {h}", now, now) for h in range(1, users * habits_per_user + 1))
+        )
+        conn.executemany(
+            "INSERT INTO habit_logs (habit_id, completed_at) VALUES (?, ?)",
+            ((random.randrange(1, users * habits_per_user + 1), now - timedelta(minutes=random.randrange(525600)))
+             for _ in range(logs))
+        )
+    conn.close()
+
+
+def explain(engine, query) -> list:
+    """Filas `detail` de EXPLAIN QUERY PLAN para una consulta del ORM (Query o select())"""
+    statement = getattr(query, "statement", query)
+    # render_postcompile expande los IN (...) en un parámetro por valor
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+
+
+def is_full_scan(detail: str) -> bool:
+    """`SCAN tabla` (o `SCAN tabla USING INDEX`) sobre una tabla caliente"""
+    words = detail.split()
+    return len(words) >= 2 and words[0] == "SCAN" and words[1] in HOT_TABLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="filas de tasks (y de habit_logs)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--db", help="fichero SQLite (se reutiliza si ya existe)")
+    parser.add_argument("--analyze", action="store_true", help="ejecutar ANALYZE antes de los planes")
+    parser.add_argument("--drop-indexes", action="store_true", help="eliminar los índices de los modelos")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.gettempdir(), f"query_plan_check_{args.tasks}.db")
+    if not os.path.exists(path):
+        print(f"Sembrando {path} ({args.tasks} tareas y registros de hábitos)...")
+        started = time.perf_counter()
+        seed(path, args.tasks, args.users)
+        print(f"  listo en {time.perf_counter() - started:.1f} s\n")
+
+    engine = create_engine(f"sqlite:///{path}")
+    ensure_indexes(engine)
+    with engine.begin() as conn:
+        if args.drop_indexes:
+            for name in MODEL_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        if args.analyze:
+            conn.exec_driver_sql("ANALYZE")
+
+    failures = []
+    with Session(engine) as db:
+        for label, query in hot_queries(db, user_id=1, habit_id=1).items():
+            plan = explain(engine, query)
+            scans = [detail for detail in plan if is_full_scan(detail)]
+            print(f"{'ERR' if scans else 'ok '} {label}")
+            for detail in plan:
+                print(f"      {detail}")
+            if scans:
+                failures.append(label)
+
+    if args.drop_indexes:
+        # No dejar la base de datos sin índices para la siguiente ejecución
+        ensure_indexes(engine)
+
+    if failures:
+        print(f"\n❌ {len(failures)} consultas recorren una tabla completa: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\n✅ Ninguna consulta caliente recorre una tabla completa ({path})")
+
+
+if __name__ == "__main__":
+    main()
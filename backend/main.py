@@ -1,29 +1,64 @@
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
+import asyncio
+import contextlib
 import uvicorn
 from dotenv import load_dotenv
 import os
 
-from app.routes import auth, assistant, calendar, analytics, tasks, habits
-from app.database import engine, Base
+from app.routes import auth, assistant, calendar, analytics, tasks, habits, admin
+from app.database import writer_engine, Base, ensure_indexes, dispose_engines, AsyncSessionLocal
 from app.config import settings
-from app.models import User, Task, Habit, HabitLog
+from app.models import User, Task, Habit, HabitLog, UserStats
+from app.services.ai_service import get_ai_service
+from app.services.user_stats_service import run_reconciler
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables (and indexes added to existing tables)
+Base.metadata.create_all(bind=writer_engine)
+ensure_indexes()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 AI Personal Assistant Backend Starting...")
+    
+    # Crear el motor de IA compartido (una sola instancia por proceso)
+    ai_service = get_ai_service()
+    warmup_task = None
+    
+    if not settings.ENABLE_ML_FEATURES:
+        print("⚙️ Funciones de IA desactivadas: worker solo para CRUD")
+    elif settings.AI_WARMUP_MODE == "startup":
+        await asyncio.to_thread(ai_service.warm_up)
+    elif settings.AI_WARMUP_MODE == "background":
+        # El worker acepta peticiones (y /ready responde 503) mientras el modelo se carga
+        warmup_task = asyncio.create_task(asyncio.to_thread(ai_service.warm_up))
+    # "lazy": el modelo se carga con el primer mensaje del chat
+    
+    # Corregir periódicamente las desviaciones de los contadores de user_stats
+    reconciler_task = None
+    if settings.USER_STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        reconciler_task = asyncio.create_task(
+            run_reconciler(AsyncSessionLocal, settings.USER_STATS_RECONCILE_INTERVAL_SECONDS)
+        )
+    
     yield
     # Shutdown
     print("👋 AI Personal Assistant Backend Shutting down...")
+    if reconciler_task is not None:
+        reconciler_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await reconciler_task
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
+    await ai_service.shutdown()
+    await dispose_engines()
 
 # Create FastAPI app
 app = FastAPI(
@@ -47,7 +82,9 @@ security = HTTPBearer()
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(assistant.router, prefix="/api/assistant", tags=["Assistant"])
+if settings.ENABLE_ML_FEATURES:
+    app.include_router(assistant.router, prefix="/api/assistant", tags=["Assistant"])
+    app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(calendar.router, prefix="/api/calendar", tags=["Calendar"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["Tasks"])
@@ -63,8 +100,26 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: el proceso está vivo, aunque el modelo todavía no esté cargado"""
     return {"status": "healthy", "service": "ai-assistant-backend"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 503 hasta que el modelo esté cargado y calentado"""
+    if not settings.ENABLE_ML_FEATURES or settings.AI_WARMUP_MODE == "lazy":
+        # Workers solo CRUD o carga diferida explícita: no hay nada que esperar
+        return {"status": "ready", "service": "ai-assistant-backend", "ai": None}
+    
+    readiness = get_ai_service().get_readiness()
+    if not readiness["ready"]:
+        # "failed": el modelo o el calentamiento fallaron; "starting": todavía cargando
+        failed = readiness["model_status"] == "failed" or readiness["warmup_error"] is not None
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed" if failed else "starting", "service": "ai-assistant-backend", "ai": readiness}
+        )
+    return {"status": "ready", "service": "ai-assistant-backend", "ai": readiness}
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",